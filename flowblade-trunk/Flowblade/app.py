@@ -50,10 +50,10 @@ import appconsts
 import audiomonitoring
 import audiowaveform
 import audiowaveformrenderer
+import autosavejournal
 import clipeffectseditor
 import clipmenuaction
 import compositeeditor
-import containerclip
 import containeractions
 import dialogs
 import dialogutils
@@ -65,7 +65,6 @@ import editorlayout
 import editorpersistance
 import editorstate
 import editorwindow
-import gmic
 import gui
 import jobs
 import keyevents
@@ -73,8 +72,6 @@ import keyframeeditor
 import keyframeeditcanvas
 import kftoolmode
 import medialog
-import mltenv
-import mltfilters
 import mltplayer
 import mltprofiles
 import mlttransitions
@@ -86,18 +83,22 @@ import positionbar
 import preferenceswindow
 import processutils
 import projectaction
+import projectchanges
 import projectdata
 import projectinfogui
 import propertyeditorbuilder
 import proxyediting
 import render
 import renderconsumer
+import renderworkers
 import respaths
 import resync
 import rotomask
 import sequence
 import shortcuts
 import snapping
+import startupcache
+import startupscheduler
 import threading
 import titler
 import tlinerender
@@ -141,6 +142,8 @@ def main(root_path):
     Called at application start.
     Initializes application with a default project.
     """
+    startupscheduler.start()
+
     # DEBUG: Direct output to log file if log file set
     if _log_file != None:
         log_print_output_to_file()
@@ -189,6 +192,7 @@ def main(root_path):
         editorstate.display_all_audio_levels = False
 
     editorpersistance.save()
+    startupscheduler.mark("user folders and prefs")
 
     # Init translations module with translations data
     translations.init_languages()
@@ -198,6 +202,7 @@ def main(root_path):
     # Keyboard shortcuts
     shortcuts.load_shortcut_files()
     shortcuts.load_shortcuts()
+    startupscheduler.mark("translations and shortcuts")
 
     # The test for len != 4 is to make sure that if we change the number of values below the prefs are reset to the correct list
     # So when we add or remove a value, make sure we also change the len test
@@ -240,8 +245,9 @@ def main(root_path):
     if editorpersistance.prefs.theme != appconsts.LIGHT_THEME:
         Gtk.Settings.get_default().set_property("gtk-application-prefer-dark-theme", True)
         
-    # Load drag'n'drop images
+    # Load drag'n'drop images, these are needed when GUI widgets are connected as drag sources.
     dnd.init()
+    startupscheduler.mark("themes and dnd")
 
     # Save screen size data and modify rendering based on screen size/s and number of monitors. 
     scr_w, scr_h = _set_screen_size_data()
@@ -263,22 +269,20 @@ def main(root_path):
     # Set numeric locale to use "." as radix, MLT initilizes this to OS locale and this causes bugs.
     locale.setlocale(locale.LC_NUMERIC, 'C')
 
-    # Check for codecs and formats on the system.
-    mltenv.check_available_features(repo)
+    # Check for codecs and formats on the system and load filter and compositor descriptions,
+    # these come from startup cache if it is up to date. 
+    # Some services are replaced if better replacements available.
+    startupcache.load_mlt_environment(repo, do_replace_services=True)
     renderconsumer.load_render_profiles()
 
-    # Load filter and compositor descriptions from xml files.
-    mltfilters.load_filters_xml(mltenv.services)
-    mlttransitions.load_compositors_xml(mltenv.transitions)
-    
-    # Replace some services if better replacements available.
-    mltfilters.replace_services(mltenv.services)
-
     # Create list of available mlt profiles.
     mltprofiles.load_profile_list()
+    startupscheduler.mark("MLT init and environment")
 
     # If we have crashed we could have large amount of disk space wasted unless we delete all files here.
-    tlinerender.app_launch_clean_up()
+    # Old session dirs are listed now before new session dir is created, deleting them is done in background.
+    startupscheduler.run_in_background("timeline render clean-up", tlinerender.delete_old_session_dirs,
+                                       tlinerender.get_old_session_dirs())
 
     # Save assoc file path if found in arguments.
     global assoc_file_path
@@ -291,14 +295,13 @@ def main(root_path):
 
     # Audiomonitoring being available needs to be known before GUI creation.
     audiomonitoring.init(editorstate.project.profile)
+    startupscheduler.mark("default project and audio monitoring")
 
     # Set trim view mode to current default value.
     editorstate.show_trim_view = editorpersistance.prefs.trim_view_default
 
-    # Check for tools and init tools integration.
-    gmic.test_availablity()
-    containerclip.test_blender_availebility()
-    toolsintegration.init()
+    # Tools availability is tested on first use, tools integration is initialized after window is shown.
+    startupscheduler.run_deferred("tools integration", toolsintegration.init)
 
     # Create player object.
     create_player()
@@ -317,6 +320,7 @@ def main(root_path):
 
     # Editor and modules need some more initializing.
     init_editor_state()
+    startupscheduler.mark("player and GUI")
 
     # Tracks need to be recentered if window is resized.
     # Connect listener for this now that the tline panel size allocation is sure to be available.
@@ -383,6 +387,9 @@ def main(root_path):
     global disk_cache_timeout_id
     disk_cache_timeout_id = GObject.timeout_add(2500, check_disk_cache_size)
 
+    startupscheduler.mark("autosave and dialogs")
+    startupscheduler.launch_deferred()
+
     # Launch gtk+ main loop
     Gtk.main()
 
@@ -713,6 +720,8 @@ def change_current_sequence(index):
     edit.do_gui_update = False  # This should not be necessery but we are doing this signal intention that GUI updates are disabled
     
     stop_autosave()
+    projectchanges.sequence_changed(editorstate.project.c_seq) # Sequence may have unreported changes from when it was edited.
+    persistance.load_sequence_mlt(editorstate.project, editorstate.project.sequences[index]) # Sequences are built when first needed.
     editorstate.project.c_seq = editorstate.project.sequences[index]
 
     editorstate.tline_render_mode = appconsts.TLINE_RENDERING_OFF
@@ -765,10 +774,11 @@ def autosave_dialog_callback(dialog, response):
     if response == Gtk.ResponseType.OK:
         global loaded_autosave_file
         loaded_autosave_file = autosave_file
+        autosavejournal.replay(autosave_file)
         projectaction.actually_load_project(autosave_file, True, False, True)
     else:
         tlinerender.init_session()  # didn't do this in main and not going to do app-open_project
-        os.remove(autosave_file)
+        autosavejournal.delete_files(autosave_file)
         start_autosave()
 
 def autosaves_many_recovery_dialog():
@@ -793,6 +803,7 @@ def autosaves_many_dialog_callback(dialog, response, autosaves_view, autosaves):
         global loaded_autosave_file
         loaded_autosave_file = autosave_file
         dialog.destroy()
+        autosavejournal.replay(autosave_file)
         projectaction.actually_load_project(autosave_file, True, False, True)
     else:
         dialog.destroy()
@@ -822,23 +833,31 @@ def start_autosave():
         print("Autosave started...")
         autosave_timeout_id = GObject.timeout_add(autosave_delay_millis, do_autosave)
         autosave_file = userfolders.get_cache_dir() + get_instance_autosave_file()
-        persistance.save_project(editorstate.PROJECT(), autosave_file)
+        if editorpersistance.prefs.journaled_autosave == True:
+            autosavejournal.start(editorstate.PROJECT(), autosave_file)
+        else:
+            persistance.save_project(editorstate.PROJECT(), autosave_file)
     else:
         print("Autosave disabled...")
         stop_autosave()
 
 def get_autosave_files():
     autosave_dir = userfolders.get_cache_dir() + AUTOSAVE_DIR
-    return os.listdir(autosave_dir)
+    return [f for f in os.listdir(autosave_dir) if not f.endswith(autosavejournal.JOURNAL_FILE_EXTENSION)]
 
 def stop_autosave():
     global autosave_timeout_id
+    autosavejournal.stop() # Pending journal writes are done before autosave files are used or deleted.
     if autosave_timeout_id == -1:
         return
     GLib.source_remove(autosave_timeout_id)
     autosave_timeout_id = -1
 
 def do_autosave():
+    if editorpersistance.prefs.journaled_autosave == True:
+        autosavejournal.save(editorstate.PROJECT())
+        return True
+
     autosave_file = userfolders.get_cache_dir() + get_instance_autosave_file()
     persistance.save_project(editorstate.PROJECT(), autosave_file)
     return True
@@ -1058,6 +1077,7 @@ def _shutdown_dialog_callback(dialog, response_id, no_dialog_shutdown=False):
     stop_autosave()
 
     tlinerender.delete_session()
+    renderworkers.shutdown() # Jobs already started in workers keep running in their own processes.
 
     clipeffectseditor.shutdown_polling()
     compositeeditor.shutdown_polling()
@@ -1103,6 +1123,7 @@ def _app_destroy():
     # Delete autosave file
     try:
         os.remove(userfolders.get_cache_dir() + get_instance_autosave_file())
+        autosavejournal.delete_files(userfolders.get_cache_dir() + get_instance_autosave_file())
     except:
         print("Delete autosave file FAILED!")
 
@@ -24,14 +24,13 @@ Modules handles creating and caching audio waveform images for clips.
 
 import mlt
 import os
-import pickle
 import threading
 import time
 
 from gi.repository import Gtk, Gdk
 
 import appconsts
-import atomicfile
+import audiowaveformrenderer
 import dialogutils
 from editorstate import PROJECT
 import gui
@@ -62,7 +61,7 @@ def set_waveform_displayer_clip_from_popup(data):
 
     cache_file_path = userfolders.get_cache_dir() + appconsts.AUDIO_LEVELS_DIR + _get_unique_name_for_media(clip.path)
     if os.path.isfile(cache_file_path):
-        frame_levels = utils.unpickle(cache_file_path)
+        frame_levels = audiowaveformrenderer.load_levels_file(cache_file_path)
         frames_cache[clip.path] = frame_levels
         clip.waveform_data = frame_levels
         updater.repaint_tline()
@@ -147,10 +146,9 @@ class WaveformCreator(threading.Thread):
                 time.sleep(0.1)
 
         if not self.abort:
-            self.clip.waveform_data = frame_levels
-            with atomicfile.AtomicFileWriter(self.file_cache_path, "wb") as afw:
-                write_file = afw.get_file()
-                pickle.dump(frame_levels, write_file)
+            audiowaveformrenderer.write_levels_files(self.file_cache_path, frame_levels)
+            self.clip.waveform_data = audiowaveformrenderer.load_levels_file(self.file_cache_path)
+            frames_cache[self.clip.path] = self.clip.waveform_data
 
             Gdk.threads_enter()
             self.dialog.progress_bar.set_fraction(1.0)
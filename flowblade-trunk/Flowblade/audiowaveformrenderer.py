@@ -24,11 +24,15 @@ Modules handles creating and caching audio waveform images for clips.
 
 import locale
 import mlt
+import multiprocessing
+import numpy
 import os
-import pickle
+import queue
+import struct
 import subprocess
 import sys
 import threading
+import time
 
 import gi
 gi.require_version('Gdk', '3.0') 
@@ -38,14 +42,9 @@ import appconsts
 import atomicfile
 import editorpersistance
 import editorstate
-import mltenv
 import mltprofiles
-import mlttransitions
-import mltfilters
 import processutils
-import renderconsumer
 import respaths
-import translations
 import updater
 import userfolders
 import utils
@@ -54,8 +53,33 @@ LEFT_CHANNEL = "_audio_level.0"
 RIGHT_CHANNEL = "_audio_level.1"
 
 FILE_SEPARATOR = "#&#file:"
+FILE_COMPLETED_MSG = "#&#levels_file_completed:" # Render process writes this + media file path to stdout when levels file is ready
 
-_waveforms = {} # Memory cache for waveform data
+WORKER_FILE_COMPLETED = 0
+WORKER_FILE_FAILED = 1
+WORKER_EXITED = 2
+
+WORKER_JOIN_TIMEOUT = 5.0
+
+PEAKS_MAX_LEVELS = 16 # Level n has 2^n frames per bucket
+PEAKS_MAX_BUCKET_PIX = 2.0 # Widest drawn bucket in pixels
+
+# Levels file format: header followed by level 0 values and mins and maxs arrays for every peaks level after that.
+# Version 1 files have same layout, version 2 files have only maxs arrays and are rewritten from their level 0 values on load.
+# Files without header are pickled lists of floats written by earlier versions.
+LEVELS_FILE_MAGIC = b"FBAL"
+LEVELS_FILE_VERSION = 3
+MAXS_ONLY_LEVELS_FILE_VERSION = 2
+LEVELS_FILE_HEADER = struct.Struct("<4sHBBQ") # magic, version, sample type, peaks levels count, frames count
+
+SAMPLE_TYPE_FLOAT32 = 0
+SAMPLE_TYPE_UINT8 = 1
+LEVELS_FILE_SAMPLE_TYPE = SAMPLE_TYPE_UINT8
+
+_sample_dtypes = {SAMPLE_TYPE_FLOAT32:numpy.float32, SAMPLE_TYPE_UINT8:numpy.uint8}
+_sample_scales = {SAMPLE_TYPE_FLOAT32:1.0, SAMPLE_TYPE_UINT8:1.0 / 255.0}
+
+_waveforms = {} # Memory cache for waveform data, path -> AudioLevelsData
 _queued_waveform_renders = [] # Media queued for render during one timeline repaint
 _render_already_requested = [] # Files that have been sent to rendering since last project load
 
@@ -82,14 +106,144 @@ def get_waveform_data(clip):
     if os.path.isfile(levels_file_path):
         if os.path.getsize(levels_file_path) == 0:
              print( "Size zero Audio levels file, this is error!", levels_file_path)
-        waveform = utils.unpickle(levels_file_path)
+        waveform = load_levels_file(levels_file_path)
         _waveforms[clip.path] = waveform
         return waveform
     else:
         global _queued_waveform_renders
         _queued_waveform_renders.append(clip.path)
         return None
+
+def get_waveform_levels_data(clip):
+    # Returns AudioLevelsData for clip that has waveform data.
+    if not isinstance(clip.waveform_data, AudioLevelsData):
+        # Waveform data for clip may be a list of levels not loaded from levels file.
+        frame_levels = [val if val != None else 0.0 for val in clip.waveform_data]
+        clip.waveform_data = AudioLevelsData(create_peaks(frame_levels), 1.0)
+    return clip.waveform_data
+
+
+# ------------------------------------------------- levels files
+def write_levels_files(levels_file_path, frame_levels):
+    levels = numpy.asarray(frame_levels, dtype=numpy.float32)
+    peaks_levels = create_peaks(levels)
+    dtype = _sample_dtypes[LEVELS_FILE_SAMPLE_TYPE]
+
+    with atomicfile.AtomicFileWriter(levels_file_path, "wb") as afw:
+        write_file = afw.get_file()
+        write_file.write(LEVELS_FILE_HEADER.pack(LEVELS_FILE_MAGIC, LEVELS_FILE_VERSION, LEVELS_FILE_SAMPLE_TYPE, 
+                                                 len(peaks_levels), len(levels)))
+        for level_index in range(0, len(peaks_levels)):
+            mins, maxs = peaks_levels[level_index]
+            if level_index > 0: # level 0 mins and maxs are both frame levels
+                write_file.write(_get_samples(mins, dtype).tobytes())
+            write_file.write(_get_samples(maxs, dtype).tobytes())
+
+def load_levels_file(levels_file_path):
+    header_bytes = _read_levels_file_header(levels_file_path)
+
+    if len(header_bytes) < LEVELS_FILE_HEADER.size or header_bytes[0:len(LEVELS_FILE_MAGIC)] != LEVELS_FILE_MAGIC:
+        # Levels file from earlier version, convert it to current format so that next load can use memory mapping.
+        frame_levels = utils.unpickle(levels_file_path)
+        write_levels_files(levels_file_path, frame_levels)
+        header_bytes = _read_levels_file_header(levels_file_path)
+
+    magic, version, sample_type, levels_count, frames_count = LEVELS_FILE_HEADER.unpack(header_bytes)
+    if version > LEVELS_FILE_VERSION:
+        raise ValueError("Audio levels file version " + str(version) + " not supported, " + levels_file_path)
+
+    if frames_count > 0:
+        samples = numpy.memmap(levels_file_path, dtype=_sample_dtypes[sample_type], mode="r", offset=LEVELS_FILE_HEADER.size)
+    else:
+        samples = numpy.zeros(0, dtype=_sample_dtypes[sample_type]) # zero length files cannot be memory mapped
+
+    if version == MAXS_ONLY_LEVELS_FILE_VERSION:
+        # Version 2 file has no mins arrays, level 0 is still frame levels so rewrite file from that.
+        frame_levels = samples[0:frames_count] * _sample_scales[sample_type]
+        del samples
+        write_levels_files(levels_file_path, frame_levels)
+        return load_levels_file(levels_file_path)
+
+    levels = []
+    offset = 0
+    count = frames_count
+    for level_index in range(0, levels_count):
+        if level_index == 0:
+            maxs = samples[offset:offset + count]
+            mins = maxs
+            offset += count
+        else:
+            mins = samples[offset:offset + count]
+            maxs = samples[offset + count:offset + 2 * count]
+            offset += 2 * count
+        levels.append((mins, maxs))
+        count = (count + 1) // 2
+
+    return AudioLevelsData(levels, _sample_scales[sample_type])
+
+def _read_levels_file_header(levels_file_path):
+    with open(levels_file_path, "rb") as f:
+        return f.read(LEVELS_FILE_HEADER.size)
+
+def _get_samples(values, dtype):
+    if dtype == numpy.uint8:
+        return numpy.rint(numpy.clip(values, 0.0, 1.0) * 255.0).astype(numpy.uint8)
+    else:
+        return values.astype(dtype)
+
+
+# ------------------------------------------------- peaks
+def create_peaks(frame_levels):
+    # Returns list of (mins, maxs) arrays tuples, level n has 2^n frames per bucket.
+    levels_array = numpy.asarray(frame_levels, dtype=numpy.float32)
+    mins = levels_array
+    maxs = levels_array
+    levels = [(mins, maxs)]
+    while len(maxs) > 1 and len(levels) < PEAKS_MAX_LEVELS:
+        mins, maxs = _get_reduced_peaks_level(mins, maxs)
+        levels.append((mins, maxs))
+
+    return levels
+
+def _get_reduced_peaks_level(mins, maxs):
+    # Every bucket in new level combines two consecutive buckets in given level.
+    pairs_count = len(maxs) // 2
+    new_mins = numpy.minimum(mins[0:pairs_count * 2:2], mins[1:pairs_count * 2:2])
+    new_maxs = numpy.maximum(maxs[0:pairs_count * 2:2], maxs[1:pairs_count * 2:2])
+    if len(maxs) % 2 == 1:
+        new_mins = numpy.append(new_mins, mins[-1])
+        new_maxs = numpy.append(new_maxs, maxs[-1])
+    return (new_mins, new_maxs)
+
+
+class AudioLevelsData:
+    """
+    Audio levels for clip.waveform_data as min/max peaks pyramid, backed by memory mapped levels file samples.
     
+    Level 0 has one value per frame, and every level after that has half as many buckets
+    as previous level, so drawing cost depends on drawn width in pixels and not on clip length.
+    """
+    def __init__(self, levels, value_scale):
+        self.levels = levels # list of (mins, maxs) arrays tuples, level n has 2^n frames per bucket
+        self.value_scale = value_scale # multiplier to get level values in range 0 - 1 from stored samples
+        mins, self.frame_levels = levels[0]
+
+    def __getitem__(self, frame):
+        return float(self.frame_levels[frame]) * self.value_scale
+
+    def __len__(self):
+        return len(self.frame_levels)
+
+    def get_level(self, pix_per_frame):
+        # Returns (frames_per_bucket, mins, maxs) for level with widest buckets not wider then PEAKS_MAX_BUCKET_PIX.
+        level = 0
+        while level < len(self.levels) - 1 and (2 ** (level + 1)) * pix_per_frame <= PEAKS_MAX_BUCKET_PIX:
+            level += 1
+
+        mins, maxs = self.levels[level]
+        return (2 ** level, mins, maxs)
+
+
 # ------------------------------------------------- launching render
 def launch_queued_renders():
     # Render files that were not found when timeline was displayed
@@ -142,7 +296,18 @@ class AudioRenderLaunchThread(threading.Thread):
         # Sep-2018 - SvdB - Added self. to be able to access the thread through 'process'
         self.process = subprocess.Popen([sys.executable, respaths.LAUNCH_DIR + "flowbladeaudiorender", \
                   self.rendered_media, self.profile_desc, respaths.ROOT_PATH], \
-                  stdin=FLOG, stdout=FLOG, stderr=FLOG)
+                  stdin=FLOG, stdout=subprocess.PIPE, stderr=FLOG, universal_newlines=True)
+
+        # Repaint timeline as each levels file is completed so that waveforms appear without waiting for all files.
+        for line in self.process.stdout:
+            if line.startswith(FILE_COMPLETED_MSG):
+                Gdk.threads_enter()
+                updater.repaint_tline()
+                Gdk.threads_leave()
+            else:
+                FLOG.write(line)
+                FLOG.flush()
+
         self.process.wait()
         
         Gdk.threads_enter()
@@ -155,22 +320,12 @@ def main():
     # Set paths.
     root_path = sys.argv[3]
     respaths.set_paths(root_path)
-
-    try:
-        editorstate.mlt_version = mlt.LIBMLT_VERSION
-    except:
-        editorstate.mlt_version = "0.0.99" # magic string for "not found"
     
     # Set folders paths
     userfolders.init()
     
-    # Load editor prefs and list of recent projects
+    # Load editor prefs
     editorpersistance.load()
-    
-    # Init translations module with translations data
-    translations.init_languages()
-    translations.load_filters_translations()
-    mlttransitions.init_module()
 
     repo = mlt.Factory().init()
     processutils.prepare_mlt_repo(repo)
@@ -178,69 +333,112 @@ def main():
     # Set numeric locale to use "." as radix, MLT initilizes this to OS locale and this causes bugs 
     locale.setlocale(locale.LC_NUMERIC, 'C')
 
-    # Check for codecs and formats on the system
-    mltenv.check_available_features(repo)
-    renderconsumer.load_render_profiles()
-
-    # Load filter and compositor descriptions from xml files.
-    mltfilters.load_filters_xml(mltenv.services)
-    mlttransitions.load_compositors_xml(mltenv.transitions)
-
     # Create list of available mlt profiles
     mltprofiles.load_profile_list()
 
     profile_desc = sys.argv[2]
-    profile = mltprofiles.get_profile(profile_desc)
         
     files_paths = sys.argv[1]
     files_paths = files_paths.lstrip(FILE_SEPARATOR)
     
     files = files_paths.split(FILE_SEPARATOR)
 
-    for f in files:
-       t = WaveformCreator(f, profile_desc)
-       t.start()
-       t.join()
-
+    start_time = time.monotonic()
 
-class WaveformCreator(threading.Thread):    
-    def __init__(self, clip_path, profile_desc):
-        threading.Thread.__init__(self)
-        self.clip_path = clip_path
-        profile = mltprofiles.get_profile(profile_desc)
-        self.temp_clip = self._get_temp_producer(clip_path, profile)
-        self.file_cache_path =_get_levels_file_path(clip_path, profile)
-        self.last_rendered_frame = 0
-
-    def run(self):
-        frame_levels = [None] * self.clip_media_length 
+    # Files are given out to worker processes from a shared queue, each worker renders one file at a time.
+    mp_context = multiprocessing.get_context("spawn")
+    files_queue = mp_context.Queue()
+    for f in files:
+        files_queue.put(f)
+    status_queue = mp_context.Queue()
+    
+    render_processes = min(_get_render_processes_count(), len(files))
+    workers = []
+    for i in range(0, render_processes):
+        worker = mp_context.Process(target=_levels_render_worker, 
+                                    args=(root_path, i, profile_desc, files_queue, status_queue))
+        worker.start()
+        workers.append(worker)
+
+    running_workers = len(workers)
+    while running_workers > 0:
+        try:
+            msg_type, value = status_queue.get(timeout=0.5)
+        except queue.Empty:
+            # Workers that crash do not send exit messages.
+            running_workers = len([w for w in workers if w.is_alive()])
+            continue
 
-        for frame in range(0, len(frame_levels)):
-            self.temp_clip.seek(frame)
-            mlt.frame_get_waveform(self.temp_clip.get_frame(), 10, 50)
-            val = self.levels.get(RIGHT_CHANNEL)
-            if val == None:
-                val = 0.0
-            frame_levels[frame] = float(val)
-            self.last_rendered_frame = frame
+        if msg_type == WORKER_FILE_COMPLETED:
+            print(FILE_COMPLETED_MSG + value, flush=True)
+        elif msg_type == WORKER_FILE_FAILED:
+            print("audio levels render failed for", value, flush=True)
+        elif msg_type == WORKER_EXITED:
+            running_workers -= 1
 
-        with atomicfile.AtomicFileWriter(self.file_cache_path, "wb") as afw:
-            write_file = afw.get_file()
-            pickle.dump(frame_levels, write_file)
+    for worker in workers:
+        worker.join(WORKER_JOIN_TIMEOUT)
+        if worker.is_alive():
+            worker.terminate()
 
-    def _get_temp_producer(self, clip_path, profile):
-        temp_producer = mlt.Producer(profile, str(clip_path))
-        channels = mlt.Filter(profile, "audiochannels")
-        converter = mlt.Filter(profile, "audioconvert")
-        self.levels = mlt.Filter(profile, "audiolevel")
-        temp_producer.attach(channels)
-        temp_producer.attach(converter)
-        temp_producer.attach(self.levels)
-        temp_producer.path = clip_path
-        self.clip_media_length = temp_producer.get_length()
+    print("audio levels render done, files:", len(files), "processes:", render_processes, "time:", time.monotonic() - start_time, flush=True)
 
-        return temp_producer
+def _get_render_processes_count():
+    # Leave one core for the editor, decoding is mostly single threaded so one file per core is used.
+    return max(1, multiprocessing.cpu_count() - 1)
 
+def _levels_render_worker(root_path, worker_index, profile_desc, files_queue, status_queue):
+    # This is run in a separate process, only MLT and profiles are initialized here.
+    respaths.set_paths(root_path)
+    userfolders.init()
 
+    repo = mlt.Factory().init()
+    processutils.prepare_mlt_repo(repo)
+    locale.setlocale(locale.LC_NUMERIC, 'C')
 
+    mltprofiles.load_profile_list()
+    profile = mltprofiles.get_profile(profile_desc)
 
+    while True:
+        try:
+            clip_path = files_queue.get_nowait()
+        except queue.Empty:
+            break
+
+        try:
+            render_levels_file(clip_path, profile)
+            status_queue.put((WORKER_FILE_COMPLETED, clip_path))
+        except Exception as e:
+            print("audio levels render error:", clip_path, e)
+            status_queue.put((WORKER_FILE_FAILED, clip_path))
+
+    status_queue.put((WORKER_EXITED, worker_index))
+
+def render_levels_file(clip_path, profile):
+    levels_producer, levels_filter = _get_levels_producer(clip_path, profile)
+    clip_media_length = levels_producer.get_length()
+    frame_levels = [0.0] * clip_media_length
+
+    # Media is decoded in one sequential pass, producer position advances by one frame
+    # on each get_frame() call when speed is 1, so no seeks are needed after the first one.
+    levels_producer.seek(0)
+    levels_producer.set_speed(1.0)
+    for frame in range(0, clip_media_length):
+        mlt.frame_get_waveform(levels_producer.get_frame(), 10, 50)
+        val = levels_filter.get(RIGHT_CHANNEL)
+        if val == None:
+            val = 0.0
+        frame_levels[frame] = float(val)
+
+    write_levels_files(_get_levels_file_path(clip_path, profile), frame_levels)
+
+def _get_levels_producer(clip_path, profile):
+    levels_producer = mlt.Producer(profile, str(clip_path))
+    channels = mlt.Filter(profile, "audiochannels")
+    converter = mlt.Filter(profile, "audioconvert")
+    levels_filter = mlt.Filter(profile, "audiolevel")
+    levels_producer.attach(channels)
+    levels_producer.attach(converter)
+    levels_producer.attach(levels_filter)
+
+    return (levels_producer, levels_filter)
@@ -0,0 +1,240 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <http://code.google.com/p/flowblade>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+"""
+Module handles journaled autosave.
+
+Full snapshot of project is written only when autosave is started and after every
+JOURNAL_RECORDS_PER_SNAPSHOT journal records. Between snapshots, autosaves append records
+to a journal file next to snapshot. A record contains project data without media files and
+sequences, and only the media files and sequences that have changed since the previous autosave.
+
+Changes are tracked with projectchanges.ChangeTracker. Autosave does nothing if nothing has changed. Snapshot and journal files are written in a writer thread.
+
+Before an autosave is loaded for crash recovery, replay() applies journal records to
+snapshot and writes the result back into snapshot file as a normal project file.
+"""
+
+import os
+import pickle
+import queue
+import threading
+
+import atomicfile
+import persistance
+import projectchanges
+import utils
+
+JOURNAL_FILE_EXTENSION = ".journal"
+JOURNAL_RECORDS_PER_SNAPSHOT = 20
+
+# Journal record keys
+RECORD_PROJECT = "project" # pickled project without media files and sequences
+RECORD_MEDIA_IDS = "media_ids" # ids of all media files in project
+RECORD_MEDIA = "media" # media file id -> pickled media file, changed media files only
+RECORD_SEQUENCE_COUNT = "sequence_count"
+RECORD_SEQUENCES = "sequences" # sequence index -> pickled sequence, changed sequences only
+
+_autosave_file = None
+_records_since_snapshot = 0
+
+# Changes since last autosave, so unchanged project parts are not copied or pickled and ticks with no changes do nothing.
+_changes = projectchanges.ChangeTracker()
+projectchanges.add_tracker(_changes)
+
+_write_queue = None
+_writer_thread = None
+
+
+# --------------------------------------------------------------- autosave interface
+def start(project, autosave_file):
+    # Writes full snapshot and starts new journal.
+    global _autosave_file, _records_since_snapshot
+    _autosave_file = autosave_file
+    _records_since_snapshot = 0
+
+    snapshot_data = pickle.dumps(persistance.get_p_project(project))
+    _changes.clear(project)
+    _write(_write_snapshot, autosave_file, snapshot_data)
+
+def save(project):
+    global _records_since_snapshot
+    if _autosave_file == None:
+        return
+
+    if _changes.has_changes() == False:
+        return # Nothing changed since last autosave.
+
+    if _records_since_snapshot >= JOURNAL_RECORDS_PER_SNAPSHOT:
+        start(project, _autosave_file)
+        return
+
+    # Sequences are saved by index, so sequences that moved in list are saved too.
+    sequence_indexes = []
+    for i in range(0, len(project.sequences)):
+        seq = project.sequences[i]
+        if _changes.is_sequence_changed(seq) or _changes.get_saved_sequence_index(seq) != i:
+            sequence_indexes.append(i)
+
+    media_ids = []
+    for media_id in project.media_files.keys():
+        if _changes.is_media_changed(media_id):
+            media_ids.append(media_id)
+
+    s_proj, media_files, sequences = persistance.get_p_project_sections(project, media_ids, sequence_indexes)
+
+    record = {}
+    record[RECORD_PROJECT] = pickle.dumps(s_proj)
+    record[RECORD_MEDIA_IDS] = list(project.media_files.keys())
+    record[RECORD_MEDIA] = {}
+    for media_id, s_media_file in media_files.items():
+        record[RECORD_MEDIA][media_id] = pickle.dumps(s_media_file)
+    record[RECORD_SEQUENCE_COUNT] = len(project.sequences)
+    record[RECORD_SEQUENCES] = {}
+    for i, s_seq in sequences.items():
+        record[RECORD_SEQUENCES][i] = pickle.dumps(s_seq)
+
+    _changes.clear(project)
+    _records_since_snapshot += 1
+    _write(_append_record, _autosave_file, record)
+
+def stop():
+    # Waits until pending writes are done so that autosave files can be deleted or loaded after this.
+    global _autosave_file
+    _autosave_file = None
+    if _write_queue != None:
+        _write_queue.join()
+
+def get_journal_path(autosave_file):
+    return autosave_file + JOURNAL_FILE_EXTENSION
+
+def delete_files(autosave_file):
+    for path in (autosave_file, get_journal_path(autosave_file)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# --------------------------------------------------------------- writing
+def _write(write_func, autosave_file, data):
+    global _write_queue, _writer_thread
+    if _writer_thread == None:
+        _write_queue = queue.Queue()
+        _writer_thread = JournalWriterThread(_write_queue)
+        _writer_thread.start()
+
+    _write_queue.put((write_func, autosave_file, data))
+
+
+class JournalWriterThread(threading.Thread):
+
+    def __init__(self, write_queue):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.write_queue = write_queue
+
+    def run(self):
+        while True:
+            write_func, autosave_file, data = self.write_queue.get()
+            try:
+                write_func(autosave_file, data)
+            except Exception as e:
+                print("Autosave write failed:", e)
+            self.write_queue.task_done()
+
+def _write_snapshot(autosave_file, snapshot_data):
+    with atomicfile.AtomicFileWriter(autosave_file, "wb") as afw:
+        outfile = afw.get_file()
+        outfile.write(snapshot_data)
+
+    # Journal records are relative to previous snapshot.
+    journal_path = get_journal_path(autosave_file)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
+
+def _append_record(autosave_file, record):
+    with open(get_journal_path(autosave_file), "ab") as journal_file:
+        pickle.dump(record, journal_file)
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
+
+
+# --------------------------------------------------------------- crash recovery
+def replay(autosave_file):
+    """
+    Applies journal records to snapshot and writes result as project file at autosave_file path.
+    """
+    journal_path = get_journal_path(autosave_file)
+    if not os.path.exists(journal_path):
+        return
+
+    try:
+        _replay_journal(autosave_file, journal_path)
+    except Exception as e:
+        print("Autosave journal replay failed, loading snapshot only:", e)
+
+def _replay_journal(autosave_file, journal_path):
+    s_proj = utils.unpickle(autosave_file)
+    records_count = 0
+    with open(journal_path, "rb") as journal_file:
+        while True:
+            try:
+                record = pickle.load(journal_file)
+            except EOFError:
+                break
+            except Exception as e:
+                # Last record may be partially written if app crashed during write.
+                print("Autosave journal replay stopped at broken record:", e)
+                break
+
+            s_proj = _apply_record(s_proj, record)
+            records_count += 1
+
+    print("Autosave journal replayed, " + str(records_count) + " records.")
+
+    with atomicfile.AtomicFileWriter(autosave_file, "wb") as afw:
+        outfile = afw.get_file()
+        pickle.dump(s_proj, outfile)
+    os.remove(journal_path)
+
+def _apply_record(s_proj, record):
+    if record[RECORD_PROJECT] != None:
+        new_s_proj = pickle.loads(record[RECORD_PROJECT])
+        new_s_proj.media_files = s_proj.media_files
+        new_s_proj.sequences = s_proj.sequences
+        s_proj = new_s_proj
+
+    media_files = {}
+    for media_id in record[RECORD_MEDIA_IDS]:
+        if media_id in record[RECORD_MEDIA]:
+            media_files[media_id] = pickle.loads(record[RECORD_MEDIA][media_id])
+        else:
+            media_files[media_id] = s_proj.media_files[media_id]
+    s_proj.media_files = media_files
+
+    sequences = []
+    for i in range(0, record[RECORD_SEQUENCE_COUNT]):
+        if i in record[RECORD_SEQUENCES]:
+            sequences.append(pickle.loads(record[RECORD_SEQUENCES][i]))
+        else:
+            sequences.append(s_proj.sequences[i])
+    s_proj.sequences = sequences
+
+    return s_proj
@@ -43,6 +43,7 @@ import gui
 import guicomponents
 import guiutils
 import mltfilters
+import projectchanges
 import propertyedit
 import propertyeditorbuilder
 import respaths
@@ -989,6 +990,8 @@ class PropertyChangePollingThread(threading.Thread):
                 if changed:
                     global filter_changed_since_last_save
                     filter_changed_since_last_save = True
+                    projectchanges.sequence_changed(editorstate.current_sequence())
+                    edit.clip_content_changed(_filter_stack.clip)
                     tlinerender.get_renderer().timeline_changed()
 
                 self.last_properties = new_properties
@@ -53,6 +53,7 @@ import kftoolmode
 import mlttransitions
 import modesetting
 import movemodes
+import projectchanges
 import syncsplitevent
 import tlinewidgets
 import tlineaction
@@ -178,6 +179,7 @@ def _rename_clip_edited(dialog, response_id, data):
         return
 
     clip.name = new_text
+    projectchanges.sequence_changed(current_sequence())
     updater.repaint_tline()
 
 def _clip_color(data):
@@ -197,6 +199,7 @@ def _clip_color(data):
     elif clip_color == "olive":
         clip.color = (0.5, 0.55, 0.5)
 
+    projectchanges.sequence_changed(current_sequence())
     updater.repaint_tline()
 
 def open_selection_in_effects():
@@ -610,6 +613,7 @@ def _clip_marker_add_dialog_callback(dialog, response_id, name_entry, data):
 
     clip.markers.append((name, clip_frame))
     clip.markers = sorted(clip.markers, key=itemgetter(1))
+    projectchanges.sequence_changed(current_sequence())
     updater.repaint_tline()
 
 def _go_to_clip_marker(data):
@@ -636,11 +640,13 @@ def _delete_clip_marker(data):
             mrk_index = i
     if mrk_index != -1:
         clip.markers.pop(mrk_index)
+        projectchanges.sequence_changed(current_sequence())
         updater.repaint_tline()
 
 def _delete_all_clip_markers(data):
     clip, track, item_id, item_data = data
     clip.markers = []
+    projectchanges.sequence_changed(current_sequence())
     updater.repaint_tline()
 
 def _volume_keyframes(data):
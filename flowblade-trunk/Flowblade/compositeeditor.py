@@ -44,6 +44,7 @@ from editorstate import PROJECT
 import editorpersistance
 import keyframeeditor
 import mlttransitions
+import projectchanges
 import propertyeditorbuilder
 import propertyedit
 import propertyparse
@@ -401,6 +402,7 @@ class PropertyChangePollingThread(threading.Thread):
                 if changed:
                     global compositor_changed_since_last_save
                     compositor_changed_since_last_save = True
+                    projectchanges.sequence_changed(current_sequence())
                     tlinerender.get_renderer().timeline_changed()
 
                 self.last_properties = new_properties
@@ -51,6 +51,7 @@ import jobs
 import mltprofiles
 import mltxmlheadless
 import renderconsumer
+import renderworkers
 import rendergui
 import respaths
 import simpleeditors
@@ -189,6 +190,7 @@ class AbstractContainerActionObject:
         self.launch_render_data = (clip, frame, frame, frame_start_offset)
 
         job_proxy = self.get_launch_job_proxy()
+        job_proxy.priority = jobs.PRIORITY_HIGH # User is waiting to see preview.
         jobs.add_job(job_proxy)
 
     def start_render(self):
@@ -229,6 +231,10 @@ class AbstractContainerActionObject:
         id_md_str = str(self.container_data.container_clip_uid) + str(self.container_data.container_type) + self.container_data.program + self.container_data.unrendered_media #
         return hashlib.md5(id_md_str.encode('utf-8')).hexdigest() 
 
+    def get_session_id(self):
+        # Render session is identified by container program, see _launch_render() methods.
+        return self.get_container_program_id()
+
     def get_container_thumbnail_path(self):
         return userfolders.get_cache_dir() + appconsts.THUMBNAILS_DIR + "/" + self.get_container_program_id() +  ".png"
     
@@ -507,7 +513,7 @@ class GMicContainerActions(AbstractContainerActionObject):
         for arg in args:
             command_list.append(arg)
 
-        subprocess.Popen(command_list)
+        renderworkers.launch_job(command_list)
         
     def update_render_status(self):
         
@@ -637,7 +643,7 @@ class MLTXMLContainerActions(AbstractContainerActionObject):
         for arg in args:
             command_list.append(arg)
 
-        subprocess.Popen(command_list)
+        renderworkers.launch_job(command_list)
 
     def update_render_status(self):
 
@@ -797,7 +803,7 @@ class BlenderContainerActions(AbstractContainerActionObject):
         for arg in args:
             command_list.append(arg)
 
-        subprocess.Popen(command_list)
+        renderworkers.launch_job(command_list)
         
     def _write_exec_lines_for_obj_type(self, render_exec_lines, obj_type):
         objects = self.blender_project_objects(obj_type)
@@ -43,6 +43,7 @@ import userfolders
 import utils
 
 _blender_available = False
+_blender_tested = False
 
 ROW_WIDTH = 300
 FALLBACK_THUMB = "fallback_thumb.png"
@@ -102,7 +103,8 @@ class ContainerClipData:
 
 # ------------------------------------------------------- testing availebility on statrt up
 def test_blender_availebility():
-    global _blender_available
+    global _blender_available, _blender_tested
+    _blender_tested = True
     if os.path.exists("/usr/bin/blender") == True:
         _blender_available = True
     elif editorstate.app_running_from == editorstate.RUNNING_FROM_FLATPAK:
@@ -116,6 +118,8 @@ def test_blender_availebility():
             _blender_available = True
         """
 def blender_available():
+    if _blender_tested == False:
+        test_blender_availebility()
     return _blender_available
             
 
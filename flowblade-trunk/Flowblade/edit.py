@@ -54,6 +54,14 @@ do_gui_update = False
 # Flag for doing edits since last save
 edit_done_since_last_save = False
 
+# Ids of tracks and clips changed by edits since timeline rendering last asked for them
+# with get_and_clear_changed_ids(). Timeline rendering uses these to only re-hash changed content.
+_changed_track_ids = set()
+_changed_clip_ids = set()
+
+# Ids of tracks changed since blanks were last consolidated, only these tracks can have consecutive blanks.
+_blanks_dirty_track_ids = set()
+
 
 # ---------------------------------- atomic edit ops
 def append_clip(track, clip, clip_in, clip_out):
@@ -65,6 +73,7 @@ def append_clip(track, clip, clip_in, clip_out):
     track.clips.append(clip) # py
     track.append(clip, clip_in, clip_out) # mlt
     resync.clip_added_to_timeline(clip, track)
+    _track_changed(track)
 
 def _insert_clip(track, clip, index, clip_in, clip_out):
     """
@@ -75,6 +84,7 @@ def _insert_clip(track, clip, index, clip_in, clip_out):
     track.clips.insert(index, clip) # py
     track.insert(clip, index, clip_in, clip_out) # mlt
     resync.clip_added_to_timeline(clip, track)
+    _track_changed(track)
 
 def _insert_blank(track, index, length):
     track.insert_blank(index, length - 1) # end inclusive
@@ -84,6 +94,7 @@ def _insert_blank(track, index, length):
     blank_clip.clip_out = length - 1 # -1, end inclusive
     blank_clip.is_blanck_clip = True
     track.clips.insert(index, blank_clip)
+    _track_changed(track)
     
 def _remove_clip(track, index):
     """
@@ -92,6 +103,7 @@ def _remove_clip(track, index):
     track.remove(index)
     clip = track.clips.pop(index)
     resync.clip_removed_from_timeline(clip)
+    _track_changed(track)
     
     return clip
 
@@ -131,6 +143,7 @@ def _add_blank_to_py(track, index, length):
     blank_clip.clip_out = length - 1 # -1, end inclusive
     blank_clip.is_blanck_clip = True
     track.clips.insert(index, blank_clip)
+    _track_changed(track)
     return blank_clip
 
 # --------------------------------- util methods
@@ -142,6 +155,33 @@ def _set_in_out(clip, c_in, c_out):
     clip.clip_out = c_out
     clip.set_in_and_out(c_in, c_out)
     
+def _track_changed(track):
+    _changed_track_ids.add(track.id)
+    _blanks_dirty_track_ids.add(track.id)
+    resync.clip_positions_changed()
+
+def _clips_changed(self):
+    # Edit actions changing clip contents but not track structure, e.g. filter edits, 
+    # have edited clip/s as data attrs "clip" or "clips".
+    if hasattr(self, "clip") and self.clip != None:
+        _changed_clip_ids.add(self.clip.id)
+    if hasattr(self, "clips") and self.clips != None:
+        for clip in self.clips:
+            _changed_clip_ids.add(clip.id)
+
+def clip_content_changed(clip):
+    """
+    Called when clip contents are changed outside edit actions, e.g. filter property edits.
+    """
+    _changed_clip_ids.add(clip.id)
+
+def get_and_clear_changed_ids():
+    global _changed_track_ids, _changed_clip_ids
+    changed = (_changed_track_ids, _changed_clip_ids)
+    _changed_track_ids = set()
+    _changed_clip_ids = set()
+    return changed
+
 def _clip_length(clip): # check if can be removed
     return clip.clip_out - clip.clip_in + 1 # +1, end inclusive
 
@@ -193,10 +233,12 @@ def _create_mute_volume_filter(seq):
     
 def _do_clip_mute(clip, volume_filter):
     mltfilters.do_clip_mute(clip, volume_filter)
+    clip_content_changed(clip) # Muted clip may not be edit action "clip" attr, e.g. audio splice parent clip.
 
 def _do_clip_unmute(clip):
     clip.detach(clip.mute_filter.mlt_filter)
     clip.mute_filter = None
+    clip_content_changed(clip)
 
 def _remove_consecutive_blanks(track, index):
     lengths = []
@@ -378,6 +420,7 @@ class EditAction:
         _consolidate_all_blanks_undo(self)
     
         self.undo_func(self)
+        _clips_changed(self)
 
         _remove_all_trailing_blanks(None)
 
@@ -411,6 +454,7 @@ class EditAction:
         movemodes.clear_selected_clips() # selection is not valid after a change in sequence
 
         self.redo_func(self)
+        _clips_changed(self)
 
         _consolidate_all_blanks_redo(self)
         _remove_trailing_blanks_redo(self)
@@ -2599,35 +2643,34 @@ def _consolidate_all_blanks_undo(self):
             _insert_blank(track, index + i, length)
         
 def _consolidate_all_blanks_redo(self):
+    # Only tracks changed since last consolidation are consolidated, other tracks cannot have consecutive blanks.
+    dirty_track_ids = sorted(_blanks_dirty_track_ids)
+
     self.consolidate_actions = []
-    for i in range(1, len(current_sequence().tracks) - 1): # -1 because hidden track, 1 because black track
-        track = current_sequence().tracks[i]
-        consolidaded_indexes = []
-        try_do_next = True
-        while(try_do_next == True):
-            if len(track.clips) == 0:
-                try_do_next = False
-            for i in range(0, len(track.clips)):
-                if i == len(track.clips) - 1:
-                    try_do_next = False
-                clip = track.clips[i]
-                if clip.is_blanck_clip == False:
-                    continue
-                try:
-                    consolidaded_indexes.index(i)
-                    continue
-                except:
-                    pass
-
-                # Now consolidate from clip in index i
-                consolidaded_indexes.append(i)
-                removed_lengths = _remove_consecutive_blanks(track, i)
-                total_length = 0
-                for length in removed_lengths:
-                    total_length = total_length + length
-                _insert_blank(track, i, total_length)
-                self.consolidate_actions.append((track, i, removed_lengths))
-                break
+    for track_id in dirty_track_ids:
+        if track_id < 1 or track_id > len(current_sequence().tracks) - 2: # -2 because hidden track, 1 because black track
+            continue
+        track = current_sequence().tracks[track_id]
+        _consolidate_track_blanks(track, self.consolidate_actions)
+    
+    # Consolidating marks tracks dirty again, but they have now been consolidated.
+    _blanks_dirty_track_ids.difference_update(dirty_track_ids)
+
+def _consolidate_track_blanks(track, consolidate_actions):
+    # Single pass over track, every run of consecutive blanks is replaced with one blank.
+    i = 0
+    while i < len(track.clips) - 1:
+        if track.clips[i].is_blanck_clip == False or track.clips[i + 1].is_blanck_clip == False:
+            i += 1
+            continue
+
+        removed_lengths = _remove_consecutive_blanks(track, i)
+        total_length = 0
+        for length in removed_lengths:
+            total_length = total_length + length
+        _insert_blank(track, i, total_length)
+        consolidate_actions.append((track, i, removed_lengths))
+        i += 1
 
 #----------------- RANGE OVERWRITE 
 # "track","clip","clip_in","clip_out","mark_in_frame","mark_out_frame"
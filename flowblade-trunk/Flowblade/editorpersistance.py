@@ -176,7 +176,7 @@ def update_prefs_from_widgets(widgets_tuples_tuple):
 
     # Aug-2019 - SvdB - AS - added autosave_combo
     default_profile_combo, open_in_last_opened_check, open_in_last_rendered_check, undo_max_spin, load_order_combo, \
-        autosave_combo, render_folder_select, disk_cache_warning_combo = gen_opts_widgets
+        autosave_combo, render_folder_select, disk_cache_warning_combo, media_index_roots_entry = gen_opts_widgets
 
     # Jul-2016 - SvdB - Added play_pause_button
     # Apr-2017 - SvdB - Added ffwd / rev values
@@ -190,7 +190,8 @@ def update_prefs_from_widgets(widgets_tuples_tuple):
     window_mode_combo, full_names, double_track_hights, top_row_layout, layout_monitor, colorized_icons = view_prefs_widgets
 
     # Jan-2017 - SvdB
-    perf_render_threads, perf_drop_frames = performance_widgets
+    perf_render_threads, perf_drop_frames, split_render_processes, gmic_frames_per_batch, gmic_streaming_render, \
+        sectioned_project_files, compress_project_files = performance_widgets
 
     global prefs
     prefs.open_in_last_opended_media_dir = open_in_last_opened_check.get_active()
@@ -198,6 +199,8 @@ def update_prefs_from_widgets(widgets_tuples_tuple):
     prefs.default_profile_name = mltprofiles.get_profile_name_for_index(default_profile_combo.get_active())
     prefs.undos_max = undo_max_spin.get_adjustment().get_value()
     prefs.media_load_order = load_order_combo.get_active()
+    roots = [root.strip() for root in media_index_roots_entry.get_text().split(os.pathsep)]
+    prefs.media_index_roots = [os.path.normpath(os.path.expanduser(root)) for root in roots if len(root) > 0]
 
     prefs.auto_center_on_play_stop = auto_center_check.get_active()
     prefs.default_grfx_length = int(gfx_length_spin.get_adjustment().get_value())
@@ -229,6 +232,11 @@ def update_prefs_from_widgets(widgets_tuples_tuple):
     # Jan-2017 - SvdB
     prefs.perf_render_threads = int(perf_render_threads.get_adjustment().get_value())
     prefs.perf_drop_frames = perf_drop_frames.get_active()
+    prefs.split_render_processes = int(split_render_processes.get_adjustment().get_value())
+    prefs.gmic_frames_per_batch = int(gmic_frames_per_batch.get_adjustment().get_value())
+    prefs.gmic_streaming_render = gmic_streaming_render.get_active()
+    prefs.sectioned_project_files = sectioned_project_files.get_active()
+    prefs.compress_project_files = compress_project_files.get_active()
     # Feb-2017 - SvdB - for full file names
     prefs.show_full_file_names = full_names.get_active()
     prefs.center_on_arrow_move = auto_center_on_updown.get_active()
@@ -367,4 +375,20 @@ class EditorPreferences:
         self.panel_positions = None
         self.force_small_midbar = False
         self.positions_tabs = None
+        self.tline_render_processes = 1 # 1 == segments are rendered one after another in timeline render server process.
+        self.gmic_streaming_render = True # G'MIC container clips frames are extracted, scripted and encoded concurrently in chunks.
+        self.render_worker_pool = True # Headless render jobs are run in worker processes that have MLT environment already initialized.
+        self.use_startup_cache = True # Probed MLT environment and parsed filters and compositors xml are cached between launches.
+        self.producer_probe_cache = True # Media files used in many timeline clips are probed only once.
+        self.media_index_roots = [] # Folders with file name indexes saved on disk for finding moved media on load.
+        self.journaled_autosave = True # Autosaves append changed project sections to a journal, full snapshot is written only occasionally.
+        self.sectioned_project_files = False # Projects are saved in sectioned file format that earlier Flowblade versions cannot open.
+        self.compress_project_files = False # Sections of sectioned project files are compressed.
+        self.load_sequences_lazily = True # Only current sequence gets MLT objects created on project load.
+        self.undo_memory_budget = 64 # MB, undo stack size is limited by estimated memory use of edit actions.
+        self.jobs_concurrent_slots = 0 # 0 means number of CPU cores, jobs use 1 - 4 slots depending on type.
+        self.batch_render_parallel_items = 1 # Batch render queue items rendered at the same time in worker processes.
+        self.split_render_processes = 1 # Sequence render is split into chunks rendered concurrently in this many processes if > 1.
+        self.img_seq_proxy_fast_png = True # Image sequence proxy frames are written with low PNG compression that is faster to encode.
+        self.gmic_frames_per_batch = 1 # G'MIC container clip and tool renders give this many frames to each gmic process.
         
\ No newline at end of file
@@ -248,12 +248,6 @@ class EditorWindow:
         return pane
 
     def _init_gui_components(self):        
-        # Disable Blender and G'Mic container clip menu items if not available.
-        if containerclip.blender_available() == False:
-            self.ui.get_widget('/MenuBar/ProjectMenu/ContainerClipsMenu/CreateBlenderContainerItem').set_sensitive(False)
-        if gmic.gmic_available() == False:
-            self.ui.get_widget('/MenuBar/ProjectMenu/ContainerClipsMenu/CreateGMicContainerItem').set_sensitive(False)
-            
         # Media panel
         self.bin_list_view = guicomponents.BinTreeView(
                                         projectaction.bin_selection_changed,
@@ -1042,7 +1036,12 @@ class EditorWindow:
         if editorstate.audio_monitoring_available == False:
             self.ui.get_widget('/MenuBar/ToolsMenu/AudioMix').set_sensitive(False)
 
-        # Diable Blender and G'Mic container clip menu items if not available.
+        # Blender and G'Mic availability is tested when container clips menu is first shown, not at startup.
+        container_clips_menu = self.ui.get_widget('/MenuBar/ProjectMenu/ContainerClipsMenu').get_submenu()
+        container_clips_menu.connect("show", self._container_clips_menu_shown)
+
+    def _container_clips_menu_shown(self, menu):
+        # Disable Blender and G'Mic container clip menu items if not available.
         if containerclip.blender_available() == False:
             self.ui.get_widget('/MenuBar/ProjectMenu/ContainerClipsMenu/CreateBlenderContainerItem').set_sensitive(False)
         if gmic.gmic_available() == False:
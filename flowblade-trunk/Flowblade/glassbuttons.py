@@ -574,7 +574,10 @@ class TooltipRunner:
             self.glassbuttons.widget.trigger_tooltip_query()
             return False
 
-        tooltip.set_markup(self.tooltips[hit_code])
+        tooltip_text = self.tooltips[hit_code]
+        if callable(tooltip_text): # For tooltips displaying changing info.
+            tooltip_text = tooltip_text()
+        tooltip.set_markup(tooltip_text)
         return True
 
 
@@ -477,6 +477,13 @@ def get_gtk_image_from_file(source_path, image_height):
     img = Gtk.Image.new_from_pixbuf(s_pbuf)
     return img
 
+def get_gtk_image_from_surface(surface, image_height):
+    pixbuf = Gdk.pixbuf_get_from_surface(surface, 0, 0, surface.get_width(), surface.get_height())
+    icon_width = int((float(pixbuf.get_width()) / float(pixbuf.get_height())) * image_height)
+    s_pbuf = pixbuf.scale_simple(icon_width, image_height, GdkPixbuf.InterpType.BILINEAR)
+    img = Gtk.Image.new_from_pixbuf(s_pbuf)
+    return img
+
 def set_margins(widget, t, b, l, r):
     widget.set_margin_top(t)
     widget.set_margin_left(l)
@@ -24,8 +24,8 @@ from gi.repository import GObject
 from gi.repository import Pango
 
 import copy
+import multiprocessing
 import os
-import subprocess
 import sys
 import time
 import threading
@@ -39,7 +39,11 @@ import guicomponents
 import guiutils
 import motionheadless
 import persistance
+import progresschannel
+import projectchanges
+import proxystore
 import proxyheadless
+import renderworkers
 import respaths
 import userfolders
 import utils
@@ -56,6 +60,26 @@ CONTAINER_CLIP_RENDER_BLENDER = 3
 MOTION_MEDIA_ITEM_RENDER = 4
 PROXY_RENDER = 5
 
+# Job priorities, higher priority jobs are started first.
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+
+# Number of concurrent job slots used by jobs of each type. Blender and G'MIC renders
+# run multithreaded or multiprocess renders themselves and take more of the machine.
+JOB_TYPE_WEIGHTS = {NOT_SET_YET:1,
+                    CONTAINER_CLIP_RENDER_GMIC:4,
+                    CONTAINER_CLIP_RENDER_MLT_XML:2,
+                    CONTAINER_CLIP_RENDER_BLENDER:4,
+                    MOTION_MEDIA_ITEM_RENDER:2,
+                    PROXY_RENDER:1}
+
+JOB_SLOTS_AUTO = 0
+JOB_SLOTS_OPTIONS = [JOB_SLOTS_AUTO, 1, 2, 4, 8]
+
+STATUS_POLL_INTERVAL = 0.5 # Used when progress channel is not available.
+STATUS_FALLBACK_POLL_INTERVAL = 2.0 # Jobs that have not sent progress messages recently are polled from files this often.
+
 open_media_file_callback = None
 
 _status_polling_thread = None
@@ -79,11 +103,14 @@ class JobProxy: # This object represnts job in job queue.
         self.progress = 0.0 # 0.0. - 1.0
         self.text = ""
         self.elapsed = 0.0 # in fractional seconds
+        self.priority = PRIORITY_NORMAL
+        self.depends_on = [] # proxy_uids of jobs that need to complete before this job is started.
 
         # callback_object have to implement interface:
         #     start_render()
         #     update_render_status()
         #     abort_render()
+        #     get_session_id()
         self.callback_object = callback_object
 
     def get_elapsed_str(self):
@@ -108,6 +135,9 @@ class JobProxy: # This object represnts job in job queue.
             return "-"
         return str(int(self.progress * 100.0)) + "%"
 
+    def get_weight(self):
+        return min(JOB_TYPE_WEIGHTS.get(self.type, 1), get_job_slots())
+
     def start_render(self):
         self.callback_object.start_render()
         
@@ -134,12 +164,11 @@ def add_job(job_proxy):
     if editorpersistance.prefs.open_jobs_panel_on_add == True:
         editorlayout.show_panel(appconsts.PANEL_JOBS)
     
-    if editorpersistance.prefs.render_jobs_sequentially == False: # Feature not active for first release 2.6.
-        job_proxy.start_render()
-    else:
-         running = _get_jobs_with_status(RENDERING)
-         if len(running) == 0:
-             job_proxy.start_render()
+    job_proxy.status = QUEUED
+
+    # Render processes get progress channel address from environment, so it is opened before first launch.
+    progresschannel.start()
+    _schedule_jobs()
 
     # Get polling going if needed.
     global _status_polling_thread
@@ -176,9 +205,7 @@ def update_job_queue(job_msg): # We're using JobProxy objects as messages to upd
         _jobs[row].progress = 1.0
         _remove_list.append(_jobs[row])
         GObject.timeout_add(4000, _remove_jobs)
-        waiting_jobs = _get_jobs_with_status(QUEUED)
-        if len(waiting_jobs) > 0:
-            waiting_jobs[0].start_render()
+        _schedule_jobs()
     else:
         _jobs[row].status = job_msg.status
 
@@ -192,6 +219,68 @@ def update_job_queue(job_msg): # We're using JobProxy objects as messages to upd
 
     _jobs_list_view.scroll.queue_draw()
 
+def get_job_slots():
+    slots = editorpersistance.prefs.jobs_concurrent_slots
+    if slots == JOB_SLOTS_AUTO:
+        slots = multiprocessing.cpu_count()
+    return max(slots, 1)
+
+def _schedule_jobs():
+    """
+    Starts queued jobs in priority and queue order while there are free job slots.
+    """
+    _cancel_jobs_with_cancelled_dependencies()
+
+    running = _get_jobs_with_status(RENDERING)
+    used_slots = 0
+    for job in running:
+        used_slots += job.get_weight()
+
+    active_uids = [job.proxy_uid for job in _jobs if job.status == QUEUED or job.status == RENDERING]
+    running_uids = [job.proxy_uid for job in running]
+
+    waiting = _get_jobs_with_status(QUEUED)
+    waiting.sort(key=lambda job: -job.priority) # sort is stable, queue order is kept for same priority jobs.
+    for job in waiting:
+        # Jobs with same id render into same session folders and have to run one after another.
+        if job.proxy_uid in running_uids:
+            continue
+        # Jobs wait until jobs they depend on have completed.
+        if len([uid for uid in job.depends_on if uid in active_uids]) > 0:
+            continue
+
+        # Jobs are not started past a job that does not fit in free slots so that heavy jobs do not wait forever.
+        if used_slots + job.get_weight() > get_job_slots():
+            break
+
+        used_slots += job.get_weight()
+        running_uids.append(job.proxy_uid)
+        job.status = RENDERING
+        job.start_render()
+
+def _cancel_jobs_with_cancelled_dependencies():
+    # Jobs do not have failed state, so a dependency that did not complete was cancelled 
+    # and dependent jobs cannot be rendered either. This is repeated for jobs depending on those.
+    dependents_cancelled = False
+    cancelled_count = -1
+    while cancelled_count != len(_remove_list):
+        cancelled_count = len(_remove_list)
+        # Job with same id may have been added again after cancel.
+        active_uids = [job.proxy_uid for job in _jobs if job.status == QUEUED or job.status == RENDERING]
+        cancelled_uids = [job.proxy_uid for job in _jobs if job.status == CANCELLED and job.proxy_uid not in active_uids]
+        for job in _get_jobs_with_status(QUEUED):
+            if len([uid for uid in job.depends_on if uid in cancelled_uids]) > 0:
+                job.progress = -1.0
+                job.text = _("Cancelled, required job was cancelled")
+                job.status = CANCELLED
+                _remove_list.append(job)
+                dependents_cancelled = True
+
+    if dependents_cancelled == True:
+        _jobs_list_view.fill_data_model()
+        _jobs_list_view.scroll.queue_draw()
+        GObject.timeout_add(4000, _remove_jobs)
+
 def _cancel_all_jobs():
     global _jobs, _remove_list
     _remove_list = []
@@ -210,11 +299,23 @@ def _cancel_all_jobs():
 def get_jobs_of_type(job_type):
     jobs_of_type = []
     for job in _jobs:
-        job.type = job_type
-        jobs_of_type.append(job)
+        if job.type == job_type:
+            jobs_of_type.append(job)
     
     return jobs_of_type
 
+def get_unfinished_proxy_render_job(proxy_file_path):
+    # Returns queued or rendering proxy job that renders to given path, if one exists.
+    for job in _jobs:
+        if not isinstance(job, ProxyRenderJobQueueObject):
+            continue
+        if job.status != QUEUED and job.status != RENDERING:
+            continue
+        if job.render_data.proxy_file_path == proxy_file_path:
+            return job
+
+    return None
+
 def proxy_render_ongoing():
     proxy_jobs = get_jobs_of_type(PROXY_RENDER)
     if len(proxy_jobs) == 0:
@@ -268,6 +369,24 @@ def _menu_action_pressed(widget, event):
     menu.add(sequential_render_item)
     """
     
+    slots_menu_item = Gtk.MenuItem(_("Concurrent Job Slots"))
+    slots_menu = Gtk.Menu()
+    labels = []
+    msgs = []
+    for slots in JOB_SLOTS_OPTIONS:
+        if slots == JOB_SLOTS_AUTO:
+            labels.append(_("Number of CPU cores") + " (" + str(multiprocessing.cpu_count()) + ")")
+        else:
+            labels.append(str(slots))
+        msgs.append("slots_" + str(slots))
+    try:
+        active_index = JOB_SLOTS_OPTIONS.index(editorpersistance.prefs.jobs_concurrent_slots)
+    except ValueError:
+        active_index = 0
+    guiutils.get_radio_menu_items_group(slots_menu, labels, msgs, _hamburger_item_activated, active_index)
+    slots_menu_item.set_submenu(slots_menu)
+    menu.add(slots_menu_item)
+
     open_on_add_item = Gtk.CheckMenuItem()
     open_on_add_item.set_label(_("Show Jobs Panel on Adding New Job"))
     open_on_add_item.set_active(editorpersistance.prefs.open_jobs_panel_on_add)
@@ -288,12 +407,14 @@ def _hamburger_item_activated(widget, msg):
             return # nothing was selected
         
         job = _jobs[jobs_list_index]
-        job.abort_render()
+        if job.status == RENDERING:
+            job.abort_render()
         job.progress = -1.0
         job.text = _("Cancelled")
         job.status = CANCELLED
         _remove_list.append(job)
 
+        _schedule_jobs()
         _jobs_list_view.fill_data_model()
         _jobs_list_view.scroll.queue_draw()
         GObject.timeout_add(4000, _remove_jobs)
@@ -306,6 +427,13 @@ def _hamburger_item_activated(widget, msg):
         editorpersistance.prefs.render_jobs_sequentially = widget.get_active()
         editorpersistance.save()
 
+    elif msg.startswith("slots_"):
+        if widget.get_active() == False:
+            return
+        editorpersistance.prefs.jobs_concurrent_slots = int(msg[len("slots_"):])
+        editorpersistance.save()
+        _schedule_jobs()
+
 def _get_jobs_with_status(status):
     running = []
     for job in _jobs:
@@ -322,17 +450,13 @@ def _remove_jobs():
         else:
             pass
 
-    running = _get_jobs_with_status(RENDERING)
-    if len(running) == 0:
-        in_queue = _get_jobs_with_status(QUEUED)
-        if len(in_queue) > 0:
-            in_queue[0].start_render()
+    _remove_list = []
+
+    _schedule_jobs()
 
     _jobs_list_view.fill_data_model()
     _jobs_list_view.scroll.queue_draw()
 
-    _remove_list = []
-
 
 # --------------------------------------------------------- GUI 
 class JobsQueueView(Gtk.VBox):
@@ -428,6 +552,7 @@ class JobsQueueView(Gtk.VBox):
 #     start_render()
 #     update_render_status()
 #     abort_render()
+#     get_session_id()
 # 
 # ------------------------------------------------------------------------------- JOBS QUEUE OBJECTS
 
@@ -497,7 +622,7 @@ class MotionRenderJobQueueObject(AbstractJobQueueObject):
         for arg in self.args:
             command_list.append(arg)
 
-        subprocess.Popen(command_list)
+        renderworkers.launch_job(command_list)
         
     def update_render_status(self):
 
@@ -550,6 +675,7 @@ class ProxyRenderJobQueueObject(AbstractJobQueueObject):
         AbstractJobQueueObject.__init__(self, session_id, PROXY_RENDER)
         
         self.render_data = render_data
+        self.priority = PRIORITY_LOW # Proxy files are rendered in background while user does other renders.
 
     def get_job_name(self):
         folder, file_name = os.path.split(self.render_data.media_file_path)
@@ -571,7 +697,7 @@ class ProxyRenderJobQueueObject(AbstractJobQueueObject):
         session_arg = "session_id:" + str(self.session_id)
         command_list.append(session_arg)
 
-        subprocess.Popen(command_list)
+        renderworkers.launch_job(command_list)
     
     def update_render_status(self):
 
@@ -612,16 +738,27 @@ class ProxyRenderJobQueueObject(AbstractJobQueueObject):
         motionheadless.abort_render(self.get_session_id())
         
     def proxy_render_complete(self):
-        try:
-            media_file = PROJECT().media_files[self.render_data.media_file_id]
-        except:
-            # User has deleted media file before proxy render complete
+        proxy_path = self.render_data.proxy_file_path
+        if self.render_data.store_proxy_path != None:
+            proxy_path = proxystore.move_rendered_proxy(proxy_path, self.render_data.store_proxy_path)
+
+        media_files = []
+        for media_file_id in [self.render_data.media_file_id] + self.render_data.extra_media_file_ids:
+            try:
+                media_files.append(PROJECT().media_files[media_file_id])
+            except:
+                pass # User has deleted media file before proxy render complete
+
+        if len(media_files) == 0:
             return
 
-        media_file.add_proxy_file(self.render_data.proxy_file_path)
+        for media_file in media_files:
+            media_file.add_proxy_file(proxy_path)
+            projectchanges.media_changed(media_file.id)
 
         if PROJECT().proxy_data.proxy_mode == appconsts.USE_PROXY_MEDIA: # When proxy mode is USE_PROXY_MEDIA all proxy files are used all the time
-            media_file.set_as_proxy_media_file()
+            for media_file in media_files:
+                media_file.set_as_proxy_media_file()
         
             # if the rendered proxy file was the last proxy file being rendered,
             # auto re-convert to update proxy clips.
@@ -643,10 +780,29 @@ class ContainerStatusPollingThread(threading.Thread):
         threading.Thread.__init__(self)
 
     def run(self):
+        last_fallback_poll = 0.0
 
         while self.abort == False:
-            for job in _jobs:
-                if job.status == RENDERING:
+            # Jobs status is updated when render processes send progress messages. Jobs that have not
+            # sent messages recently, e.g. because channel could not be opened, are polled from message files.
+            if progresschannel.is_listening() == True:
+                updated_sessions = progresschannel.wait_for_messages(STATUS_FALLBACK_POLL_INTERVAL)
+            else:
+                time.sleep(STATUS_POLL_INTERVAL)
+                updated_sessions = None
+
+            do_fallback_poll = False
+            if time.monotonic() - last_fallback_poll >= STATUS_FALLBACK_POLL_INTERVAL:
+                do_fallback_poll = True
+                last_fallback_poll = time.monotonic()
+
+            for job in list(_jobs):
+                if job.status != RENDERING:
+                    continue
+
+                session_id = job.callback_object.get_session_id()
+                if updated_sessions == None or session_id in updated_sessions \
+                    or (do_fallback_poll == True and progresschannel.is_session_live(session_id) == False):
                     job.callback_object.update_render_status() # Make sure these methods enter/exit Gtk threads.
 
             # Handling post-app-close jobs rendering.
@@ -655,8 +811,6 @@ class ContainerStatusPollingThread(threading.Thread):
             elif _jobs_render_progress_window != None and len(_jobs) == 0:
                 _jobs_render_progress_window.jobs_completed()
                 self.abort = True
-                
-            time.sleep(0.5)
 
     def shutdown(self):
         for job in _jobs:
@@ -0,0 +1,209 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <http://code.google.com/p/flowblade>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+"""
+Module provides file name indexes of folder trees used to find moved media files when loading projects.
+
+Project folder index is built with one folder tree walk per project load and reused for all
+relative path look-ups. Indexes for folders listed in 'media_index_roots' preference are also
+saved on disk and only rebuilt when a look-up finds a path in them that no longer exists.
+"""
+
+import fnmatch
+import os
+import pickle
+import threading
+
+import atomicfile
+import editorpersistance
+import userfolders
+import utils
+
+MEDIA_INDEX_FILE = "media_file_index"
+MEDIA_INDEX_VERSION = 1
+
+_project_index = None
+_root_indexes = None # root folder -> FileNameIndex, persistent indexes for media roots
+_rebuilt_roots = [] # Roots that have already been rebuilt during current load.
+_lock = threading.Lock() # Look-ups are done from load worker threads.
+
+
+class FileNameIndex:
+    """
+    Index of all files in a folder tree, look-ups return results in same order as os.walk().
+    """
+    def __init__(self, root_folder):
+        self.root_folder = root_folder
+        self.files = {} # file name -> list of paths
+        self.folders = [] # (folder path, list of file names) tuples
+
+    def build(self):
+        self.files = {}
+        self.folders = []
+        for root, dirnames, filenames in os.walk(self.root_folder):
+            self.folders.append((root, filenames))
+            for filename in filenames:
+                try:
+                    self.files[filename].append(os.path.join(root, filename))
+                except KeyError:
+                    self.files[filename] = [os.path.join(root, filename)]
+
+    def find_file(self, file_name):
+        try:
+            return self.files[file_name][0]
+        except KeyError:
+            return None
+
+    def find_img_seq_folder(self, look_up_file_name):
+        # glob.glob() does not match hidden files and we want same results as it gives.
+        for folder, filenames in self.folders:
+            for filename in fnmatch.filter(filenames, look_up_file_name):
+                if not filename.startswith(".") or look_up_file_name.startswith("."):
+                    return folder
+        return None
+
+
+# ---------------------------------------------------------- load interface
+def start_load(project_file_path):
+    global _project_index, _rebuilt_roots
+    project_folder, project_file_name = os.path.split(project_file_path)
+    _project_index = FileNameIndex(project_folder)
+    _project_index.files = None # Project folder is walked when first needed.
+    _rebuilt_roots = []
+
+def end_load():
+    global _project_index, _rebuilt_roots
+    _project_index = None
+    _rebuilt_roots = []
+
+def find_file(project_file_path, asset_path):
+    """
+    Returns path for file with same name as asset_path in project folder tree, or in
+    indexed media roots, or None if not found.
+    """
+    asset_folder, asset_file_name = os.path.split(asset_path)
+    path = _get_project_index(project_file_path).find_file(asset_file_name)
+    if path != None:
+        return path
+
+    return _find_in_root_indexes(lambda index: index.find_file(asset_file_name), os.path.isfile)
+
+def find_img_seq_file(project_file_path, asset_path):
+    """
+    Returns path for image sequence resource found in project folder tree or in indexed media roots,
+    or None if not found.
+    """
+    asset_folder, asset_file_name = os.path.split(asset_path)
+    look_up_file_name = utils.get_img_seq_glob_lookup_name(asset_file_name)
+
+    folder = _get_project_index(project_file_path).find_img_seq_folder(look_up_file_name)
+    if folder != None:
+        return folder + "/" + asset_file_name
+
+    folder = _find_in_root_indexes(lambda index: index.find_img_seq_folder(look_up_file_name), os.path.isdir)
+    if folder != None:
+        return folder + "/" + asset_file_name
+    return None
+
+def _get_project_index(project_file_path):
+    with _lock:
+        project_folder, project_file_name = os.path.split(project_file_path)
+        if _project_index == None or _project_index.root_folder != project_folder:
+            # Look-up outside of start_load()/end_load(), index is not kept.
+            index = FileNameIndex(project_folder)
+            index.build()
+            return index
+
+        if _project_index.files == None:
+            _project_index.build()
+        return _project_index
+
+
+# ---------------------------------------------------------- persistent media root indexes
+def _find_in_root_indexes(find_func, exists_func):
+    global _root_indexes
+    roots = editorpersistance.prefs.media_index_roots
+    if len(roots) == 0:
+        return None
+
+    with _lock:
+        if _root_indexes == None:
+            _root_indexes = _load_root_indexes()
+
+        indexes_changed = False
+        result = None
+        for root in roots:
+            if not os.path.isdir(root):
+                continue
+
+            index = _root_indexes.get(root, None)
+            if index != None:
+                result = find_func(index)
+                if result == None:
+                    continue # Not in this root when it was indexed.
+                if exists_func(result):
+                    break
+                # Index points to a file that has since been moved or deleted, it is stale.
+
+            # Index missing or stale, it is rebuilt once per load.
+            result = None
+            if root in _rebuilt_roots:
+                continue
+            index = FileNameIndex(root)
+            index.build()
+            _root_indexes[root] = index
+            _rebuilt_roots.append(root)
+            indexes_changed = True
+
+            result = find_func(index)
+            if result != None:
+                break
+
+        if indexes_changed == True:
+            _save_root_indexes(roots)
+
+    return result
+
+def _load_root_indexes():
+    try:
+        index_data = utils.unpickle(_get_index_path())
+        if index_data["version"] != MEDIA_INDEX_VERSION:
+            return {}
+        return index_data["indexes"]
+    except:
+        return {} # No saved indexes yet or file is from incompatible version.
+
+def _save_root_indexes(roots):
+    # Only indexes for roots still in preferences are saved.
+    indexes = {}
+    for root in roots:
+        if root in _root_indexes:
+            indexes[root] = _root_indexes[root]
+
+    try:
+        with atomicfile.AtomicFileWriter(_get_index_path(), "wb") as afw:
+            write_file = afw.get_file()
+            pickle.dump({"version":MEDIA_INDEX_VERSION, "indexes":indexes}, write_file)
+    except Exception as e:
+        print("Writing media file index failed:", e)
+
+def _get_index_path():
+    return userfolders.get_cache_dir() + MEDIA_INDEX_FILE
@@ -40,10 +40,8 @@ import editorpersistance
 import gui
 import guiutils
 import guicomponents
-import mltenv
 import mltprofiles
 import mlttransitions
-import mltfilters
 import patternproducer
 import persistance
 import processutils
@@ -51,6 +49,7 @@ import projectdata
 import propertyparse
 import respaths
 import renderconsumer
+import startupcache
 import translations
 import userfolders
 import utils
@@ -615,14 +614,11 @@ def main(root_path, filename):
     # Set numeric locale to use "." as radix, MLT initilizes this to OS locale and this causes bugs 
     locale.setlocale(locale.LC_NUMERIC, 'C')
 
-    # Check for codecs and formats on the system
-    mltenv.check_available_features(repo)
+    # Check for codecs and formats on the system and load filter and compositor descriptions,
+    # these come from startup cache if it is up to date.
+    startupcache.load_mlt_environment(repo)
     renderconsumer.load_render_profiles()
 
-    # Load filter and compositor descriptions from xml files.
-    mltfilters.load_filters_xml(mltenv.services)
-    mlttransitions.load_compositors_xml(mltenv.transitions)
-
     # Create list of available mlt profiles
     mltprofiles.load_profile_list()
 
@@ -42,6 +42,7 @@ import projectdata
 import patternproducer
 import profilesmanager
 import shortcuts
+import thumbnailengine
 import respaths
 import workflow
 
@@ -70,13 +71,14 @@ class RecreateIconsThread(threading.Thread):
             if ((not isinstance(media_file, patternproducer.AbstractBinClip))
                 and (not isinstance(media_file, projectdata.BinColorClip))):
                 if media_file.type == appconsts.AUDIO:
-                    icon_path = respaths.IMAGE_PATH + "audio_file.png"
+                    media_file.icon_path = respaths.IMAGE_PATH + "audio_file.png"
                     media_file.info = None
+                    media_file.create_icon()
                 else:
-                    (icon_path, length, info) = projectdata.thumbnailer.write_image(media_file.path)
+                    (icon_path, length, info) = projectdata.thumbnailer.probe_file(media_file.path)
                     media_file.info = info
-                media_file.icon_path = icon_path
-                media_file.create_icon()
+                    media_file.icon_path = icon_path
+                    thumbnailengine.request_icon(media_file, refresh=True)
 
             loaded = loaded + 1
             
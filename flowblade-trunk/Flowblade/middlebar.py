@@ -233,7 +233,7 @@ def _create_buttons(editor_window):
     editor_window.undo_redo = glassbuttons.GlassButtonsGroup(28*size_adj, 23*size_adj, 2*size_adj, 2*size_adj, 7*size_adj)
     editor_window.undo_redo.add_button(guiutils.get_cairo_image("undo" + icon_color), undo.do_undo_and_repaint)
     editor_window.undo_redo.add_button(guiutils.get_cairo_image("redo" + icon_color), undo.do_redo_and_repaint)
-    tooltips = [_("Undo - Ctrl + Z"), _("Redo - Ctrl + Y")]
+    tooltips = [lambda: _("Undo - Ctrl + Z") + "\n" + undo.get_stats_str(), lambda: _("Redo - Ctrl + Y") + "\n" + undo.get_stats_str()]
     tooltip_runner = glassbuttons.TooltipRunner(editor_window.undo_redo, tooltips)
     editor_window.undo_redo.no_decorations = no_decorations
     
@@ -95,6 +95,16 @@ def check_available_features(repo):
         print("Environment detection failed, environment unknown.")
         GObject.timeout_add(2000, _show_failed_environment_info)
 
+def get_features_data():
+    # Used by startupcache.py to save probed environment.
+    return (acodecs, vcodecs, formats, services, transitions)
+
+def set_features_data(features_data):
+    # Used by startupcache.py to set environment from cache instead of probing it.
+    global acodecs, vcodecs, formats, services, transitions, environment_detection_success
+    acodecs, vcodecs, formats, services, transitions = features_data
+    environment_detection_success = True
+
 def render_profile_supported(frmt, vcodec, acodec):
     if environment_detection_success == False:
         return (True, "")
@@ -450,10 +450,43 @@ def clone_filter_object(filter_object, mlt_profile):
     clone.create_mlt_filter(mlt_profile)
     return clone
 
-def replace_services(services):
-    
+def get_filters_data():
+    # Used by startupcache.py to save loaded filters.
+    return (groups, not_found_filters, compositor_filters, _filter_mask_filters, 
+            _volume_filter_info, _brightness_filter_info, _colorize_filter_info)
+
+def set_filters_data(filters_data):
+    # Used by startupcache.py to set filters from cache instead of parsing xml.
+    global groups, not_found_filters, compositor_filters, _filter_mask_filters, \
+           _volume_filter_info, _brightness_filter_info, _colorize_filter_info
+    _load_icons()
+    (groups, not_found_filters, compositor_filters, _filter_mask_filters, 
+     _volume_filter_info, _brightness_filter_info, _colorize_filter_info) = filters_data
+
+def load_service_replacements_xml():
+    """
+    Returns service replacements as list of (use_service_id, use_service_name, drop_service_names) tuples.
+    """
     replacements_doc = xml.dom.minidom.parse(respaths.REPLACEMENTS_XML_DOC)
 
+    replacements = []
+    replacement_nodes = replacements_doc.getElementsByTagName(REPLACEMENT_RELATION)
+    for r_node in replacement_nodes:
+        use_node = r_node.getElementsByTagName(USE_SERVICE).item(0)
+        use_service_id = use_node.getAttribute(ID)
+        use_service_name = use_node.getAttribute(NAME)
+
+        drop_nodes = r_node.getElementsByTagName(DROP_SERVICE)
+        drop_service_names = [d_node.getAttribute(NAME) for d_node in drop_nodes]
+        
+        replacements.append((use_service_id, use_service_name, drop_service_names))
+    
+    return replacements
+
+def replace_services(services, replacements=None):
+    if replacements == None:
+        replacements = load_service_replacements_xml()
+
     # Build dict that has enough info to enable deleting and finding filters by name
     filters_dict = {}
     for group_data in groups:
@@ -462,13 +495,7 @@ def replace_services(services):
             filters_dict[f.name] = (f, group)
 
     # Replace services
-    replacement_nodes = replacements_doc.getElementsByTagName(REPLACEMENT_RELATION)
-    for r_node in replacement_nodes:
-
-        # Get use service values
-        use_node = r_node.getElementsByTagName(USE_SERVICE).item(0)
-        use_service_id = use_node.getAttribute(ID)
-        use_service_name = use_node.getAttribute(NAME)
+    for use_service_id, use_service_name, drop_service_names in replacements:
 
         # Try replace if use service and use filter exist
         if (use_service_id in services) and len(services) > 0:
@@ -478,14 +505,9 @@ def replace_services(services):
                 print("Replace service " + use_service_name + " not found.")
                 continue
             
-            drop_nodes = r_node.getElementsByTagName(DROP_SERVICE)
-            
             try:
                 # Drop service if found
-                for d_node in drop_nodes:
-                    drop_service_id = d_node.getAttribute(ID)
-                    drop_service_name = d_node.getAttribute(NAME)
-
+                for drop_service_name in drop_service_names:
                     drop_service_data = filters_dict[drop_service_name]
                     f_info, group = drop_service_data
                     for i in range(0, len(group)):
@@ -435,6 +435,15 @@ def load_compositors_xml(transitions):
 
         mlt_compositor_transition_infos[compositor_info.name] = compositor_info
 
+def get_compositors_data():
+    # Used by startupcache.py to save loaded compositors.
+    return (mlt_compositor_transition_infos, not_found_transitions)
+
+def set_compositors_data(compositors_data):
+    # Used by startupcache.py to set compositors from cache instead of parsing xml.
+    global mlt_compositor_transition_infos, not_found_transitions
+    mlt_compositor_transition_infos, not_found_transitions = compositors_data
+
 def get_wipe_resource_path_for_sorted_keys_index(sorted_keys_index):
     # This exists to avoid sending a list of sorted keys around or having to use global variables
     keys = list(wipe_lumas.keys())
@@ -26,9 +26,9 @@ SwigPyObject MLT objects with pickleable python objects for save,
 and then create MLT objects from pickled objects when project is loaded.
 """
 
+import concurrent.futures
 import copy
 import glob
-import fnmatch
 import hashlib
 import os
 import pickle
@@ -40,11 +40,15 @@ import appconsts
 import atomicfile
 import editorstate
 import editorpersistance
+import mediafileindex
 import mltprofiles
 import mltfilters
 import mlttransitions
 import miscdataobjects
 import persistancecompat
+import projectfile
+import producerprobecache
+import projectchanges
 import propertyparse
 import resync
 import userfolders
@@ -84,6 +88,24 @@ _load_file_path = None
 # 'snapshot_paths != None' flags that snapsave is being done and paths need to be replaced 
 snapshot_paths = None
 
+# Media paths resolved and files probed in worker threads before MLT objects are created on load.
+# (path, is image sequence) -> resolved path
+_resolved_paths = {}
+
+# Media lookups and probes on load are I/O bound, more threads than cores helps with network drives.
+LOAD_PREPARE_THREADS = 8
+
+# Sequences that have not yet had their MLT objects created, they are built when first needed.
+_unloaded_sequences = []
+# Load data needed to build unloaded sequences later: (load file path, proxy mode, proxy path dict, SAVEFILE_VERSION)
+_lazy_load_context = None
+
+# Sectioned project file saves only pickle sequences that have changed since the file was last loaded or saved.
+_file_changes = projectchanges.ChangeTracker()
+projectchanges.add_tracker(_file_changes)
+_sectioned_file_path = None
+_sectioned_file_project = None
+
 # Used to compute in/out points when saving to change profile
 _fps_conv_mult = 1.0
 
@@ -115,10 +137,58 @@ def _show_msg(msg, delay=0.0):
 # -------------------------------------------------- SAVE
 def save_project(project, file_path, changed_profile_desc=None):
     """
-    Creates pickleable project object
+    Creates pickleable project object and writes it to file
     """
     print("Saving project...")  # + os.path.basename(file_path)
-    
+
+    if editorpersistance.prefs.sectioned_project_files == True:
+        _save_sectioned_project(project, file_path, changed_profile_desc)
+        return
+
+    s_proj = get_p_project(project, changed_profile_desc)
+
+    # Write out file.
+    with atomicfile.AtomicFileWriter(file_path, "wb") as afw:
+        outfile = afw.get_file()
+        pickle.dump(s_proj, outfile)
+
+def _save_sectioned_project(project, file_path, changed_profile_desc):
+    global _sectioned_file_path, _sectioned_file_project
+    compress = editorpersistance.prefs.compress_project_files
+
+    # Unchanged sequences can only be copied when saving over file this project was loaded from or last saved to,
+    # and when save does not modify sequences data.
+    proxy_mode = project.proxy_data.proxy_mode
+    if (file_path != _sectioned_file_path or project is not _sectioned_file_project
+        or changed_profile_desc != None or snapshot_paths != None
+        or proxy_mode == appconsts.CONVERTING_TO_USE_PROXY_MEDIA or proxy_mode == appconsts.CONVERTING_TO_USE_ORIGINAL_MEDIA
+        or not projectfile.is_sectioned_file(file_path)):
+        s_proj = get_p_project(project, changed_profile_desc)
+        projectfile.save(s_proj, file_path, compress)
+    else:
+        # Current sequence is always saved, not all edits to it report themselves.
+        save_indexes = []
+        copied_sequences = {}
+        for i in range(0, len(project.sequences)):
+            seq = project.sequences[i]
+            if seq is project.c_seq or _file_changes.is_sequence_changed(seq):
+                save_indexes.append(i)
+            else:
+                copied_sequences[i] = _file_changes.get_saved_sequence_index(seq)
+
+        s_proj, media_files, sequences = get_p_project_sections(project, list(project.media_files.keys()), save_indexes)
+        s_proj.media_files = media_files
+        s_proj.sequences = [sequences.get(i) for i in range(0, len(project.sequences))]
+        projectfile.save(s_proj, file_path, compress, copied_sequences)
+
+    _sectioned_file_path = file_path
+    _sectioned_file_project = project
+    _file_changes.clear(project)
+
+def get_p_project(project, changed_profile_desc=None):
+    """
+    Creates pickleable project object
+    """
     # Get shallow copy
     s_proj = copy.copy(project)
     
@@ -192,10 +262,37 @@ def save_project(project, file_path, changed_profile_desc=None):
     # Remove unpickleable attributes
     remove_attrs(s_proj, PROJECT_REMOVE)
 
-    # Write out file.
-    with atomicfile.AtomicFileWriter(file_path, "wb") as afw:
-        outfile = afw.get_file()
-        pickle.dump(s_proj, outfile)
+    return s_proj
+
+def get_p_project_sections(project, media_ids, sequence_indexes):
+    """
+    Creates pickleable project object without media files and sequences, and pickleable
+    copies of given media files and sequences. Used by autosave journal to save only changed parts of project.
+    """
+    global _fps_conv_mult, _xml_new_paths_for_profile_change, project_proxy_mode, proxy_path_dict
+    _fps_conv_mult = 1.0
+    _xml_new_paths_for_profile_change = None
+    project_proxy_mode = project.proxy_data.proxy_mode
+    proxy_path_dict = {}
+
+    s_proj = copy.copy(project)
+    s_proj.c_seq_index = project.sequences.index(project.c_seq)
+    s_proj.SAVEFILE_VERSION = appconsts.SAVEFILE_VERSION
+    s_proj.media_files = {}
+    s_proj.sequences = []
+    remove_attrs(s_proj, PROJECT_REMOVE)
+
+    media_files = {}
+    for media_id in media_ids:
+        s_media_file = copy.copy(project.media_files[media_id])
+        remove_attrs(s_media_file, MEDIA_FILE_REMOVE)
+        media_files[media_id] = s_media_file
+
+    sequences = {}
+    for i in sequence_indexes:
+        sequences[i] = get_p_sequence(project.sequences[i])
+
+    return (s_proj, media_files, sequences)
 
 def get_p_sequence(sequence):
     """
@@ -385,109 +482,180 @@ def _save_changed_xml_file(s_media_file, new_profile):
 def load_project(file_path, icons_and_thumnails=True, relinker_load=False):
     _show_msg("Unpickling")
 
-    project = utils.unpickle(file_path)
+    if projectfile.is_sectioned_file(file_path):
+        project = projectfile.load(file_path)
+    else:
+        project = utils.unpickle(file_path)
 
     # Relinker only operates on pickleable python data 
     if relinker_load:
         persistancecompat.FIX_MISSING_PROJECT_ATTRS(project)
         return project
 
-    global _load_file_path
+    global _load_file_path, project_proxy_mode, proxy_path_dict, _unloaded_sequences, _lazy_load_context
     _load_file_path = file_path
-
-    # We need to collect some proxy data to try to fix projects with missing proxy files.
-    global project_proxy_mode, proxy_path_dict
-    project_proxy_mode = project.proxy_data.proxy_mode
-    proxy_path_dict = {}
+    mediafileindex.start_load(file_path) # Relative path look-ups share one index of project folder.
+    # Index is not kept if load fails, later look-ups would use index of a project that was not loaded.
+    try:
+        # We need to collect some proxy data to try to fix projects with missing proxy files.
+        project_proxy_mode = project.proxy_data.proxy_mode
+        proxy_path_dict = {}
     
-    # editorstate.project needs to be available for sequence building
-    editorstate.project = project
-
-    # Set MLT profile. NEEDS INFO USER ON MISSING PROFILE!!!!!
-    project.profile = mltprofiles.get_profile(project.profile_desc)
+        # editorstate.project needs to be available for sequence building
+        editorstate.project = project
 
-    persistancecompat.FIX_MISSING_PROJECT_ATTRS(project)
+        # Set MLT profile. NEEDS INFO USER ON MISSING PROFILE!!!!!
+        project.profile = mltprofiles.get_profile(project.profile_desc)
 
-    # Some profiles may not be available in system
-    # inform user on fix
-    if project.profile == None:
-        raise ProjectProfileNotFoundError(project.profile_desc)
+        persistancecompat.FIX_MISSING_PROJECT_ATTRS(project)
 
-    for k, media_file in project.media_files.items():
-        media_file.current_frame = 0 # this is always reset on load, value is not considered persistent
+        # Some profiles may not be available in system
+        # inform user on fix
+        if project.profile == None:
+            raise ProjectProfileNotFoundError(project.profile_desc)
 
-        # Avoid crash in case path attribute is missing (color clips).
-        # All code in loop below handles issues not related to color clips.
-        if not hasattr(media_file, "path"):
-            continue
-            
-        # Try to find relative path files if needed for non-proxy media files
-        orig_path = media_file.path # looking for missing path changes it and we need save this info for user info dialog on missing asset
-        if media_file.is_proxy_file == False:
-            if media_file.type != appconsts.PATTERN_PRODUCER and media_file.type != appconsts.IMAGE_SEQUENCE:
-                media_file.path = get_media_asset_path(media_file.path, _load_file_path)
-            elif media_file.type == appconsts.IMAGE_SEQUENCE:
-                media_file.path = get_img_seq_media_path(media_file.path, _load_file_path)
+        # Only current sequence gets its MLT objects created on load if lazy loading is used,
+        # other sequences are built when first needed.
+        if editorpersistance.prefs.load_sequences_lazily == True:
+            build_sequences = [project.sequences[project.c_seq_index]]
         else:
-            # Try to fix missing proxy project media files.
-            # This is all just best effort, proxy files should never be deleted during editing
-            # and proxy projects should not be moved.
-            if media_file.type != appconsts.PATTERN_PRODUCER and media_file.type != appconsts.IMAGE_SEQUENCE:
-                media_file.path = get_media_asset_path(media_file.path, _load_file_path)
-                if media_file.path == NOT_FOUND:
-                    fixed_second_path = get_media_asset_path(media_file.second_file_path, _load_file_path)
-                    if fixed_second_path != NOT_FOUND:
-                        media_file.path = fixed_second_path
-                        media_file.second_file_path = fixed_second_path
-
-        if media_file.path == NOT_FOUND:
-            raise FileProducerNotFoundError(orig_path)
-
-        persistancecompat.FIX_MISSING_MEDIA_FILE_ATTRS(media_file)
-            
-        # Use this to try to fix clips with missing proxy files.
-        proxy_path_dict[media_file.path] = media_file.second_file_path
-        
-        # Try to fix possible missing proxy files for media assets if we are in proxy mode.
-        if not os.path.isfile(media_file.path) and media_file.is_proxy_file and project_proxy_mode == appconsts.USE_PROXY_MEDIA:
-            if os.path.isfile(media_file.second_file_path): # Original media file exists, use it
-                media_file.set_as_original_media_file()
+            build_sequences = list(project.sequences)
+        _unloaded_sequences = [seq for seq in project.sequences if seq not in build_sequences]
 
-    # Add MLT objects to sequences.
-    global all_clips, sync_clips
-    seq_count = 1
-    for seq in project.sequences:
+        # Resolve media paths and probe media files in worker threads,
+        # MLT objects are then created using prepared data below.
+        _prepare_media(project, build_sequences)
+
+        for k, media_file in project.media_files.items():
+            media_file.current_frame = 0 # this is always reset on load, value is not considered persistent
+
+            # Avoid crash in case path attribute is missing (color clips).
+            # All code in loop below handles issues not related to color clips.
+            if not hasattr(media_file, "path"):
+                continue
             
-        persistancecompat.FIX_MISSING_SEQUENCE_ATTRS(seq)
+            # Try to find relative path files if needed for non-proxy media files
+            orig_path = media_file.path # looking for missing path changes it and we need save this info for user info dialog on missing asset
+            if media_file.is_proxy_file == False:
+                if media_file.type != appconsts.PATTERN_PRODUCER and media_file.type != appconsts.IMAGE_SEQUENCE:
+                    media_file.path = _get_resolved_path(media_file.path, False)
+                elif media_file.type == appconsts.IMAGE_SEQUENCE:
+                    media_file.path = _get_resolved_path(media_file.path, True)
+            else:
+                # Try to fix missing proxy project media files.
+                # This is all just best effort, proxy files should never be deleted during editing
+                # and proxy projects should not be moved.
+                if media_file.type != appconsts.PATTERN_PRODUCER and media_file.type != appconsts.IMAGE_SEQUENCE:
+                    media_file.path = _get_resolved_path(media_file.path, False)
+                    if media_file.path == NOT_FOUND:
+                        fixed_second_path = get_media_asset_path(media_file.second_file_path, _load_file_path)
+                        if fixed_second_path != NOT_FOUND:
+                            media_file.path = fixed_second_path
+                            media_file.second_file_path = fixed_second_path
+
+            if media_file.path == NOT_FOUND:
+                raise FileProducerNotFoundError(orig_path)
 
-        _show_msg(_("Building sequence ") + str(seq_count))
-        all_clips = {}
-        sync_clips = []
-                
-        seq.profile = project.profile
-        fill_sequence_mlt(seq, project.SAVEFILE_VERSION)
+            persistancecompat.FIX_MISSING_MEDIA_FILE_ATTRS(media_file)
+            
+            # Use this to try to fix clips with missing proxy files.
+            proxy_path_dict[media_file.path] = media_file.second_file_path
+        
+            # Try to fix possible missing proxy files for media assets if we are in proxy mode.
+            if not os.path.isfile(media_file.path) and media_file.is_proxy_file and project_proxy_mode == appconsts.USE_PROXY_MEDIA:
+                if os.path.isfile(media_file.second_file_path): # Original media file exists, use it
+                    media_file.set_as_original_media_file()
 
-        handle_seq_watermark(seq)
+        # Add MLT objects to sequences.
+        seq_count = 1
+        for seq in project.sequences:
+            persistancecompat.FIX_MISSING_SEQUENCE_ATTRS(seq)
+            seq.profile = project.profile
 
-        if not hasattr(seq, "seq_len"):
-            seq.update_edit_tracks_length()
+            if seq in build_sequences:
+                _show_msg(_("Building sequence ") + str(seq_count))
+                _build_sequence_mlt(seq, project.SAVEFILE_VERSION)
 
-        seq_count = seq_count + 1
+            seq_count = seq_count + 1
 
-    all_clips = {}
-    sync_clips = []
+        _lazy_load_context = (_load_file_path, project_proxy_mode, proxy_path_dict, project.SAVEFILE_VERSION)
+        _start_file_changes_tracking(project, file_path, build_sequences)
+    finally:
+        _resolved_paths.clear()
+        mediafileindex.end_load()
 
     if icons_and_thumnails == True:
+        # Thumbnailer is initialized first because thumbnails are extracted using loaded project profile.
+        project.init_thumbnailer()
         _show_msg(_("Loading icons"))
         for k, media_file in project.media_files.items():
             media_file.create_icon()
     
     project.c_seq = project.sequences[project.c_seq_index]
-    if icons_and_thumnails == True:
-        project.init_thumbnailer()
 
     return project
 
+def _build_sequence_mlt(seq, SAVEFILE_VERSION):
+    global all_clips, sync_clips
+    all_clips = {}
+    sync_clips = []
+
+    fill_sequence_mlt(seq, SAVEFILE_VERSION)
+
+    handle_seq_watermark(seq)
+
+    if not hasattr(seq, "seq_len"):
+        seq.update_edit_tracks_length()
+
+    all_clips = {}
+    sync_clips = []
+
+def is_sequence_loaded(seq):
+    return not(seq in _unloaded_sequences)
+
+def load_sequence_mlt(project, seq):
+    """
+    Creates MLT objects for a sequence that was not built when project was loaded.
+    Does nothing if sequence has already been built.
+    """
+    global _load_file_path, project_proxy_mode, proxy_path_dict
+    if is_sequence_loaded(seq):
+        return
+
+    print("Building sequence " + seq.name + "...")
+    _unloaded_sequences.remove(seq)
+
+    # Saving changes proxy data globals, so they are set again to values from load.
+    _load_file_path, project_proxy_mode, proxy_path_dict, SAVEFILE_VERSION = _lazy_load_context
+    mediafileindex.start_load(_load_file_path)
+
+    # fill_sequence_mlt() sets built sequence as current sequence.
+    c_seq = project.c_seq
+    try:
+        _build_sequence_mlt(seq, SAVEFILE_VERSION)
+    finally:
+        project.c_seq = c_seq
+        mediafileindex.end_load()
+
+    # Media paths may have been resolved differently from saved ones when building.
+    _file_changes.sequence_changed(seq)
+
+def _start_file_changes_tracking(project, file_path, build_sequences):
+    global _sectioned_file_path, _sectioned_file_project
+    if projectfile.is_sectioned_file(file_path):
+        _sectioned_file_path = file_path
+        _sectioned_file_project = project
+    else:
+        _sectioned_file_path = None
+        _sectioned_file_project = None
+
+    _file_changes.clear(project)
+
+    # Built sequences may have media paths resolved differently from saved ones,
+    # so they are saved again.
+    for seq in build_sequences:
+        _file_changes.sequence_changed(seq)
+
 def fill_sequence_mlt(seq, SAVEFILE_VERSION):
     """
     Replaces sequences py objects with mlt objects
@@ -588,9 +756,9 @@ def fill_track_mlt(mlt_track, py_track):
             # Possibly do a relative file search to all but rendered container clip media, that needs to be re-rendered.
             if not(clip.container_data != None and clip.container_data.rendered_media != None):
                 if clip.media_type != appconsts.IMAGE_SEQUENCE:
-                    clip.path = get_media_asset_path(clip.path, _load_file_path)
+                    clip.path = _get_resolved_path(clip.path, False)
                 else:
-                    clip.path = get_img_seq_media_path(clip.path, _load_file_path)
+                    clip.path = _get_resolved_path(clip.path, True)
 
             # Try to fix possible missing proxy files for clips if we are in proxy mode.
             if not os.path.isfile(clip.path) and project_proxy_mode == appconsts.USE_PROXY_MEDIA:
@@ -682,6 +850,79 @@ def fill_filters_mlt(mlt_clip, sequence):
     
     mlt_clip.filters = filters
     
+# --------------------------------------------------------- load media preparing
+def _prepare_media(project, build_sequences):
+    """
+    Resolves media file and clip paths and probes media files using a thread pool.
+    Results are saved in _resolved_paths and producerprobecache so that creating MLT objects
+    in this thread does not need to wait on file system for each clip one after another.
+    """
+    _resolved_paths.clear()
+    _show_msg(_("Looking up media files..."))
+
+    lookups = {} # (path, is image sequence) -> media type
+    for k, media_file in project.media_files.items():
+        if not hasattr(media_file, "path"):
+            continue
+        if media_file.type == appconsts.PATTERN_PRODUCER:
+            continue
+        if media_file.is_proxy_file == True and media_file.type == appconsts.IMAGE_SEQUENCE:
+            continue
+        is_img_seq = (media_file.type == appconsts.IMAGE_SEQUENCE)
+        lookups[(media_file.path, is_img_seq)] = media_file.type
+
+    for seq in build_sequences:
+        for track in seq.tracks:
+            for clip in track.clips:
+                if clip.is_blanck_clip == True or clip.media_type == appconsts.PATTERN_PRODUCER:
+                    continue
+                container_data = getattr(clip, "container_data", None)
+                if container_data != None and container_data.rendered_media != None:
+                    continue
+                is_img_seq = (clip.media_type == appconsts.IMAGE_SEQUENCE)
+                lookups[(clip.path, is_img_seq)] = clip.media_type
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=LOAD_PREPARE_THREADS) as executor:
+        futures = {}
+        for lookup in lookups:
+            path, is_img_seq = lookup
+            futures[lookup] = executor.submit(_resolve_path, path, is_img_seq)
+
+        probe_futures = []
+        for lookup, future in futures.items():
+            try:
+                resolved_path = future.result()
+            except Exception as e:
+                print("Media path lookup failed for " + lookup[0] + ":", e)
+                continue # Path is looked up again when clip is created.
+
+            _resolved_paths[lookup] = resolved_path
+            if lookups[lookup] in (appconsts.VIDEO, appconsts.AUDIO) and resolved_path != NOT_FOUND:
+                probe_futures.append(executor.submit(_probe_file, project.profile, resolved_path))
+
+        _show_msg(_("Probing media files..."))
+        concurrent.futures.wait(probe_futures)
+
+def _resolve_path(path, is_img_seq):
+    if is_img_seq == False:
+        return get_media_asset_path(path, _load_file_path)
+    else:
+        return get_img_seq_media_path(path, _load_file_path)
+
+def _probe_file(profile, path):
+    if not os.path.isfile(path):
+        return
+    try:
+        producerprobecache.probe_file(profile, path)
+    except Exception as e:
+        print("Probing media file failed for " + path + ":", e) # Producer is created without cached probe data.
+
+def _get_resolved_path(path, is_img_seq):
+    try:
+        return _resolved_paths[(path, is_img_seq)]
+    except KeyError:
+        return _resolve_path(path, is_img_seq)
+
 #------------------------------------------------------------ track building
 # THIS IS COPYPASTED FROM edit.py TO AVOID IMPORTING IMPORT IT.
 def append_clip(track, clip, clip_in, clip_out):
@@ -746,36 +987,20 @@ def get_img_seq_media_path(path, load_file_path):
 def get_relative_path(project_file_path, asset_path):
     name = os.path.basename(asset_path)
     _show_msg(_("Relative file search for ")  + name + "...", delay=0.0)
-    matches = []
-    asset_folder, asset_file_name = os.path.split(asset_path)
-    project_folder, project_file_name =  os.path.split(project_file_path)
-    
-    for root, dirnames, filenames in os.walk(project_folder):
-        for filename in fnmatch.filter(filenames, asset_file_name):
-            matches.append(os.path.join(root, filename))
-    if len(matches) == 1:
-        return matches[0]
-    elif  len(matches) > 1:
-        return matches[0]
+    path = mediafileindex.find_file(project_file_path, asset_path)
+    if path != None:
+        return path
     else:
         return NOT_FOUND # no relative path found
 
 def get_img_seq_relative_path(project_file_path, asset_path):
     name = os.path.basename(asset_path)
     _show_msg(_("Relative file search for ")  + name + "...", delay=0.0)
-    matches = []
-    asset_folder, asset_file_name = os.path.split(asset_path)
-    look_up_file_name = utils.get_img_seq_glob_lookup_name(asset_file_name)
-    
-    project_folder, project_file_name =  os.path.split(project_file_path)
-    
-    for root, dirnames, filenames in os.walk(project_folder):
-        look_up_path = root + "/" + look_up_file_name
-        listing = glob.glob(look_up_path)
-        if len(listing) > 0:
-            return root + "/" + asset_file_name
-
-    return NOT_FOUND # no relative path found
+    path = mediafileindex.find_img_seq_file(project_file_path, asset_path)
+    if path != None:
+        return path
+    else:
+        return NOT_FOUND # no relative path found
         
     
 # ------------------------------------------------------- backwards compability
@@ -117,6 +117,11 @@ def _general_options_panel():
     load_order_combo.append_text(_("Absolute paths only"))
     load_order_combo.set_active(prefs.media_load_order)
 
+    media_index_roots_entry = Gtk.Entry()
+    media_index_roots_entry.set_text(os.pathsep.join(prefs.media_index_roots))
+    media_index_roots_entry.set_tooltip_text(_("Folders searched for moved media files when loading projects, separated by '") + os.pathsep + "'.\n" + \
+                                             _("File name indexes of these folders are saved on disk."))
+
     render_folder_select = Gtk.FileChooserButton.new (_("Select Default Render Folder"), Gtk.FileChooserAction.SELECT_FOLDER)
     if prefs.default_render_directory == None or prefs.default_render_directory == appconsts.USER_HOME_DIR \
         or (not os.path.exists(prefs.default_render_directory)) \
@@ -141,6 +146,7 @@ def _general_options_panel():
     row9 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Media look-up order on load:")), load_order_combo, PREFERENCES_LEFT))
     row10 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Default render directory:")), render_folder_select, PREFERENCES_LEFT))
     row11 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Warning on Disk Cache Size:")), disk_cache_warning_combo, PREFERENCES_LEFT))
+    row12 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Media search folders:")), media_index_roots_entry, PREFERENCES_LEFT))
 
     vbox = Gtk.VBox(False, 2)
     vbox.pack_start(row1, False, False, 0)
@@ -150,6 +156,7 @@ def _general_options_panel():
     vbox.pack_start(row5, False, False, 0)
     vbox.pack_start(row3, False, False, 0)
     vbox.pack_start(row9, False, False, 0)
+    vbox.pack_start(row12, False, False, 0)
     vbox.pack_start(row11, False, False, 0)
     vbox.pack_start(Gtk.Label(), True, True, 0)
 
@@ -157,7 +164,8 @@ def _general_options_panel():
 
     # Aug-2019 - SvdB - AS - Added autosave_combo
     return vbox, ( default_profile_combo, open_in_last_opened_check, open_in_last_rendered_check,
-                    undo_max_spin, load_order_combo, autosave_combo, render_folder_select, disk_cache_warning_combo)
+                    undo_max_spin, load_order_combo, autosave_combo, render_folder_select, disk_cache_warning_combo,
+                    media_index_roots_entry)
 
 def _edit_prefs_panel():
     prefs = editorpersistance.prefs
@@ -477,25 +485,58 @@ def _performance_panel():
     perf_drop_frames = Gtk.CheckButton()
     perf_drop_frames.set_active(prefs.perf_drop_frames)
 
+    spin_adj = Gtk.Adjustment(value=prefs.split_render_processes, lower=1, upper=multiprocessing.cpu_count(), step_incr=1)
+    split_render_processes = Gtk.SpinButton(adjustment=spin_adj)
+    split_render_processes.set_numeric(True)
+
+    spin_adj = Gtk.Adjustment(value=prefs.gmic_frames_per_batch, lower=1, upper=16, step_incr=1)
+    gmic_frames_per_batch = Gtk.SpinButton(adjustment=spin_adj)
+    gmic_frames_per_batch.set_numeric(True)
+
+    gmic_streaming_render = Gtk.CheckButton()
+    gmic_streaming_render.set_active(prefs.gmic_streaming_render)
+
+    sectioned_project_files = Gtk.CheckButton()
+    sectioned_project_files.set_active(prefs.sectioned_project_files)
+
+    compress_project_files = Gtk.CheckButton()
+    compress_project_files.set_active(prefs.compress_project_files)
+
     # Tooltips
     perf_render_threads.set_tooltip_text(_("Between 1 and the number of CPU Cores"))
     perf_drop_frames.set_tooltip_text(_("Allow Frame Dropping for real-time rendering, when needed"))
+    split_render_processes.set_tooltip_text(_("Sequence renders are split into chunks that are rendered at the same time in this many processes.\nValue 1 renders sequences in a single process."))
+    gmic_frames_per_batch.set_tooltip_text(_("G'MIC scripts are run for this many frames in one gmic process.\nScripts that change number of images are run one frame at a time."))
+    gmic_streaming_render.set_tooltip_text(_("G'MIC container clip frames are extracted, scripted and encoded at the same time in chunks."))
+    sectioned_project_files.set_tooltip_text(_("Only sequences that have changed since last save are written again when saving.\nProjects saved in this format cannot be opened with earlier Flowblade versions."))
+    compress_project_files.set_tooltip_text(_("Compress saved project data, used only with Sectioned Project Files."))
 
     # Layout
     row0 = _row(guiutils.get_left_justified_box([warning_icon, warning_label]))
     row1 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Render Threads:")), perf_render_threads, PREFERENCES_LEFT))
     row2 = _row(guiutils.get_checkbox_row_box(perf_drop_frames, Gtk.Label(label=_("Allow Frame Dropping"))))
+    row3 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Split Render Processes:")), split_render_processes, PREFERENCES_LEFT))
+    row4 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("G'MIC Frames Per Process:")), gmic_frames_per_batch, PREFERENCES_LEFT))
+    row5 = _row(guiutils.get_checkbox_row_box(gmic_streaming_render, Gtk.Label(label=_("G'MIC Container Clips Streaming Render"))))
+    row6 = _row(guiutils.get_checkbox_row_box(sectioned_project_files, Gtk.Label(label=_("Sectioned Project Files"))))
+    row7 = _row(guiutils.get_checkbox_row_box(compress_project_files, Gtk.Label(label=_("Compress Project Files"))))
 
     vbox = Gtk.VBox(False, 2)
     vbox.pack_start(row0, False, False, 0)
     vbox.pack_start(guiutils.pad_label(12, 12), False, False, 0)
     vbox.pack_start(row1, False, False, 0)
     vbox.pack_start(row2, False, False, 0)
+    vbox.pack_start(row3, False, False, 0)
+    vbox.pack_start(row4, False, False, 0)
+    vbox.pack_start(row5, False, False, 0)
+    vbox.pack_start(row6, False, False, 0)
+    vbox.pack_start(row7, False, False, 0)
     vbox.pack_start(Gtk.Label(), True, True, 0)
 
     guiutils.set_margins(vbox, 12, 0, 12, 12)
 
-    return vbox, (perf_render_threads, perf_drop_frames)
+    return vbox, (perf_render_threads, perf_drop_frames, split_render_processes, gmic_frames_per_batch, gmic_streaming_render, \
+                  sectioned_project_files, compress_project_files)
 
 def _row(row_cont):
     row_cont.set_size_request(10, 26)
@@ -0,0 +1,171 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <http://code.google.com/p/flowblade>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+"""
+Module caches properties of probed file producers so that media file used in many
+timeline clips is only opened and probed once.
+
+Later producers for same file are created as 'avformat-novalidate' producers that get
+probed properties set from cache and open file only when first frame is requested. This is
+the same way MLT xml loader creates producers for saved projects.
+
+Probe data is not shared for image sequences, pattern and color producers, MLT XML files,
+files modified very recently and files that change while app is running.
+"""
+
+import mlt
+import os
+import stat
+import threading
+import time
+
+import editorpersistance
+import utils
+
+AVFORMAT_SERVICE = "avformat"
+AVFORMAT_NOVALIDATE_SERVICE = "avformat-novalidate"
+
+# These are set by MLT when producer is created and are not copied.
+NOT_COPIED_PROPERTIES = ["mlt_type", "mlt_service", "resource"]
+
+# Files modified this recently may still be being written and are not cached.
+RECENTLY_MODIFIED_TIME = 10.0 # seconds
+
+_probed_properties = {} # cache key -> list of (name, value) tuples, or None for files that are not cached
+_path_stats = {} # path -> (size, mtime) when first cached
+_excluded_paths = set() # paths of files that changed while app was running, these are not cached anymore
+_cache_lock = threading.Lock()
+
+
+def get_file_producer(profile, path):
+    """
+    Returns new file producer for path, using cached probe data if available.
+    """
+    if editorpersistance.prefs.producer_probe_cache == False:
+        return mlt.Producer(profile, str(path))
+
+    key = _get_key(profile, path)
+    if key == None:
+        return mlt.Producer(profile, str(path))
+
+    with _cache_lock:
+        try:
+            properties = _probed_properties[key]
+            cached = True
+        except KeyError:
+            properties = None
+            cached = False
+
+    if cached == False:
+        producer = mlt.Producer(profile, str(path))
+        properties = _get_cacheable_properties(producer)
+        with _cache_lock:
+            _probed_properties[key] = properties
+        return producer
+
+    if properties == None:
+        return mlt.Producer(profile, str(path)) # Image, image sequence, MLT xml etc.
+
+    producer = mlt.Producer(profile, AVFORMAT_NOVALIDATE_SERVICE, str(path))
+    if producer.is_valid() == False:
+        return mlt.Producer(profile, str(path))
+
+    for name, value in properties:
+        producer.set(name, value)
+
+    return producer
+
+def probe_file(profile, path):
+    """
+    Probes file and caches its properties if not already cached. This can be called
+    from worker threads to have files probed before producers are needed.
+    """
+    if editorpersistance.prefs.producer_probe_cache == False:
+        return
+
+    key = _get_key(profile, path)
+    if key == None:
+        return
+
+    with _cache_lock:
+        if key in _probed_properties:
+            return
+
+    producer = mlt.Producer(profile, str(path))
+    properties = _get_cacheable_properties(producer)
+    with _cache_lock:
+        _probed_properties[key] = properties
+
+def clear():
+    with _cache_lock:
+        _probed_properties.clear()
+        _path_stats.clear()
+
+def _get_key(profile, path):
+    # Returns None for media that is not safe to share probe data for.
+    path = str(path)
+    with _cache_lock:
+        if path in _excluded_paths:
+            return None
+
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return None # Image sequences, pattern and color producers have no file at path.
+
+    if not stat.S_ISREG(file_stat.st_mode):
+        return None
+    if "%" in os.path.basename(path):
+        return None # Image sequence
+    if utils.is_mlt_xml_file(path) == True:
+        return None # MLT XML producers change profile when loaded, container and compound clips are not shared.
+    if time.time() - file_stat.st_mtime < RECENTLY_MODIFIED_TIME:
+        return None
+
+    # Files that change while app is running, e.g. during load, are excluded from then on.
+    file_stats = (file_stat.st_size, file_stat.st_mtime)
+    with _cache_lock:
+        first_stats = _path_stats.setdefault(path, file_stats)
+        if first_stats != file_stats:
+            print("Media file changed while in use, not caching probe data for " + path)
+            _excluded_paths.add(path)
+            return None
+
+    # File size and modification time make sure that changed files are probed again.
+    return (path, file_stat.st_size, file_stat.st_mtime, profile.description(), profile.frame_rate_num(), profile.frame_rate_den())
+
+def _get_cacheable_properties(producer):
+    if producer.is_valid() == False:
+        return None
+    if producer.get("mlt_service") != AVFORMAT_SERVICE:
+        return None
+
+    properties = []
+    for i in range(0, producer.count()):
+        name = producer.get_name(i)
+        if name.startswith("_") or name in NOT_COPIED_PROPERTIES:
+            continue
+        value = producer.get(i)
+        if value == None:
+            continue
+        properties.append((name, value))
+
+    return properties
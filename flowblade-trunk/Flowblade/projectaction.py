@@ -71,6 +71,7 @@ import modesetting
 import movemodes
 import mltprofiles
 import persistance
+import projectchanges
 import projectdata
 import projectinfogui
 import projectmediaimport
@@ -402,6 +403,7 @@ def _load_pulse_bar():
 
 def _enable_save():
     gui.editor_window.uimanager.get_widget("/MenuBar/FileMenu/Save").set_sensitive(True)
+    projectchanges.project_changed()
 
 
 # ---------------------------------- project: new, load, save
@@ -1345,6 +1347,7 @@ def media_file_name_edited(dialog, response_id, data):
         return
 
     media_file.name = new_text
+    projectchanges.media_changed(media_file.id)
     gui.media_list_view.fill_data_model()
 
 def _display_file_info(media_file):
@@ -1362,7 +1365,11 @@ def _display_file_info(media_file):
     length = utils.get_tc_string(info["length"])
 
     try:
-        img = guiutils.get_gtk_image_from_file(media_file.icon_path, 300)
+        if os.path.isfile(media_file.icon_path):
+            img = guiutils.get_gtk_image_from_file(media_file.icon_path, 300)
+        else:
+            # Thumbnails created by thumbnailengine.py only exist in memory and in thumbnails cache.
+            img = guiutils.get_gtk_image_from_surface(media_file.icon, 300)
     except:
         print("_display_file_info() failed to get thumbnail")
     
@@ -1564,6 +1571,7 @@ def _do_create_sequence_compound_clip_from_selected(dialog, response_id, name_en
     (model, rows) = selection.get_selected_rows()
     row = max(rows[0])
     selected_sequence = PROJECT().sequences[row]
+    persistance.load_sequence_mlt(PROJECT(), selected_sequence) # Sequences are built when first needed.
 
     render_player = renderconsumer.XMLRenderPlayer( write_file, _sequence_xml_compound_render_done_callback, 
                                                     (write_file, media_name), selected_sequence, 
@@ -1968,6 +1976,7 @@ def sequence_name_edited(cell, path, new_text, user_data):
     liststore, column = user_data
     liststore[path][column] = new_text
     PROJECT().sequences[int(path)].name = new_text
+    projectchanges.sequence_changed(PROJECT().sequences[int(path)])
 
     _enable_save()
 
@@ -2016,6 +2025,8 @@ def _combine_sequences_dialog_callback(dialog, response_id, action_select, seq_s
     seq = selectable_seqs[seq_select.get_active()]
     
     dialog.destroy()
+
+    persistance.load_sequence_mlt(PROJECT(), seq) # Sequences are built when first needed.
     
     if action == 0:
         _append_sequence(seq)
@@ -0,0 +1,99 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <http://code.google.com/p/flowblade>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+
+"""
+Module tracks which parts of project have changed.
+
+Edit actions, undo/redo, effect editors, media adding and removing and other saved edits 
+report changes with functions below. Every registered ChangeTracker records them, 
+so autosave journal and sectioned project file saves can each only pickle parts of project 
+that have changed since they last saved.
+"""
+
+import editorstate
+
+_trackers = []
+
+
+class ChangeTracker:
+    
+    def __init__(self):
+        self.clear(None)
+
+    def clear(self, project):
+        # Called when project has been saved and tracking starts again.
+        self.project_changed = False
+        self.changed_sequences = [] # sequence objects
+        self.changed_media_ids = set()
+        if project != None:
+            self.saved_sequences = list(project.sequences) # sequence objects in project order when saved
+            self.saved_media_ids = set(project.media_files.keys())
+        else:
+            self.saved_sequences = []
+            self.saved_media_ids = set()
+
+    def has_changes(self):
+        return self.project_changed == True or len(self.changed_sequences) > 0 or len(self.changed_media_ids) > 0
+
+    def sequence_changed(self, seq):
+        if not any(changed is seq for changed in self.changed_sequences):
+            self.changed_sequences.append(seq)
+
+    def media_changed(self, media_file_id):
+        self.changed_media_ids.add(media_file_id)
+
+    def is_sequence_changed(self, seq):
+        # Sequences added after save are changed too.
+        return any(changed is seq for changed in self.changed_sequences) or self.get_saved_sequence_index(seq) == -1
+
+    def is_media_changed(self, media_file_id):
+        return media_file_id in self.changed_media_ids or media_file_id not in self.saved_media_ids
+
+    def get_saved_sequence_index(self, seq):
+        for i in range(0, len(self.saved_sequences)):
+            if self.saved_sequences[i] is seq:
+                return i
+        return -1
+
+
+def add_tracker(tracker):
+    _trackers.append(tracker)
+
+
+# --------------------------------------------------------------- change reporting
+def sequence_changed(seq):
+    if seq == None:
+        return
+    for tracker in _trackers:
+        tracker.sequence_changed(seq)
+
+def media_changed(media_file_id):
+    for tracker in _trackers:
+        tracker.media_changed(media_file_id)
+
+def project_changed():
+    # Bins, sequences list, media log and other data saved with project object.
+    # Not all saved edits of current sequence report themselves, so it is changed too.
+    for tracker in _trackers:
+        tracker.project_changed = True
+    if editorstate.project != None:
+        sequence_changed(editorstate.current_sequence())
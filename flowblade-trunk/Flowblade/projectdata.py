@@ -34,9 +34,12 @@ import editorpersistance
 from editorstate import PROJECT
 import mltprofiles
 import patternproducer
+import producerprobecache
+import projectchanges
 import miscdataobjects
 import respaths
 import sequence
+import thumbnailengine
 import userfolders
 import utils
 
@@ -133,8 +136,8 @@ class Project:
             icon_path = respaths.IMAGE_PATH + "audio_file.png"
             length = thumbnailer.get_file_length(file_path)
             info = None
-        else: # For non-audio we need write a thumbbnail file and get file lengh while we're at it
-             (icon_path, length, info) = thumbnailer.write_image(file_path)
+        else: # For non-audio we need file length and info now, thumbnail is created later by thumbnailengine.py
+             (icon_path, length, info) = thumbnailer.probe_file(file_path)
 
         # Hide file extension if enabled in user preferences
         clip_name = file_name
@@ -170,6 +173,8 @@ class Project:
         
         self.media_files[media_object.id] = media_object
         self.next_media_file_id += 1
+        projectchanges.media_changed(media_object.id)
+        projectchanges.project_changed()
 
         # Add to bin
         if target_bin == None:
@@ -209,6 +214,7 @@ class Project:
         media_files_changed_since_last_save = True
 
         self.c_bin.file_ids.pop(media_file.id)
+        projectchanges.project_changed()
 
     def get_current_proxy_paths(self):
         paths_dict = {}
@@ -363,6 +369,11 @@ class MediaFile:
             self.length = l
  
     def create_icon(self):
+        # Thumbnails are extracted in worker threads and placeholder icon is displayed until they are ready.
+        if thumbnailengine.is_thumbnail_path(self.icon_path):
+            thumbnailengine.request_icon(self)
+            return
+
         try:
             self.icon = self._create_image_surface(self.icon_path)
         except:
@@ -481,38 +492,21 @@ class Thumbnailer:
 
     def set_context(self, profile):
         self.profile = profile
-    
-    def write_image(self, file_path):
+        thumbnailengine.set_profile(profile)
+
+    def probe_file(self, file_path):
         """
-        Writes thumbnail image from file producer
+        Returns thumbnail path, length and info for file without writing thumbnail image.
         """
-        # Get data
-        md_str = hashlib.md5(file_path.encode('utf-8')).hexdigest()
-        thumbnail_path = userfolders.get_cache_dir() + appconsts.THUMBNAILS_DIR + "/" + md_str +  ".png"
-
-        # Create consumer
-        consumer = mlt.Consumer(self.profile, "avformat", 
-                                     thumbnail_path)
-        consumer.set("real_time", 0)
-        consumer.set("vcodec", "png")
-
-        # Create one frame producer
-        producer = mlt.Producer(self.profile, str(file_path))
+        producer = producerprobecache.get_file_producer(self.profile, file_path)
         if producer.is_valid() == False:
             raise ProducerNotValidError(file_path)
 
         info = utils.get_file_producer_info(producer)
-
         length = producer.get_length()
-        frame = length // 2
-        producer = producer.cut(frame, frame)
-
-        # Connect and write image
-        consumer.connect(producer)
-        consumer.run()
         
-        return (thumbnail_path, length, info)
-
+        return (thumbnailengine.get_thumbnail_path(file_path), length, info)
+    
     def get_file_length(self, file_path):
         # This is used for audio files which don't need a thumbnail written
         # but do need file length known
@@ -0,0 +1,212 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <http://code.google.com/p/flowblade>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+"""
+Module handles sectioned project file format.
+
+Project data is split into sections that are pickled and optionally compressed separately:
+project data, media files, media log and every sequence. File layout is:
+
+    FILE_MAGIC, section data blocks..., table of contents, footer
+
+Table of contents is pickled dict section key -> (offset, length, compressed) and footer
+gives its offset. When saving over an existing sectioned file, caller can give sequences that have
+not changed since that file was written, their stored data is copied as is without pickling or 
+compressing them again. File is always written atomically.
+
+Files in this format cannot be opened by Flowblade versions before it was added, so it is only
+used when enabled in preferences.
+
+persistance.py creates pickleable project objects and builds MLT objects from loaded data,
+this module only writes and reads the file.
+"""
+
+import os
+import pickle
+import struct
+import zlib
+
+import atomicfile
+
+FILE_MAGIC = b"FLBSECT2"
+FOOTER_MAGIC = b"FLBTOC02"
+FOOTER = struct.Struct("<Q8s") # table of contents offset, FOOTER_MAGIC
+
+# Section keys
+PROJECT_SECTION = "project"
+MEDIA_FILES_SECTION = "media_files"
+MEDIA_LOG_SECTION = "media_log"
+SEQUENCE_SECTION = "sequence" # keys for sequences are (SEQUENCE_SECTION, index) tuples
+
+# Sections smaller than this are not compressed.
+COMPRESS_MIN_SIZE = 4096
+
+
+class ProjectFileError(Exception):
+
+    def __init__(self, value):
+        self.value = value
+    def __str__(self):
+        return repr(self.value)
+
+
+# ------------------------------------------------------------ saving
+def save(s_proj, file_path, compress=True, copied_sequences=None):
+    """
+    Writes pickleable project object as sectioned project file.
+
+    copied_sequences is dict sequence index -> sequence index in existing file at file_path
+    for sequences that are None in s_proj.sequences, stored data for these is copied from existing file.
+    """
+    sections = _get_sections(s_proj)
+
+    if copied_sequences == None or len(copied_sequences) == 0:
+        _write_sections(file_path, sections, None, {}, compress)
+        return
+
+    # New file is written next to old one and renamed over it, so an interrupted save
+    # leaves old file untouched.
+    with open(file_path, "rb") as old_file:
+        old_toc = _read_toc(old_file)
+        copied_entries = {}
+        for i, old_index in copied_sequences.items():
+            copied_entries[(SEQUENCE_SECTION, i)] = old_toc[(SEQUENCE_SECTION, old_index)]
+        _write_sections(file_path, sections, old_file, copied_entries, compress)
+
+def _get_sections(s_proj):
+    # Returns list of (section key, pickled data) tuples, data is None for sequences that are copied.
+    # Media log events are referenced from media log groups so they are saved in same section.
+    media_files = s_proj.media_files
+    sequences = s_proj.sequences
+    media_log = (getattr(s_proj, "media_log", []), getattr(s_proj, "media_log_groups", []))
+    s_proj.media_files = {}
+    s_proj.sequences = []
+    s_proj.media_log = []
+    s_proj.media_log_groups = []
+
+    sections = []
+    try:
+        sections.append((PROJECT_SECTION, pickle.dumps(s_proj)))
+        sections.append((MEDIA_FILES_SECTION, pickle.dumps(media_files)))
+        sections.append((MEDIA_LOG_SECTION, pickle.dumps(media_log)))
+        for i in range(0, len(sequences)):
+            if sequences[i] != None:
+                sections.append(((SEQUENCE_SECTION, i), pickle.dumps(sequences[i])))
+            else:
+                sections.append(((SEQUENCE_SECTION, i), None))
+    finally:
+        s_proj.media_files = media_files
+        s_proj.sequences = sequences
+        s_proj.media_log, s_proj.media_log_groups = media_log
+
+    return sections
+
+def _write_sections(file_path, sections, old_file, copied_entries, compress):
+    with atomicfile.AtomicFileWriter(file_path, "wb") as afw:
+        outfile = afw.get_file()
+        outfile.write(FILE_MAGIC)
+        toc = {}
+        for key, section_data in sections:
+            if section_data == None:
+                toc[key] = _copy_section(old_file, outfile, copied_entries[key])
+            else:
+                toc[key] = _write_section(outfile, section_data, compress)
+        _write_toc(outfile, toc)
+
+def _copy_section(old_file, outfile, old_entry):
+    offset, length, compressed = old_entry
+    old_file.seek(offset)
+    stored_data = old_file.read(length)
+    if len(stored_data) != length:
+        raise ProjectFileError("section data truncated")
+
+    new_offset = outfile.tell()
+    outfile.write(stored_data)
+    return (new_offset, length, compressed)
+
+def _write_section(outfile, section_data, compress):
+    compressed = (compress == True and len(section_data) >= COMPRESS_MIN_SIZE)
+    if compressed == True:
+        section_data = zlib.compress(section_data, 1)
+
+    offset = outfile.tell()
+    outfile.write(section_data)
+    return (offset, len(section_data), compressed)
+
+def _write_toc(outfile, toc):
+    toc_offset = outfile.tell()
+    outfile.write(pickle.dumps(toc))
+    outfile.write(FOOTER.pack(toc_offset, FOOTER_MAGIC))
+
+
+# ------------------------------------------------------------ loading
+def is_sectioned_file(file_path):
+    try:
+        with open(file_path, "rb") as f:
+            return f.read(len(FILE_MAGIC)) == FILE_MAGIC
+    except OSError:
+        return False
+
+def load(file_path):
+    """
+    Returns pickleable project object from sectioned project file.
+    """
+    with open(file_path, "rb") as f:
+        toc = _read_toc(f)
+
+        s_proj = pickle.loads(_read_section(f, toc[PROJECT_SECTION]))
+        s_proj.media_files = pickle.loads(_read_section(f, toc[MEDIA_FILES_SECTION]))
+        s_proj.media_log, s_proj.media_log_groups = pickle.loads(_read_section(f, toc[MEDIA_LOG_SECTION]))
+
+        sequences = []
+        i = 0
+        while (SEQUENCE_SECTION, i) in toc:
+            sequences.append(pickle.loads(_read_section(f, toc[(SEQUENCE_SECTION, i)])))
+            i += 1
+        s_proj.sequences = sequences
+
+    return s_proj
+
+def _read_toc(f):
+    f.seek(0)
+    if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+        raise ProjectFileError("not a sectioned project file")
+
+    f.seek(0, os.SEEK_END)
+    toc_end = f.tell() - FOOTER.size
+    f.seek(toc_end)
+    toc_offset, footer_magic = FOOTER.unpack(f.read(FOOTER.size))
+    if footer_magic != FOOTER_MAGIC:
+        raise ProjectFileError("no table of contents found")
+
+    f.seek(toc_offset)
+    toc = pickle.loads(f.read(toc_end - toc_offset))
+    if PROJECT_SECTION not in toc:
+        raise ProjectFileError("bad table of contents")
+    return toc
+
+def _read_section(f, toc_entry):
+    offset, length, compressed = toc_entry
+    f.seek(offset)
+    section_data = f.read(length)
+    if compressed == True:
+        section_data = zlib.decompress(section_data)
+    return section_data
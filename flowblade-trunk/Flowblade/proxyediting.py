@@ -40,6 +40,8 @@ import guiutils
 import jobs
 import mltrefhold
 import persistance
+import projectchanges
+import proxystore
 import render
 import renderconsumer
 import sequence
@@ -74,6 +76,11 @@ class ProxyRenderItemData:
         self.media_file_path = media_file_path
         self.proxy_profile_desc = proxy_profile_desc
         self.lookup_path = lookup_path # For img seqs only
+
+        # When proxy goes to shared proxy store it is rendered to proxy_file_path and moved here when complete.
+        self.store_proxy_path = None
+        # Other media files with same content that get this proxy when render completes.
+        self.extra_media_file_ids = []
         
         # We're packing this to go, jobs.py is imported into this module and we wish to not import this into jobs.py
         self.do_auto_re_convert_func = _auto_re_convert_after_proxy_render_in_proxy_mode
@@ -103,13 +110,24 @@ class ProxyRenderRunnerThread(threading.Thread):
         proxy_w, proxy_h =  _get_proxy_dimensions(self.proxy_profile, editorstate.PROJECT().proxy_data.size)
         enc_index = editorstate.PROJECT().proxy_data.encoding
 
+        # Media files are fingerprinted here and not on GTK thread, reading samples from many large files takes time.
         proxy_render_items = []
+        reused_store_proxies = []
         for media_file in self.files_to_render:
             if media_file.type != appconsts.IMAGE_SEQUENCE:
                 
                 
                 proxy_encoding = renderconsumer.proxy_encodings[enc_index]
-                proxy_file_path = media_file.create_proxy_path(proxy_w, proxy_h, proxy_encoding.extension)
+                store_proxy_path = proxystore.get_store_proxy_path(media_file, proxy_w, proxy_h, 
+                                                                   proxy_encoding.name, proxy_encoding.extension)
+                # Proxy for media with same content and these exact settings is in shared proxy store, just use it.
+                if store_proxy_path != None and proxystore.store_proxy_exists(store_proxy_path):
+                    reused_store_proxies.append((media_file, store_proxy_path))
+                    continue
+                if store_proxy_path != None:
+                    proxy_file_path = proxystore.get_rendering_path(store_proxy_path)
+                else:
+                    proxy_file_path = media_file.create_proxy_path(proxy_w, proxy_h, proxy_encoding.extension)
 
                 # Bit rates for proxy files are counted using 2500kbs for 
                 # PAL size image as starting point.
@@ -133,19 +151,37 @@ class ProxyRenderRunnerThread(threading.Thread):
                 lookup_filename = utils.get_img_seq_glob_lookup_name(asset_file_name)
                 lookup_path = asset_folder + "/" + lookup_filename
 
-                proxy_file_path = media_file.create_proxy_path(proxy_w, proxy_h, None)
+                store_proxy_path = proxystore.get_store_proxy_path(media_file, proxy_w, proxy_h, None, None)
+                if store_proxy_path != None and proxystore.store_proxy_exists(store_proxy_path):
+                    reused_store_proxies.append((media_file, store_proxy_path))
+                    continue
+                if store_proxy_path != None:
+                    proxy_file_path = proxystore.get_rendering_path(store_proxy_path)
+                else:
+                    proxy_file_path = media_file.create_proxy_path(proxy_w, proxy_h, None)
         
                 # media_file.path, proxy_file_path, proxy_w, proxy_h, lookup_path
                 item_data = ProxyRenderItemData(media_file.id, proxy_w, proxy_h, -1,
                                 proxy_file_path, -1, media_file.path,
                                 self.proxy_profile.description(),
                                 lookup_path)
-                
+
+            item_data.store_proxy_path = store_proxy_path
             proxy_render_items.append(item_data)
         
         Gdk.threads_enter()
-        
+
+        if len(reused_store_proxies) > 0:
+            _use_store_proxies(reused_store_proxies, len(proxy_render_items) == 0)
+
         for proxy_render_data_item in proxy_render_items:
+            # Media files with same content as a file already being rendered get proxy from that render.
+            if proxy_render_data_item.store_proxy_path != None:
+                queued_job = jobs.get_unfinished_proxy_render_job(proxy_render_data_item.proxy_file_path)
+                if queued_job != None:
+                    queued_job.render_data.extra_media_file_ids.append(proxy_render_data_item.media_file_id)
+                    continue
+
             session_id = hashlib.md5(str(os.urandom(32)).encode('utf-8')).hexdigest()
             job_queue_object = jobs.ProxyRenderJobQueueObject(session_id, proxy_render_data_item)
             job_queue_object.add_to_queue()
@@ -440,7 +476,8 @@ def create_proxy_menu_item_selected(media_file):
 def _do_create_proxy_files(media_files, retry_from_render_folder_select=False):
     proxy_profile = _get_proxy_profile(editorstate.PROJECT())
     proxy_w, proxy_h =  _get_proxy_dimensions(proxy_profile, editorstate.PROJECT().proxy_data.size)
-    proxy_file_extension = _get_proxy_encoding().extension
+    proxy_encoding = _get_proxy_encoding()
+    proxy_file_extension = proxy_encoding.extension
 
     files_to_render = []
     not_video_files = 0
@@ -465,7 +502,7 @@ def _do_create_proxy_files(media_files, retry_from_render_folder_select=False):
             if os.path.isdir(p_folder):
                 already_have_proxies.append(f)
                 continue
-                
+
         path_for_size_and_encoding = f.create_proxy_path(proxy_w, proxy_h, proxy_file_extension)
         if os.path.exists(path_for_size_and_encoding): # A proxy for media file (with these exact settings) has been created by other projects. 
                                                        # Get user to confirm overwrite
@@ -487,7 +524,21 @@ def _do_create_proxy_files(media_files, retry_from_render_folder_select=False):
                                                              proxy_w, proxy_h, proxy_file_extension)
         return
 
-    _create_proxy_files(files_to_render)
+    if len(files_to_render) > 0:
+        _create_proxy_files(files_to_render)
+
+def _use_store_proxies(reused_store_proxies, nothing_to_render):
+    for media_file, store_proxy_path in reused_store_proxies:
+        media_file.add_proxy_file(store_proxy_path)
+        projectchanges.media_changed(media_file.id)
+        if editorstate.PROJECT().proxy_data.proxy_mode == appconsts.USE_PROXY_MEDIA:
+            media_file.set_as_proxy_media_file()
+
+    gui.media_list_view.widget.queue_draw()
+    # When there is nothing to render, clips need to be converted to use proxies here
+    # instead of after last proxy render is complete.
+    if editorstate.PROJECT().proxy_data.proxy_mode == appconsts.USE_PROXY_MEDIA and nothing_to_render == True:
+        _auto_re_convert_after_proxy_render_in_proxy_mode()
 
 def _set_media_files_to_use_unique_proxies(media_files_list):
     for media_file in media_files_list:
@@ -0,0 +1,191 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <http://code.google.com/p/flowblade>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+"""
+Module handles content addressed proxy store shared by all projects.
+
+Proxy files are stored using a key computed from a fast fingerprint of media file
+contents and proxy size and encoding, so the same media used in several projects, or
+copied and renamed, gets the same proxy file and needs to be rendered only once.
+"""
+
+import glob
+import hashlib
+import os
+import shutil
+import threading
+
+import appconsts
+import userfolders
+import utils
+
+PROXY_STORE_DIR = "store/"
+RENDERING_SUFFIX = "_rendering"
+
+SAMPLE_SIZE = 65536 # bytes read from start, middle and end of file for fingerprint
+IMG_SEQ_FINGERPRINT_PREFIX = "imgseq"
+
+_fingerprints = {} # (path, size, mtime_ns) -> fingerprint, files are not hashed again while app runs
+_fingerprints_lock = threading.Lock()
+
+
+# ------------------------------------------------------------- store paths
+def get_store_proxy_path(media_file, proxy_w, proxy_h, encoding_name, file_extension):
+    """
+    Returns path for media file proxy in shared store or None if media file proxy
+    should not be in store.
+    """
+    # User has asked to re-render proxies as unique files not used by other projects.
+    if hasattr(media_file, "use_unique_proxy"):
+        return None
+
+    if media_file.type == appconsts.IMAGE_SEQUENCE:
+        fingerprint = get_img_seq_fingerprint(media_file.path)
+    else:
+        fingerprint = get_file_fingerprint(media_file.path)
+
+    if fingerprint == None:
+        return None
+
+    store_key = _get_store_key(fingerprint, proxy_w, proxy_h, encoding_name)
+    if media_file.type == appconsts.IMAGE_SEQUENCE:
+        folder, file_name = os.path.split(media_file.path)
+        return _get_store_dir() + store_key + "/" + file_name
+    else:
+        return _get_store_dir() + store_key + "." + file_extension
+
+def get_rendering_path(store_proxy_path):
+    # Proxies are rendered to a temp path and moved into store when complete, so
+    # a proxy existing in store is always fully rendered.
+    if is_img_seq_path(store_proxy_path):
+        folder, file_name = os.path.split(store_proxy_path)
+        return folder + RENDERING_SUFFIX + "/" + file_name
+    else:
+        path_start, ext = os.path.splitext(store_proxy_path)
+        return path_start + RENDERING_SUFFIX + ext
+
+def store_proxy_exists(store_proxy_path):
+    if is_img_seq_path(store_proxy_path):
+        folder, file_name = os.path.split(store_proxy_path)
+        return os.path.isdir(folder)
+    else:
+        return os.path.isfile(store_proxy_path)
+
+def move_rendered_proxy(rendering_path, store_proxy_path):
+    try:
+        if is_img_seq_path(store_proxy_path):
+            rendering_folder, file_name = os.path.split(rendering_path)
+            store_folder, file_name = os.path.split(store_proxy_path)
+            if os.path.isdir(store_folder):
+                shutil.rmtree(store_folder)
+            os.rename(rendering_folder, store_folder)
+        else:
+            os.replace(rendering_path, store_proxy_path)
+    except OSError as e:
+        print("Moving proxy into proxy store failed:", e)
+        return rendering_path # Proxy is still usable from where it was rendered.
+
+    return store_proxy_path
+
+def is_img_seq_path(proxy_path):
+    folder, file_name = os.path.split(proxy_path)
+    return "%" in file_name
+
+def _get_store_key(fingerprint, proxy_w, proxy_h, encoding_name):
+    key_str = fingerprint + str(proxy_w) + "x" + str(proxy_h) + str(encoding_name)
+    return hashlib.md5(key_str.encode('utf-8')).hexdigest()
+
+def _get_store_dir():
+    store_dir = userfolders.get_render_dir() + "/" + appconsts.PROXIES_DIR + PROXY_STORE_DIR
+    if not os.path.exists(store_dir):
+        os.makedirs(store_dir)
+    return store_dir
+
+
+# ------------------------------------------------------------- fingerprints
+def get_file_fingerprint(file_path):
+    """
+    Returns fingerprint string computed from file size, modification time and bytes
+    sampled from start, middle and end of file, or None if file cannot be read.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+
+    cache_key = (file_path, stat.st_size, stat.st_mtime_ns)
+    with _fingerprints_lock:
+        fingerprint = _fingerprints.get(cache_key)
+    if fingerprint != None:
+        return fingerprint
+
+    md5 = hashlib.md5()
+    md5.update((str(stat.st_size) + ":" + str(stat.st_mtime_ns)).encode('utf-8'))
+    try:
+        _update_with_sampled_bytes(md5, file_path, stat.st_size)
+    except OSError:
+        return None
+
+    fingerprint = md5.hexdigest()
+    with _fingerprints_lock:
+        _fingerprints[cache_key] = fingerprint
+    return fingerprint
+
+def get_img_seq_fingerprint(img_seq_path):
+    # Image sequences are fingerprinted using names, sizes and modification times of all frames
+    # and sampled bytes of first frame.
+    asset_folder, asset_file_name = os.path.split(img_seq_path)
+    try:
+        lookup_path = asset_folder + "/" + utils.get_img_seq_glob_lookup_name(asset_file_name)
+    except IndexError:
+        return None
+
+    listing = sorted(glob.glob(lookup_path))
+    if len(listing) == 0:
+        return None
+
+    md5 = hashlib.md5()
+    md5.update(IMG_SEQ_FINGERPRINT_PREFIX.encode('utf-8'))
+    try:
+        for frame_path in listing:
+            stat = os.stat(frame_path)
+            frame_folder, frame_name = os.path.split(frame_path)
+            md5.update((frame_name + ":" + str(stat.st_size) + ":" + str(stat.st_mtime_ns)).encode('utf-8'))
+
+        first_frame_fingerprint = get_file_fingerprint(listing[0])
+    except OSError:
+        return None
+
+    if first_frame_fingerprint == None:
+        return None
+    md5.update(first_frame_fingerprint.encode('utf-8'))
+
+    return md5.hexdigest()
+
+def _update_with_sampled_bytes(md5, file_path, file_size):
+    with open(file_path, "rb") as media_file:
+        if file_size <= SAMPLE_SIZE * 3:
+            md5.update(media_file.read())
+            return
+
+        for offset in (0, (file_size - SAMPLE_SIZE) // 2, file_size - SAMPLE_SIZE):
+            media_file.seek(offset)
+            md5.update(media_file.read(SAMPLE_SIZE))
@@ -30,6 +30,8 @@ import time
 import threading
 import xml.dom.minidom
 import os
+import shutil
+import subprocess
 # Jan-2017 - SvdB
 import editorpersistance
 
@@ -398,6 +400,55 @@ def _parse_line(line_start, line_end, buf):
     return ((k,v), None)
 
 
+# ------------------------------------------------------------ segments join
+def concat_video_files(segment_paths, file_path, list_file_path):
+    """
+    Joins video files rendered with same encoding into one file without re-encoding
+    using ffmpeg concat demuxer. Returns True if join succeeded.
+    """
+    if shutil.which("ffmpeg") == None:
+        return False
+
+    with open(list_file_path, "w") as list_file:
+        for segment_path in segment_paths:
+            list_file.write("file '" + segment_path.replace("'", "'\\''") + "'\n")
+
+    command_list = ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", 
+                    "-i", list_file_path, "-c", "copy", str(file_path)]
+    try:
+        completed = subprocess.run(command_list, stdin=subprocess.DEVNULL)
+        success = (completed.returncode == 0)
+    except OSError:
+        success = False
+
+    os.remove(list_file_path)
+    return success
+
+def mux_audio_file(video_path, audio_path, file_path):
+    """
+    Writes video stream from video file and audio stream from audio file into one file
+    without re-encoding. Returns True if mux succeeded.
+    """
+    if shutil.which("ffmpeg") == None:
+        return False
+
+    command_list = ["ffmpeg", "-y", "-loglevel", "error", "-i", str(video_path), "-i", str(audio_path),
+                    "-map", "0:v", "-map", "1:a", "-c", "copy", str(file_path)]
+    try:
+        completed = subprocess.run(command_list, stdin=subprocess.DEVNULL)
+        return (completed.returncode == 0)
+    except OSError:
+        return False
+
+def get_segments_playlist_producer(profile, segment_paths):
+    # Used to re-encode segments into one file if they cannot be joined with concat_video_files().
+    playlist = mlt.Playlist()
+    for segment_path in segment_paths:
+        producer = mlt.Producer(profile, str(segment_path))
+        playlist.append(producer)
+    return playlist
+
+
 class FileRenderPlayer(threading.Thread):
     def __init__(self, file_name, producer, consumer, start_frame, stop_frame):
         self.file_name = file_name
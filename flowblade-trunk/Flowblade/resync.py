@@ -35,6 +35,10 @@ from editorstate import current_sequence
 # Maps clip -> track
 sync_children = {}
 
+# Maps clip -> (track, index, clip start frame) for clips on parent track and tracks with child clips.
+# This is built once after edits and is reused until next edit changes tracks, see _get_clip_positions().
+_clip_positions = None
+
 # ----------------------------------------- sync display updating
 def clip_added_to_timeline(clip, track):
     if clip.sync_data != None:
@@ -54,30 +58,29 @@ def clip_sync_cleared(clip):
     except KeyError:
         pass
 
+def clip_positions_changed():
+    # Called by edit.py atomic edit ops.
+    global _clip_positions
+    _clip_positions = None
+
 def sequence_changed(new_sequence):
     global sync_children
     sync_children = {}
+    clip_positions_changed()
     for track in new_sequence.tracks:
         for clip in track.clips:
             clip_added_to_timeline(clip, track)
     calculate_and_set_child_clip_sync_states()
 
 def calculate_and_set_child_clip_sync_states():
+    clip_positions = _get_clip_positions()
     parent_track = current_sequence().first_video_track()
     for child_clip, track in sync_children.items():
-        child_index = track.clips.index(child_clip)
-        child_clip_start = track.clip_start(child_index) - child_clip.clip_in
-
-        #print child_clip.id
-        parent_clip = child_clip.sync_data.master_clip
-        try:
-            parent_index = parent_track.clips.index(parent_clip)
-        except:
+        child_index, pos_offset = _get_child_clip_index_and_pos_offset(clip_positions, parent_track, child_clip, track)
+        if pos_offset == None:
             child_clip.sync_data.sync_state = appconsts.SYNC_PARENT_GONE
             continue
-        parent_clip_start = parent_track.clip_start(parent_index) - parent_clip.clip_in
 
-        pos_offset = child_clip_start - parent_clip_start
         if pos_offset == child_clip.sync_data.pos_offset:
             child_clip.sync_data.sync_state = appconsts.SYNC_CORRECT
         else:
@@ -88,21 +91,14 @@ def calculate_and_set_child_clip_sync_states():
 def get_resync_data_list():
     # Returns list of tuples with data needed to do resync
     # Return tuples (clip, track, index, pos_off)
+    clip_positions = _get_clip_positions()
     resync_data = []
     parent_track = current_sequence().first_video_track()
     for child_clip, track in sync_children.items():
-        child_index = track.clips.index(child_clip)
-        child_clip_start = track.clip_start(child_index) - child_clip.clip_in
-
-        parent_clip = child_clip.sync_data.master_clip
-        try:
-            parent_index = parent_track.clips.index(parent_clip)
-        except:
+        child_index, pos_offset = _get_child_clip_index_and_pos_offset(clip_positions, parent_track, child_clip, track)
+        if pos_offset == None:
             # Parent clip no longer awailable
             continue
-        parent_clip_start = parent_track.clip_start(parent_index) - parent_clip.clip_in
-
-        pos_offset = child_clip_start - parent_clip_start
 
         resync_data.append((child_clip, track, child_index, pos_offset))
     
@@ -112,22 +108,15 @@ def get_resync_data_list_for_clip_list(clips_list):
     # Input is list of (clip, track) tuples
     # Returns list of tuples with data needed to do resync
     # Return tuples (clip, track, index, pos_off)
+    clip_positions = _get_clip_positions()
     resync_data = []
     parent_track = current_sequence().first_video_track()
     for clip_track_tuple in clips_list:
         child_clip, track = clip_track_tuple
-        child_index = track.clips.index(child_clip)
-        child_clip_start = track.clip_start(child_index) - child_clip.clip_in
-
-        parent_clip = child_clip.sync_data.master_clip
-        try:
-            parent_index = parent_track.clips.index(parent_clip)
-        except:
+        child_index, pos_offset = _get_child_clip_index_and_pos_offset(clip_positions, parent_track, child_clip, track)
+        if pos_offset == None:
             # Parent clip no longer awailable
             continue
-        parent_clip_start = parent_track.clip_start(parent_index) - parent_clip.clip_in
-
-        pos_offset = child_clip_start - parent_clip_start
 
         resync_data.append((child_clip, track, child_index, pos_offset))
     
@@ -136,7 +125,46 @@ def get_resync_data_list_for_clip_list(clips_list):
 def print_sync_children():
     for child_clip, track in sync_children.items():
         print(child_clip.id)
-        
-        
-        
-        
+
+# ----------------------------------------- clip positions index
+def _get_clip_positions():
+    global _clip_positions
+    if _clip_positions == None:
+        _clip_positions = {}
+        indexed_track_ids = set()
+        tracks = [current_sequence().first_video_track()] + list(sync_children.values())
+        for track in tracks:
+            if track.id in indexed_track_ids:
+                continue
+            _add_track_clip_positions(_clip_positions, track)
+            indexed_track_ids.add(track.id)
+
+    return _clip_positions
+
+def _add_track_clip_positions(clip_positions, track):
+    clip_start = 0
+    for i in range(0, len(track.clips)):
+        clip = track.clips[i]
+        clip_positions[clip] = (track, i, clip_start)
+        clip_start += clip.clip_out - clip.clip_in + 1 # +1 out inclusive
+
+def _get_child_clip_index_and_pos_offset(clip_positions, parent_track, child_clip, track):
+    # Returns (child_index, pos_offset), pos_offset is None if parent clip is not on parent track.
+    try:
+        child_track, child_index, child_track_start = clip_positions[child_clip]
+    except KeyError:
+        # Clip lists given to get_resync_data_list_for_clip_list() can have clips on tracks without sync children.
+        _add_track_clip_positions(clip_positions, track)
+        child_track, child_index, child_track_start = clip_positions[child_clip]
+    child_clip_start = child_track_start - child_clip.clip_in
+
+    parent_clip = child_clip.sync_data.master_clip
+    try:
+        parent_track_found, parent_index, parent_track_start = clip_positions[parent_clip]
+    except KeyError:
+        return (child_index, None)
+    if parent_track_found is not parent_track:
+        return (child_index, None)
+    parent_clip_start = parent_track_start - parent_clip.clip_in
+
+    return (child_index, child_clip_start - parent_clip_start)
@@ -33,6 +33,7 @@ import mltfilters
 import mlttransitions
 import mltrefhold
 import patternproducer
+import producerprobecache
 import tlinerender
 import utils
 
@@ -410,7 +411,7 @@ class Sequence:
         Creates MLT Producer and adds attributes to it, but does 
         not add it to track/playlist object.
         """
-        producer = mlt.Producer(self.profile, str(path)) # this runs 0.5s+ on some clips
+        producer = producerprobecache.get_file_producer(self.profile, path) # this runs 0.5s+ on some clips when file is not yet probed
     
         mltrefhold.hold_ref(producer)
         producer.path = path
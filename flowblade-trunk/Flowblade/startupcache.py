@@ -0,0 +1,136 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <http://code.google.com/p/flowblade>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module handles on-disk cache of probed MLT environment and parsed filters, compositors
+and service replacements xml data.
+
+Cache is used by app and all helper processes to skip codecs probing and xml parsing on
+warm starts. It is rebuilt when app or MLT version, xml files or locale changes.
+"""
+
+import os
+import pickle
+
+import atomicfile
+import editorpersistance
+import editorstate
+import mltenv
+import mltfilters
+import mlttransitions
+import respaths
+import userfolders
+import utils
+
+STARTUP_CACHE_FILE = "startup_cache"
+STARTUP_CACHE_VERSION = 1
+
+# Cache dict keys
+CACHE_KEY = "key"
+MLT_ENV = "mltenv"
+FILTERS = "filters"
+COMPOSITORS = "compositors"
+REPLACEMENTS = "replacements"
+
+
+def load_mlt_environment(repo, do_replace_services=False):
+    """
+    Sets mltenv, mltfilters and mlttransitions module data from cache if valid cache exists,
+    otherwise probes environment, parses xml files and writes new cache.
+    """
+    cache = _load_cache()
+    if cache != None:
+        print("Environment, filters and transitions loaded from startup cache.")
+        mltenv.set_features_data(cache[MLT_ENV])
+        mltfilters.set_filters_data(cache[FILTERS])
+        mlttransitions.set_compositors_data(cache[COMPOSITORS])
+        replacements = cache[REPLACEMENTS]
+    else:
+        mltenv.check_available_features(repo)
+        mltfilters.load_filters_xml(mltenv.services)
+        mlttransitions.load_compositors_xml(mltenv.transitions)
+        replacements = mltfilters.load_service_replacements_xml()
+
+        # Cache is written before services are replaced because replacing changes filter groups
+        # and not all processes do replacing.
+        if mltenv.environment_detection_success == True:
+            _save_cache(replacements)
+
+    if do_replace_services == True:
+        mltfilters.replace_services(mltenv.services, replacements)
+
+def _load_cache():
+    if editorpersistance.prefs.use_startup_cache == False:
+        return None
+
+    try:
+        cache = utils.unpickle(_get_cache_path())
+    except:
+        return None # No cache yet or it was written by an incompatible version.
+
+    try:
+        if cache[CACHE_KEY] != _get_cache_key():
+            print("Startup cache out of date.")
+            return None
+    except:
+        return None
+
+    return cache
+
+def _save_cache(replacements):
+    if editorpersistance.prefs.use_startup_cache == False:
+        return
+
+    cache = {}
+    cache[CACHE_KEY] = _get_cache_key()
+    cache[MLT_ENV] = mltenv.get_features_data()
+    cache[FILTERS] = mltfilters.get_filters_data()
+    cache[COMPOSITORS] = mlttransitions.get_compositors_data()
+    cache[REPLACEMENTS] = replacements
+
+    try:
+        with atomicfile.AtomicFileWriter(_get_cache_path(), "wb") as afw:
+            write_file = afw.get_file()
+            pickle.dump(cache, write_file)
+    except Exception as e:
+        print("Writing startup cache failed:", e) # Next start will just probe again.
+
+def _get_cache_key():
+    # Translated names are in cached filter groups, so locale environment and language setting are part of key.
+    return (STARTUP_CACHE_VERSION,
+            editorstate.appversion,
+            editorstate.mlt_version,
+            _get_mtime(respaths.FILTERS_XML_DOC),
+            _get_mtime(respaths.COMPOSITORS_XML_DOC),
+            _get_mtime(respaths.REPLACEMENTS_XML_DOC),
+            os.environ.get('LC_ALL', None),
+            os.environ.get('LC_MESSAGES', None),
+            os.environ.get('LANG', None),
+            os.environ.get('LANGUAGE', None),
+            editorpersistance.prefs.force_language)
+
+def _get_mtime(file_path):
+    try:
+        return os.path.getmtime(file_path)
+    except OSError:
+        return None
+
+def _get_cache_path():
+    return userfolders.get_cache_dir() + STARTUP_CACHE_FILE
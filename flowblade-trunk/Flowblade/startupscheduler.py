@@ -0,0 +1,126 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <http://code.google.com/p/flowblade>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module runs application start-up work that is not needed to display first window
+in background threads or after window is shown, and records start-up timing report.
+"""
+
+from gi.repository import GLib
+
+import threading
+import time
+
+import userfolders
+
+STARTUP_TIMINGS_FILE = "startup_timings"
+
+_start_time = None
+_last_mark_time = None
+_timings = [] # (step name, seconds, thread name) tuples
+_timings_lock = threading.Lock()
+
+_deferred_tasks = [] # (task name, func, args) tuples run after first window is shown
+_report_written = False
+
+
+# --------------------------------------------------------- timing
+def start():
+    global _start_time, _last_mark_time
+    _start_time = time.monotonic()
+    _last_mark_time = _start_time
+
+def mark(step_name):
+    # Records time since previous mark for start-up step done in main thread.
+    global _last_mark_time
+    if _start_time == None:
+        return
+
+    now = time.monotonic()
+    _add_timing(step_name, now - _last_mark_time, "main")
+    _last_mark_time = now
+
+def _add_timing(step_name, seconds, thread_name):
+    with _timings_lock:
+        _timings.append((step_name, seconds, thread_name))
+
+
+# --------------------------------------------------------- scheduling
+def run_in_background(task_name, func, *args):
+    # For work that is not needed by anything in GUI, like deleting old files.
+    task_thread = threading.Thread(target=_run_timed_task, args=(task_name, "background", func, args))
+    task_thread.daemon = True
+    task_thread.start()
+
+def run_deferred(task_name, func, *args):
+    # For work that needs to be done in GTK thread but not before first window is shown.
+    _deferred_tasks.append((task_name, func, args))
+
+def launch_deferred():
+    # Called before Gtk.main(), deferred tasks are run one at a time when main loop is idle
+    # and timing report is written after they are done.
+    GLib.idle_add(_first_idle)
+
+def _first_idle():
+    if _start_time != None:
+        _add_timing("time to interactive", time.monotonic() - _start_time, "main")
+
+    GLib.idle_add(_run_next_deferred_task)
+    return False
+
+def _run_next_deferred_task():
+    if len(_deferred_tasks) == 0:
+        _write_report()
+        return False
+
+    task_name, func, args = _deferred_tasks.pop(0)
+    _run_timed_task(task_name, "deferred", func, args)
+    return True
+
+def _run_timed_task(task_name, thread_name, func, args):
+    task_start = time.monotonic()
+    try:
+        func(*args)
+    except Exception as e:
+        print("Start-up task " + task_name + " failed:", e)
+    _add_timing(task_name, time.monotonic() - task_start, thread_name)
+
+
+# --------------------------------------------------------- report
+def _write_report():
+    global _report_written
+    if _report_written == True or _start_time == None:
+        return
+    _report_written = True
+
+    with _timings_lock:
+        timings = list(_timings)
+
+    lines = ["Start-up timings:"]
+    for step_name, seconds, thread_name in timings:
+        lines.append("  " + step_name.ljust(40) + ("%.3f" % seconds).rjust(8) + "s  " + thread_name)
+    report = "\n".join(lines)
+    print(report)
+
+    try:
+        with open(userfolders.get_cache_dir() + STARTUP_TIMINGS_FILE, "w") as report_file:
+            report_file.write(report + "\n")
+    except OSError:
+        pass
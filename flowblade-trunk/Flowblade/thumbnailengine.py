@@ -0,0 +1,270 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <http://code.google.com/p/flowblade>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+"""
+Module creates media file thumbnails in worker threads.
+
+Media items get a placeholder icon immediately and the thumbnail is set when
+a worker has extracted it. Thumbnails are extracted as scaled frames directly to memory
+and kept in a compact on-disk cache keyed by media fingerprint, so the same media is
+never decoded again for a thumbnail unless its contents change.
+"""
+
+from gi.repository import GLib
+
+import cairo
+import hashlib
+import mlt
+import multiprocessing
+import numpy as np
+import os
+import queue
+import threading
+import zlib
+
+import appconsts
+import atomicfile
+import gui
+import proxystore
+import userfolders
+
+THUMBNAIL_CACHE_VERSION = 1
+CACHE_FILE_EXTENSION = ".thumb"
+CACHE_COMPRESS_LEVEL = 1
+
+THUMBNAIL_WORKERS = max(1, min(4, multiprocessing.cpu_count() - 1))
+
+PLACEHOLDER_COLOR = (0.22, 0.22, 0.22)
+
+_profile = None
+_jobs_queue = queue.Queue()
+_workers = []
+_workers_lock = threading.Lock()
+
+_surfaces = {} # cache key -> cairo surface, thumbnails are extracted and loaded once while app runs
+_surfaces_lock = threading.Lock()
+
+_ready_icons = [] # (media_file, surface) tuples waiting to be set in GTK thread
+_ready_lock = threading.Lock()
+
+_placeholder_icon = None
+
+
+# ------------------------------------------------------------- interface
+def set_profile(profile):
+    # Thumbnails are extracted using current project profile.
+    global _profile
+    _profile = profile
+
+def is_thumbnail_path(icon_path):
+    if icon_path == None:
+        return False
+    return icon_path.startswith(_get_thumbnails_dir())
+
+def get_thumbnail_path(file_path):
+    # This is path thumbnail image was written in earlier versions. It is still used as
+    # media file icon path so that info displays and older projects keep working.
+    md_str = hashlib.md5(file_path.encode('utf-8')).hexdigest()
+    return _get_thumbnails_dir() + "/" + md_str +  ".png"
+
+def request_icon(media_file, refresh=False):
+    """
+    Sets placeholder icon for media file and queues thumbnail to be extracted, or set from cache,
+    in a worker thread.
+    """
+    media_file.icon = get_placeholder_icon()
+    _jobs_queue.put((media_file, _profile, refresh))
+    _maybe_start_workers()
+
+def get_placeholder_icon():
+    global _placeholder_icon
+    if _placeholder_icon == None:
+        _placeholder_icon = cairo.ImageSurface(cairo.FORMAT_RGB24, appconsts.THUMB_WIDTH, appconsts.THUMB_HEIGHT)
+        cr = cairo.Context(_placeholder_icon)
+        cr.set_source_rgb(*PLACEHOLDER_COLOR)
+        cr.paint()
+    return _placeholder_icon
+
+def _maybe_start_workers():
+    with _workers_lock:
+        if len(_workers) > 0:
+            return
+
+        for i in range(0, THUMBNAIL_WORKERS):
+            worker = ThumbnailWorkerThread()
+            worker.start()
+            _workers.append(worker)
+
+
+# ------------------------------------------------------------- workers
+class ThumbnailWorkerThread(threading.Thread):
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+    def run(self):
+        while True:
+            media_file, profile, refresh = _jobs_queue.get()
+            try:
+                surface = _get_thumbnail_surface(media_file, profile, refresh)
+            except Exception as e:
+                print("Thumbnail creation failed for " + str(media_file.path) + ":", e)
+                surface = None
+
+            if surface != None:
+                _icon_ready(media_file, surface)
+
+def _get_thumbnail_surface(media_file, profile, refresh):
+    cache_key = _get_cache_key(media_file, profile)
+    if cache_key == None:
+        return None # File is gone, media item displays placeholder.
+
+    if refresh == False:
+        with _surfaces_lock:
+            surface = _surfaces.get(cache_key)
+        if surface != None:
+            return surface
+
+        data = _load_cached_thumbnail(cache_key)
+        if data == None and os.path.isfile(media_file.icon_path):
+            data = _load_legacy_thumbnail(media_file.icon_path) # Written by earlier versions for this file.
+            _save_cached_thumbnail(cache_key, data)
+    else:
+        data = None
+
+    if data == None:
+        data = _extract_thumbnail(media_file.path, profile)
+        if data == None:
+            return None
+        _save_cached_thumbnail(cache_key, data)
+
+    surface = _create_surface(data)
+    with _surfaces_lock:
+        _surfaces[cache_key] = surface
+    return surface
+
+def _extract_thumbnail(file_path, profile):
+    # Middle frame of media is decoded and scaled to thumbnail size, nothing is written to disk.
+    producer = mlt.Producer(profile, str(file_path))
+    if producer.is_valid() == False:
+        return None
+
+    frame_number = producer.get_length() // 2
+    image_producer = producer.cut(frame_number, frame_number)
+    image_producer.set_speed(0)
+    image_producer.seek(0)
+
+    frame = image_producer.get_frame()
+    frame.set("consumer_deinterlace", 1)
+    mlt_rgb = frame.get_image(mlt.mlt_image_rgb24a, appconsts.THUMB_WIDTH, appconsts.THUMB_HEIGHT)
+
+    # MLT rgba is swapped to cairo RGB24 byte order, MLT may give extra rows that are dropped.
+    w, h = appconsts.THUMB_WIDTH, appconsts.THUMB_HEIGHT
+    buf = np.frombuffer(mlt_rgb, dtype=np.uint8)
+    if len(buf) < w * h * 4:
+        return None
+    buf = buf[0:w * h * 4].reshape((h, w, 4))
+    out = np.copy(buf)
+    out[:, :, 0] = buf[:, :, 2]
+    out[:, :, 2] = buf[:, :, 0]
+    return out.tobytes()
+
+def _load_legacy_thumbnail(icon_path):
+    icon = cairo.ImageSurface.create_from_png(icon_path)
+    scaled_icon = cairo.ImageSurface(cairo.FORMAT_RGB24, appconsts.THUMB_WIDTH, appconsts.THUMB_HEIGHT)
+    cr = cairo.Context(scaled_icon)
+    cr.scale(float(appconsts.THUMB_WIDTH) / float(icon.get_width()), float(appconsts.THUMB_HEIGHT) / float(icon.get_height()))
+    cr.set_source_surface(icon, 0, 0)
+    cr.paint()
+    scaled_icon.flush()
+    return bytes(scaled_icon.get_data())
+
+def _create_surface(data):
+    stride = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_RGB24, appconsts.THUMB_WIDTH)
+    return cairo.ImageSurface.create_for_data(bytearray(data), cairo.FORMAT_RGB24,
+                                              appconsts.THUMB_WIDTH, appconsts.THUMB_HEIGHT, stride)
+
+
+# ------------------------------------------------------------- setting icons
+def _icon_ready(media_file, surface):
+    # Icons that become ready while GTK thread is busy are set together with one redraw.
+    with _ready_lock:
+        _ready_icons.append((media_file, surface))
+        if len(_ready_icons) > 1:
+            return
+    GLib.idle_add(_set_ready_icons)
+
+def _set_ready_icons():
+    global _ready_icons
+    with _ready_lock:
+        ready_icons = _ready_icons
+        _ready_icons = []
+
+    for media_file, surface in ready_icons:
+        media_file.icon = surface
+
+    try:
+        gui.media_list_view.widget.queue_draw()
+    except AttributeError:
+        pass # Media list not created yet.
+    return False
+
+
+# ------------------------------------------------------------- disk cache
+def _get_cache_key(media_file, profile):
+    if media_file.type == appconsts.IMAGE_SEQUENCE:
+        fingerprint = proxystore.get_img_seq_fingerprint(media_file.path)
+    else:
+        fingerprint = proxystore.get_file_fingerprint(media_file.path)
+    if fingerprint == None:
+        return None
+
+    profile_desc = profile.description() if profile != None else ""
+    key_str = fingerprint + profile_desc + str(THUMBNAIL_CACHE_VERSION) + str(appconsts.THUMB_WIDTH) + "x" + str(appconsts.THUMB_HEIGHT)
+    return hashlib.md5(key_str.encode('utf-8')).hexdigest()
+
+def _load_cached_thumbnail(cache_key):
+    try:
+        with open(_get_cache_file_path(cache_key), "rb") as cache_file:
+            data = zlib.decompress(cache_file.read())
+    except (OSError, zlib.error):
+        return None
+
+    stride = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_RGB24, appconsts.THUMB_WIDTH)
+    if len(data) != stride * appconsts.THUMB_HEIGHT:
+        return None
+    return data
+
+def _save_cached_thumbnail(cache_key, data):
+    if data == None:
+        return
+    try:
+        with atomicfile.AtomicFileWriter(_get_cache_file_path(cache_key), "wb") as afw:
+            afw.get_file().write(zlib.compress(data, CACHE_COMPRESS_LEVEL))
+    except Exception as e:
+        print("Writing thumbnail cache file failed:", e)
+
+def _get_cache_file_path(cache_key):
+    return _get_thumbnails_dir() + "/" + cache_key + CACHE_FILE_EXTENSION
+
+def _get_thumbnails_dir():
+    return userfolders.get_cache_dir() + appconsts.THUMBNAILS_DIR
@@ -61,6 +61,7 @@ from editorstate import EDIT_MODE
 import movemodes
 import multimovemode
 import mlttransitions
+import projectchanges
 import render
 import renderconsumer
 import respaths
@@ -1970,9 +1971,11 @@ def _marker_menu_item_activated(widget, msg):
                 mrk_index = i
         if mrk_index != -1:
             current_sequence().markers.pop(mrk_index)
+            projectchanges.sequence_changed(current_sequence())
             updater.repaint_tline()
     elif msg == "deleteall":
         current_sequence().markers = []
+        projectchanges.sequence_changed(current_sequence())
         updater.repaint_tline()
     else: # seek to marker
         name, frame = current_sequence().markers[int(msg)]
@@ -1996,6 +1999,7 @@ def _marker_add_dialog_callback(dialog, response_id, name_entry):
 
     current_sequence().markers.append((name, current_frame))
     current_sequence().markers = sorted(current_sequence().markers, key=itemgetter(1))
+    projectchanges.sequence_changed(current_sequence())
 
     updater.update_position_bar()
     updater.repaint_tline()
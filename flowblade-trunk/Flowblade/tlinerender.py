@@ -19,6 +19,7 @@
 """
 import hashlib
 from gi.repository import Gdk, Gtk
+import multiprocessing
 import os
 from os import listdir
 from os.path import isfile, join
@@ -74,10 +75,16 @@ _timeline_renderer = None # this gets set to NoOpRenderer on launch, is never No
 _update_thread = None
 _status_polling_thread = None
 
+_content_hash_cache = None # this gets set to SegmentContentHashCache on module load at end of file.
+
 # ------------------------------------------------------------ MODULE INTERFACE
-def app_launch_clean_up():
-    for old_session_dir in listdir(_get_tline_render_dir()):
-        _delete_dir_and_contents(_get_tline_render_dir() + "/" + old_session_dir)
+def get_old_session_dirs():
+    # Needs to be called before new session dir is created.
+    return [_get_tline_render_dir() + "/" + old_session_dir for old_session_dir in listdir(_get_tline_render_dir())]
+
+def delete_old_session_dirs(old_session_dirs):
+    for old_session_dir in old_session_dirs:
+        _delete_dir_and_contents(old_session_dir)
 
 def init_session(): # called when project is loaded
     
@@ -461,6 +468,9 @@ class TimeLineRenderer:
 
 # --------------------------------------------- CONTENT UPDATES
     def timeline_changed(self):
+        changed_track_ids, changed_clip_ids = edit.get_and_clear_changed_ids()
+        _content_hash_cache.content_changed(changed_track_ids, changed_clip_ids)
+
         if self.drag_on == True:
             return # Happens if user does keyboard edit while also doing mouse edit on timeline render strip, we will do the update on mouse release.
 
@@ -483,6 +493,8 @@ class TimeLineRenderer:
     def update_segments(self):
         for seg in self.segments:
             seg.update_segment()
+        
+        _content_hash_cache.prune(self.segments)
 
     def get_dirty_segments(self):
         dirty = []
@@ -545,11 +557,14 @@ class TimeLineRenderer:
         self.segments = list(remaining_set)
 
     # ------------------------------------------------ RENDERING
-    def update_timeline_rendering_status(self, rendering_file, fract, render_completed, completed_segments):
+    def update_timeline_rendering_status(self, rendering_files, fractions, render_completed, completed_segments):
+        # With multiple render processes there can be multiple segments being rendered at the same time.
+        rendering_fractions = dict(zip(rendering_files, fractions))
         dirty = self.get_dirty_segments()
         for segment in dirty:
-            if segment.get_clip_path() == rendering_file:
-                segment.rendered_fract = fract
+            clip_path = segment.get_clip_path()
+            if clip_path in rendering_fractions:
+                segment.rendered_fract = rendering_fractions[clip_path]
             else:
                 segment.maybe_set_completed(completed_segments)
                 
@@ -583,7 +598,9 @@ class NoOpRenderer():
         pass
 
     def timeline_changed(self):
-        pass
+        # Content hash cache needs to be kept up to date for when rendering is turned on.
+        changed_track_ids, changed_clip_ids = edit.get_and_clear_changed_ids()
+        _content_hash_cache.content_changed(changed_track_ids, changed_clip_ids)
  
     def press_event(self, event):
         pass
@@ -704,80 +721,181 @@ class TimeLineSegment:
         self.content_hash = new_hash
     
     def get_content_hash(self):
-        content_strings = []
-        for i in range(1, len(current_sequence().tracks) - 1):
-            track = current_sequence().tracks[i]
-            self._get_track_segment_content_strings(track, content_strings)
+        return _content_hash_cache.get_content_hash(self.start_frame, self.end_frame)
+
+
+class SegmentContentHashCache:
+    """
+    Caches content digests of segment ranges per track and content digests of clips.
+    
+    Track and clip versions are incremented when edits change them, and cached digests
+    are only computed again for tracks and clips that have changed since digest was created.
+    Segments away from edited area re-use cached digests.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sequence = None
+        self.track_versions = {} # track.id -> version
+        self.clip_versions = {} # clip.id -> version
+        self.range_digests = {} # (track.id, start_frame, end_frame) -> (track version, ((clip.id, clip version), ...), digest)
+        self.clip_digests = {} # clip.id -> (clip version, clip_in, clip_out, digest)
+
+    def content_changed(self, changed_track_ids, changed_clip_ids):
+        with self.lock:
+            for track_id in changed_track_ids:
+                self.track_versions[track_id] = self.track_versions.get(track_id, 0) + 1
+            for clip_id in changed_clip_ids:
+                self.clip_versions[clip_id] = self.clip_versions.get(clip_id, 0) + 1
+
+    def get_content_hash(self, start_frame, end_frame):
+        with self.lock:
+            seq = current_sequence()
+            if seq is not self.sequence:
+                # Track and clip ids are only unique inside a sequence.
+                self._reset(seq)
+
+            track_digests = []
+            for i in range(1, len(seq.tracks) - 1):
+                track = seq.tracks[i]
+                track_digests.append(self._get_track_range_digest(seq, track, start_frame, end_frame))
         
-        content_desc = "".join(content_strings)
+        content_desc = "".join(track_digests)
         
         return hashlib.md5(content_desc.encode('utf-8')).hexdigest()
-        
-    def _get_track_segment_content_strings(self, track, content_strings):
-        start_clip_index, clips = self._get_track_segment_clips(track, self.start_frame, self.end_frame)
-        if len(clips) == 0:
-            content_strings.append("-1")
-            return
+
+    def prune(self, segments):
+        # Drop digests for ranges that no longer have segments, and for clips not in any cached range.
+        with self.lock:
+            live_ranges = set()
+            for seg in segments:
+                live_ranges.add((seg.start_frame, seg.end_frame))
             
+            live_clip_ids = set()
+            for key in list(self.range_digests.keys()):
+                track_id, start_frame, end_frame = key
+                if (start_frame, end_frame) not in live_ranges:
+                    del self.range_digests[key]
+                else:
+                    track_version, clip_versions, digest = self.range_digests[key]
+                    for clip_id, clip_version in clip_versions:
+                        live_clip_ids.add(clip_id)
+            
+            for clip_id in list(self.clip_digests.keys()):
+                if clip_id not in live_clip_ids:
+                    del self.clip_digests[clip_id]
+
+    def _reset(self, seq):
+        self.sequence = seq
+        self.track_versions = {}
+        self.clip_versions = {}
+        self.range_digests = {}
+        self.clip_digests = {}
+
+    def _get_track_range_digest(self, seq, track, start_frame, end_frame):
+        key = (track.id, start_frame, end_frame)
+        track_version = self.track_versions.get(track.id, 0)
+        try:
+            cached_track_version, clip_versions, digest = self.range_digests[key]
+            if cached_track_version == track_version and self._clip_versions_current(clip_versions):
+                return digest
+        except KeyError:
+            pass
+
+        start_clip_index, clips = _get_track_segment_clips(seq, track, start_frame, end_frame)
+        if len(clips) == 0:
+            self.range_digests[key] = (track_version, (), "-1")
+            return "-1"
+
+        content_strings = []
+        clip_versions = []
         for i in range(0, len(clips)):
             clip = clips[i]
-            self._get_clip_content_strings(track, clip, start_clip_index + i, content_strings)
-                
-    def _get_track_segment_clips(self, track, start_frame, end_frame):
-        clips = []
-        
-        # Get start range index, outer selection required
-        start_clip_index = current_sequence().get_clip_index(track, start_frame)
-        if start_clip_index == -1:
-            # Segment start aftr track end no clips in segments on this track
-            return (-1, clips)
-        
-        # Get end range index, outer selection required
-        end_clip_index = current_sequence().get_clip_index(track, end_frame)
-        if end_clip_index == -1:
-            # Segment contains last clip on track
-            end_clip_index = len(track.clips) - 1
+            # Position data, offset from segment start
+            clip_start_in_tline = track.clip_start(start_clip_index + i)
+            content_strings.append(str(clip_start_in_tline - start_frame))
+            content_strings.append(self._get_clip_digest(clip))
+            clip_versions.append((clip.id, self.clip_versions.get(clip.id, 0)))
 
-        for i in range(start_clip_index, end_clip_index + 1):
-            clips.append(track.clips[i])
+        content_desc = "".join(content_strings)
+        digest = hashlib.md5(content_desc.encode('utf-8')).hexdigest()
         
-        return (start_clip_index, clips)
+        self.range_digests[key] = (track_version, tuple(clip_versions), digest)
+        return digest
+
+    def _clip_versions_current(self, clip_versions):
+        for clip_id, clip_version in clip_versions:
+            if self.clip_versions.get(clip_id, 0) != clip_version:
+                return False
+        return True
+
+    def _get_clip_digest(self, clip):
+        clip_version = self.clip_versions.get(clip.id, 0)
+        try:
+            cached_clip_version, clip_in, clip_out, digest = self.clip_digests[clip.id]
+            if cached_clip_version == clip_version and clip_in == clip.clip_in and clip_out == clip.clip_out:
+                return digest
+        except KeyError:
+            pass
         
-    def _get_clip_content_strings(self, track, clip, clip_index, content_strings):
+        content_strings = []
+        _get_clip_content_strings(clip, content_strings)
+        content_desc = "".join(content_strings)
+        digest = hashlib.md5(content_desc.encode('utf-8')).hexdigest()
+
+        self.clip_digests[clip.id] = (clip_version, clip.clip_in, clip.clip_out, digest)
+        return digest
 
-        length = clip.clip_out - clip.clip_in 
+
+def _get_track_segment_clips(seq, track, start_frame, end_frame):
+    clips = []
     
-        # Position and range data
-        # offset from segment start + in, out
-        clip_start_in_tline = track.clip_start(clip_index)
-        content_strings.append(str(clip_start_in_tline - self.start_frame))
-        content_strings.append(str(clip.clip_in))
-        content_strings.append(str(clip.clip_out))
-        
-        # Content data
-        if clip.is_blanck_clip == True:
-            content_strings.append("##blank")
-            return
+    # Get start range index, outer selection required
+    start_clip_index = seq.get_clip_index(track, start_frame)
+    if start_clip_index == -1:
+        # Segment start aftr track end no clips in segments on this track
+        return (-1, clips)
+    
+    # Get end range index, outer selection required
+    end_clip_index = seq.get_clip_index(track, end_frame)
+    if end_clip_index == -1:
+        # Segment contains last clip on track
+        end_clip_index = len(track.clips) - 1
+
+    for i in range(start_clip_index, end_clip_index + 1):
+        clips.append(track.clips[i])
+    
+    return (start_clip_index, clips)
+    
+def _get_clip_content_strings(clip, content_strings):
+    # Range data
+    content_strings.append(str(clip.clip_in))
+    content_strings.append(str(clip.clip_out))
+    
+    # Content data
+    if clip.is_blanck_clip == True:
+        content_strings.append("##blank")
+        return
 
-        if len(clip.filters) == 0:
-            content_strings.append("##no_filters")
-        else:
-            for filter_object in clip.filters:
-                self._get_filter_content_strings(filter_object, content_strings)
-        
-        if clip.mute_filter == None:
-            content_strings.append("##no_mute")
-        else:
-            self._get_filter_content_strings(clip.mute_filter, content_strings)
+    if len(clip.filters) == 0:
+        content_strings.append("##no_filters")
+    else:
+        for filter_object in clip.filters:
+            _get_filter_content_strings(filter_object, content_strings)
+    
+    if clip.mute_filter == None:
+        content_strings.append("##no_mute")
+    else:
+        _get_filter_content_strings(clip.mute_filter, content_strings)
 
-    def _get_filter_content_strings(self, filter_object, content_strings):
-        for i in range(0, len(filter_object.properties)):
-            p_name, p_value, p_type = filter_object.properties[i]
-            content_strings.append(p_name)
-            content_strings.append(str(p_type))
-            content_strings.append(str(p_value))
+def _get_filter_content_strings(filter_object, content_strings):
+    for i in range(0, len(filter_object.properties)):
+        p_name, p_value, p_type = filter_object.properties[i]
+        content_strings.append(p_name)
+        content_strings.append(str(p_type))
+        content_strings.append(str(p_value))
 
-        
+
+_content_hash_cache = SegmentContentHashCache()
 
 
 #--------------------------------------- worker threads
@@ -897,9 +1015,9 @@ class TimeLineStatusPollingThread(threading.Thread):
         
         while running:
 
-            rendering_file, fract, render_completed, completed_segments = tlinerenderserver.get_render_status()
+            rendering_files, fractions, render_completed, completed_segments = tlinerenderserver.get_render_status()
 
-            get_renderer().update_timeline_rendering_status(rendering_file, fract, render_completed, completed_segments)
+            get_renderer().update_timeline_rendering_status(rendering_files, fractions, render_completed, completed_segments)
 
             Gdk.threads_enter()
             gui.tline_render_strip.widget.queue_draw()
@@ -974,10 +1092,25 @@ class TLineSettingsRenderDialog:
         
         panel_encoding = guiutils.get_named_frame(_("Render Encoding"), vbox_enc)
 
+        # Render processes
+        spin_adj = Gtk.Adjustment(value=editorpersistance.prefs.tline_render_processes, lower=1, upper=multiprocessing.cpu_count(), step_incr=1)
+        self.processes_spin = Gtk.SpinButton(adjustment=spin_adj)
+        self.processes_spin.set_numeric(True)
+        self.processes_spin.set_tooltip_text(_("Number of segments rendered at the same time, between 1 and the number of CPU Cores"))
+        self.processes_spin.connect("value-changed", lambda w: self.processes_changed(w.get_value_as_int()))
+
+        row_processes = guiutils.get_two_column_box(Gtk.Label(label=_("Render Processes:")), self.processes_spin, 220)
+
+        vbox_processes = Gtk.VBox(False, 2)
+        vbox_processes.pack_start(row_processes, False, False, 0)
+        vbox_processes.pack_start(guiutils.pad_label(8, 12), False, False, 0)
+
+        panel_processes = guiutils.get_named_frame(_("Render Processes"), vbox_processes)
 
         # Pane
         vbox = Gtk.VBox(False, 2)
         vbox.pack_start(panel_encoding, False, False, 0)
+        vbox.pack_start(panel_processes, False, False, 0)
         guiutils.set_margins(vbox, 8, 12, 12, 12)
 
         self.dialog.vbox.pack_start(vbox, True, True, 0)
@@ -994,4 +1127,8 @@ class TLineSettingsRenderDialog:
     def size_changed(self, size_index):
         editorpersistance.prefs.tline_render_size = size_index
         editorpersistance.save()
+
+    def processes_changed(self, processes):
+        editorpersistance.prefs.tline_render_processes = processes
+        editorpersistance.save()
     
@@ -33,7 +33,9 @@ import dbus.service
 from dbus.mainloop.glib import DBusGMainLoop
 import locale
 import mlt
+import multiprocessing
 import os
+import queue
 import subprocess
 import sys
 import threading
@@ -42,14 +44,13 @@ import time
 import appconsts
 import atomicfile
 import editorstate
-import mltenv
 import mlttransitions
-import mltfilters
 import mltprofiles
 import editorpersistance
 import processutils
 import renderconsumer
 import respaths
+import startupcache
 import translations
 import userfolders
 
@@ -57,6 +58,13 @@ import userfolders
 TLINE_RENDER_ENCODING_INDEX = 0
 RENDERING_PAD_FRAMES = 3
 
+# Messages sent from render worker processes to TLineRenderPoolRunnerThread.
+WORKER_SEGMENT_PROGRESS = 0
+WORKER_SEGMENT_COMPLETED = 1
+WORKER_EXITED = 2
+
+WORKER_JOIN_TIMEOUT = 5.0
+
 _dbus_service = None
 
 
@@ -136,14 +144,11 @@ def main(root_path, force_launch=False):
     # Set numeric locale to use "." as radix, MLT initilizes this to OS locale and this causes bugs 
     locale.setlocale(locale.LC_NUMERIC, 'C')
 
-    # Check for codecs and formats on the system
-    mltenv.check_available_features(repo)
+    # Check for codecs and formats on the system and load filter and compositor descriptions,
+    # these come from startup cache if it is up to date.
+    startupcache.load_mlt_environment(repo)
     renderconsumer.load_render_profiles()
 
-    # Load filter and compositor descriptions from xml files.
-    mltfilters.load_filters_xml(mltenv.services)
-    mlttransitions.load_compositors_xml(mltenv.transitions)
-
     # Create list of available mlt profiles
     mltprofiles.load_profile_list()
 
@@ -174,26 +179,33 @@ class TLineRenderDBUSService(dbus.service.Object):
             clip_range_out = segments_outs[i]
             segments.append((clip_path, clip_range_in, clip_range_out))
 
-        self.render_runner_thread = TLineRenderRunnerThread(self, sequence_xml_path, segments, profile_name)
+        editorpersistance.load() # to apply possible chnages on timeline rendering
+        render_processes = min(editorpersistance.prefs.tline_render_processes, len(segments))
+        if render_processes > 1:
+            self.render_runner_thread = TLineRenderPoolRunnerThread(self, sequence_xml_path, segments, profile_name, render_processes)
+        else:
+            self.render_runner_thread = TLineRenderRunnerThread(self, sequence_xml_path, segments, profile_name)
         self.render_runner_thread.start()
 
     @dbus.service.method('io.github.jliljebl.Flowblade')
     def get_render_status(self):
+        # Returns lists of files currently being rendered and their render fractions,
+        # with pool rendering there can be multiple segments in progress at the same time.
+        # Lists are never empty, DBus cannot figure out types for empty lists.
         dummy_list = ["nothing"]
+        none_files = ["none"]
+        none_fractions = [0.0]
         if self.render_runner_thread == None:
-            return ("none", 0.0,  False, dummy_list)
+            return (none_files, none_fractions,  False, dummy_list)
         
         if self.render_runner_thread.render_complete:
-            return ("none", 1.0, self.render_runner_thread.render_complete, self.render_runner_thread.completed_segments)
-        
-        if self.render_runner_thread.current_render_file_path == None:
-            return ("none", 0.0,  False, dummy_list)
+            return (none_files, [1.0], self.render_runner_thread.render_complete, self.render_runner_thread.completed_segments)
         
-        #print(self.render_runner_thread.current_render_file_path, self.render_runner_thread.get_fraction(), 
-        #          self.render_runner_thread.render_complete, self.render_runner_thread.completed_segments)
-                  
-        return ( self.render_runner_thread.current_render_file_path, self.render_runner_thread.get_fraction(), 
-                  self.render_runner_thread.render_complete, self.render_runner_thread.completed_segments)
+        rendering_files, fractions = self.render_runner_thread.get_rendering_files_and_fractions()
+        if len(rendering_files) == 0:
+            return (none_files, none_fractions,  False, self.render_runner_thread.completed_segments)
+
+        return (rendering_files, fractions, self.render_runner_thread.render_complete, self.render_runner_thread.completed_segments)
 
     @dbus.service.method('io.github.jliljebl.Flowblade')
     def abort_renders(self):
@@ -209,6 +221,9 @@ class TLineRenderDBUSService(dbus.service.Object):
 
     @dbus.service.method('io.github.jliljebl.Flowblade')
     def shutdown_render_server(self):
+        if self.render_runner_thread != None and self.render_runner_thread.render_complete == False:
+            self.render_runner_thread.abort()
+
         self.remove_from_connection()
         self.main_loop.quit()
 
@@ -262,18 +277,7 @@ class TLineRenderRunnerThread(threading.Thread):
                                                                         encoding)
             renderconsumer.performance_settings_enabled = True
             
-            # We are using proxy file rendering code here mostly, didn't vhange all names.
-            # Bit rates for proxy files are counted using 2500kbs for 
-            # PAL size image as starting point.
-            pal_pix_count = 720.0 * 576.0
-            pal_proxy_rate = 2500.0
-            proxy_pix_count = float(width * height)
-            proxy_rate = pal_proxy_rate * (proxy_pix_count / pal_pix_count)
-            proxy_rate = int(proxy_rate / 100) * 100 # Make proxy rate even hundred
-            # There are no practical reasons to have bitrates lower than 500kbs.
-            if proxy_rate < 500:
-                proxy_rate = 500
-            consumer.set("vb", str(int(proxy_rate)) + "k")
+            consumer.set("vb", str(_get_render_bitrate(width, height)) + "k")
 
             consumer.set("rescale", "nearest")
 
@@ -319,15 +323,193 @@ class TLineRenderRunnerThread(threading.Thread):
     
         return self.render_thread.get_render_fraction()
 
+    def get_rendering_files_and_fractions(self):
+        if self.current_render_file_path == None:
+            return ([], [])
+
+        return ([self.current_render_file_path], [self.get_fraction()])
+
     def abort(self):
-        self.render_thread.shutdown()
+        if self.render_thread != None:
+            self.render_thread.shutdown()
         self.aborted = True
         self.thread_running = False
 
 
+class TLineRenderPoolRunnerThread(threading.Thread):
+    """
+    Renders segments concurrently in multiple worker processes, each worker process
+    has its own sequence producer and FileRenderPlayer.
+    
+    Segments are given out to workers from a shared queue so that a worker that finishes
+    a short segment picks up the next one immediately.
+    """
+    def __init__(self, dbus_service, sequence_xml_path, segments, profile_name, render_processes):
+        threading.Thread.__init__(self)
+        
+        self.dbus_service = dbus_service
+        self.sequence_xml_path = sequence_xml_path
+        self.render_folder = os.path.dirname(sequence_xml_path)
+        self.profile_name = profile_name
+        self.profile = mltprofiles.get_profile(profile_name)
+        self.segments = segments
+        self.render_processes = render_processes
+        self.completed_segments =  ["nothing"]
+        self.render_complete = False
+
+        self.fractions = {} # clip_file_path -> render fraction for segments currently being rendered
+        self.fractions_lock = threading.Lock()
+
+        self.mp_context = multiprocessing.get_context("spawn") # Forking a process running DBus and MLT threads is not safe.
+        self.abort_event = self.mp_context.Event()
+        self.workers = []
+
+        self.aborted = False
+
+    def run(self):
+        width, height = _get_render_dimensions(self.profile, editorpersistance.prefs.tline_render_size)
+        encoding = _get_render_encoding()
+        render_profile = _get_render_profile(self.profile, editorpersistance.prefs.tline_render_size, self.render_folder)
+        render_profile_path = self.render_folder + "/temp_render_profile"
+        
+        # Consumer args are created here and sent to worker processes so that workers 
+        # do not need to probe codecs and load render encodings.
+        args_vals_list = encoding.get_args_vals_tuples_list(render_profile)
+        args_vals_list.append(("vb", str(_get_render_bitrate(width, height)) + "k"))
+        args_vals_list.append(("rescale", "nearest"))
+
+        segments_queue = self.mp_context.Queue()
+        for segment in self.segments:
+            segments_queue.put(segment)
+
+        status_queue = self.mp_context.Queue()
+        
+        for i in range(0, self.render_processes):
+            worker = self.mp_context.Process(target=_segment_render_worker, 
+                                             args=(respaths.ROOT_PATH, i, self.sequence_xml_path, self.profile_name,
+                                                   render_profile_path, args_vals_list, segments_queue, 
+                                                   status_queue, self.abort_event))
+            worker.start()
+            self.workers.append(worker)
+
+        # Status update loop
+        exited_workers = set() # worker indexes
+        while len(exited_workers) < len(self.workers):
+            try:
+                msg_type, clip_file_path, value = status_queue.get(timeout=0.1)
+            except queue.Empty:
+                # Workers that crash do not send exit messages. Messages of a dead worker are
+                # all in queue before it exits, so getting nothing means they have been handled.
+                for i in range(0, len(self.workers)):
+                    if not self.workers[i].is_alive():
+                        exited_workers.add(i)
+                continue
+
+            if msg_type == WORKER_SEGMENT_PROGRESS:
+                with self.fractions_lock:
+                    self.fractions[clip_file_path] = value
+            elif msg_type == WORKER_SEGMENT_COMPLETED:
+                with self.fractions_lock:
+                    self.fractions.pop(clip_file_path, None)
+                if self.aborted == False:
+                    self.completed_segments.append(clip_file_path)
+            elif msg_type == WORKER_EXITED:
+                exited_workers.add(value)
+
+        for worker in self.workers:
+            worker.join(WORKER_JOIN_TIMEOUT)
+            if worker.is_alive():
+                worker.terminate()
+
+        with self.fractions_lock:
+            self.fractions = {}
+
+        self.render_complete = True
+
+    def get_rendering_files_and_fractions(self):
+        with self.fractions_lock:
+            rendering_files = list(self.fractions.keys())
+            fractions = [self.fractions[clip_file_path] for clip_file_path in rendering_files]
+        
+        return (rendering_files, fractions)
+
+    def abort(self):
+        self.aborted = True
+        self.abort_event.set()
+
+
+def _segment_render_worker(root_path, worker_index, sequence_xml_path, profile_name, render_profile_path, 
+                           args_vals_list, segments_queue, status_queue, abort_event):
+    # This is run in a separate process, only the MLT environment parts needed to render
+    # MLT XML into proxy encoded clips are initialized here.
+    respaths.set_paths(root_path)
+    userfolders.init()
+    editorpersistance.load()
+
+    repo = mlt.Factory().init()
+    processutils.prepare_mlt_repo(repo)
+    locale.setlocale(locale.LC_NUMERIC, 'C')
+    
+    mltprofiles.load_profile_list()
+    
+    profile = mltprofiles.get_profile(profile_name)
+    render_profile = mlt.Profile(render_profile_path)
+    sequence_xml_producer = mlt.Producer(profile, str(sequence_xml_path))
+
+    while abort_event.is_set() == False:
+        try:
+            clip_file_path, clip_range_in, clip_range_out = segments_queue.get_nowait()
+        except queue.Empty:
+            break
+
+        renderconsumer.performance_settings_enabled = False
+        consumer = renderconsumer.get_mlt_render_consumer(clip_file_path, render_profile, args_vals_list)
+        renderconsumer.performance_settings_enabled = True
+
+        start_frame = clip_range_in 
+        stop_frame = clip_range_out + RENDERING_PAD_FRAMES
+        if stop_frame > sequence_xml_producer.get_length() - 1:
+            stop_frame = sequence_xml_producer.get_length() - 1
+
+        render_thread = renderconsumer.FileRenderPlayer(None, sequence_xml_producer, consumer, start_frame, stop_frame)
+        render_thread.wait_for_producer_end_stop = False
+        render_thread.start()
+
+        while render_thread.running == False and render_thread.has_started_running == False:
+            time.sleep(0.05)
+
+        while render_thread.running:
+            if abort_event.is_set():
+                break
+            status_queue.put((WORKER_SEGMENT_PROGRESS, clip_file_path, render_thread.get_render_fraction()))
+            time.sleep(0.1)
+
+        render_thread.shutdown()
+        if abort_event.is_set():
+            break
+
+        status_queue.put((WORKER_SEGMENT_COMPLETED, clip_file_path, 1.0))
+
+    status_queue.put((WORKER_EXITED, None, worker_index))
+
+
 def _get_render_encoding():
     return renderconsumer.proxy_encodings[editorpersistance.prefs.tline_render_encoding]
 
+def _get_render_bitrate(width, height):
+    # We are using proxy file rendering code here mostly, didn't vhange all names.
+    # Bit rates for proxy files are counted using 2500kbs for 
+    # PAL size image as starting point.
+    pal_pix_count = 720.0 * 576.0
+    pal_proxy_rate = 2500.0
+    proxy_pix_count = float(width * height)
+    proxy_rate = pal_proxy_rate * (proxy_pix_count / pal_pix_count)
+    proxy_rate = int(proxy_rate / 100) * 100 # Make proxy rate even hundred
+    # There are no practical reasons to have bitrates lower than 500kbs.
+    if proxy_rate < 500:
+        proxy_rate = 500
+    return int(proxy_rate)
+
 def _get_render_dimensions(project_profile, proxy_size):
     # Get new dimension that are about half of previous and diviseble by eight
     if proxy_size == appconsts.PROXY_SIZE_FULL:
@@ -2073,16 +2073,12 @@ class TimeLineCanvas:
                     y_pad = WAVEFORM_PAD_SMALL
                     bar_height = WAVEFORM_HEIGHT_SMALL
                 
-                # Draw all frames only if pixels per frame > 2, otherwise
-                # draw only every other or fewer frames
-                draw_pix_per_frame = pix_per_frame
-                if draw_pix_per_frame < 2:
-                    draw_pix_per_frame = 2
-                    step = int(2 // pix_per_frame)
-                    if step < 1:
-                        step = 1
-                else:
-                    step = 1
+                # Draw from peaks level that has buckets about 1-2 pixels wide, 
+                # so that drawing cost depends on displayed width and not on number of frames.
+                levels_data = audiowaveformrenderer.get_waveform_levels_data(clip)
+                frames_per_bucket, bucket_mins, bucket_maxs = levels_data.get_level(pix_per_frame)
+                level_height = bar_height * levels_data.value_scale # levels file samples may be stored as bytes
+                draw_pix_per_bucket = frames_per_bucket * pix_per_frame
 
                 # Draw only frames in display
                 draw_first = clip_in
@@ -2092,20 +2088,33 @@ class TimeLineCanvas:
                 if draw_first + width_frames < draw_last:
                     draw_last = int(draw_first + width_frames) + 1
 
+                first_bucket = int(draw_first // frames_per_bucket)
+                last_bucket = int((draw_last - 1) // frames_per_bucket) + 1
+                if last_bucket > len(bucket_maxs): # 23.98 fps levels data can be shorter then clip
+                    last_bucket = len(bucket_maxs)
+
                 # Get media frame 0 position in screen pixels
                 media_start_pos_pix = scale_in - clip_in * pix_per_frame
                 
-                # Draw level bar for each frame in draw range
-                for f in range(draw_first, draw_last, step):
-                    try:
-                        x = media_start_pos_pix + f * pix_per_frame
-                        h = bar_height * clip.waveform_data[f]
+                # Draw level bar for each bucket in draw range, when buckets have many frames 
+                # bucket max part above bucket min is drawn lighter.
+                if frames_per_bucket > 1:
+                    for bucket in range(first_bucket, last_bucket):
+                        x = media_start_pos_pix + bucket * draw_pix_per_bucket
+                        h = level_height * float(bucket_maxs[bucket])
                         if h < 1:
                             h = 1
-                        cr.rectangle(x, y + y_pad + (bar_height - h), draw_pix_per_frame, h)
-                    except:
-                        # This is just dirty fix a when 23.98 fps does not work
-                        break
+                        cr.rectangle(x, y + y_pad + (bar_height - h), draw_pix_per_bucket, h)
+                    cr.set_source_rgba(r * 1.9, g * 1.9, b * 1.9, 0.5)
+                    cr.fill()
+                    cr.set_source_rgb(r * 1.9, g * 1.9, b * 1.9)
+
+                for bucket in range(first_bucket, last_bucket):
+                    x = media_start_pos_pix + bucket * draw_pix_per_bucket
+                    h = level_height * float(bucket_mins[bucket])
+                    if h < 1:
+                        h = 1
+                    cr.rectangle(x, y + y_pad + (bar_height - h), draw_pix_per_bucket, h)
 
                 cr.fill()
                 cr.restore()
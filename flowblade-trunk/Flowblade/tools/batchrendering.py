@@ -32,12 +32,14 @@ from dbus.mainloop.glib import DBusGMainLoop
 import mlt
 import hashlib
 import locale
+import multiprocessing
 import os
 from os import listdir
 from os.path import isfile, join
 from gi.repository import Pango
 import pickle
 import shutil
+import signal
 import subprocess
 import sys
 import textwrap
@@ -52,14 +54,15 @@ import editorstate
 import editorpersistance
 import gui
 import guiutils
-import mltenv
 import mltprofiles
 import mlttransitions
-import mltfilters
+import mltheadlessutils
 import processutils
 import persistance
 import respaths
 import renderconsumer
+import splitrender
+import startupcache
 import translations
 import userfolders
 import utils
@@ -85,6 +88,14 @@ RENDERED = 2
 UNQUEUED = 3
 ABORTED = 4
 
+# Parallel rendering uses estimated memory use of worker processes to decide how many items are rendered at the same time.
+WORKER_BASE_MEMORY = 300 * 1024 * 1024 # bytes, MLT environment and loaded project.
+WORKER_FRAME_BUFFERS = 50 # Frames held in producer caches, filters and consumer buffers.
+MEMORY_USE_FRACTION = 0.8 # Part of memory available when render is started that workers can use.
+
+WORKER_COMPLETED_EXIT = 0
+WORKER_ABORTED_EXIT = 1
+
 render_queue = []
 batch_window = None
 render_thread = None
@@ -117,30 +128,9 @@ class QueueRunnerThread(threading.Thread):
             
             current_render_time = 0
 
-            # Create render objects
-            identifier = render_item.generate_identifier()
-            project_file_path = get_projects_dir() + identifier + ".flb"
-            persistance.show_messages = False
-
-            project = persistance.load_project(project_file_path, False)
-
-            project.c_seq.fix_v1_for_render()
-
-            maybe_create_render_folder(render_item.render_path)
-        
-            producer = project.c_seq.tractor
-            profile = mltprofiles.get_profile(render_item.render_data.profile_name)
-            consumer = renderconsumer.get_mlt_render_consumer(render_item.render_path, 
-                                                              profile,
-                                                              render_item.args_vals_list)
-
-            # Get render range
-            start_frame, end_frame, wait_for_stop_render = get_render_range(render_item)
-            
             # Create and launch render thread
             global render_thread 
-            render_thread = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame) # None == file name not needed this time when using FileRenderPlayer because callsite keeps track of things
-            render_thread.wait_for_producer_end_stop = wait_for_stop_render
+            render_thread = create_render_thread(render_item)
             render_thread.start()
 
             # Set render start time and item state
@@ -208,6 +198,184 @@ class QueueRunnerThread(threading.Thread):
         batch_window.reload_queue() # item may havee added to queue while rendering
 
 
+class ParallelQueueRunnerThread(threading.Thread):
+    """
+    Renders queue items in worker processes, at most max_workers items at the same time
+    and only as many as estimated memory use of workers allows.
+    """
+    def __init__(self, max_workers):
+        threading.Thread.__init__(self)
+        self.max_workers = max_workers
+        self.workers = [None] * max_workers # BatchRenderWorker objects, index is worker row in window.
+        self.running = True
+        self.aborted = False
+
+    def run(self):
+        pending = list(render_queue.queue)
+        memory_budget = get_available_memory() * MEMORY_USE_FRACTION
+        items = 0
+        items_total = len([render_item for render_item in pending if render_item.render_this_item == True])
+        queue_start_time = time.time()
+
+        while self.running:
+            # Handle finished workers.
+            for i in range(0, len(self.workers)):
+                worker = self.workers[i]
+                if worker == None or worker.is_finished() == False:
+                    continue
+
+                self.workers[i] = None
+                worker.close_progress_pipe()
+                if worker.completed() == True:
+                    worker.render_item.render_completed()
+                    items = items + 1
+                else:
+                    # Failed items are aborted but rest of queue is rendered.
+                    print("Batch render worker failed for", worker.render_item.get_display_name())
+                    worker.render_item.render_aborted()
+
+                Gdk.threads_enter()
+                batch_window.update_queue_view()
+                batch_window.clear_worker_progress(i)
+                Gdk.threads_leave()
+
+            # Start new workers while there are free worker slots and memory.
+            while len(pending) > 0 and None in self.workers:
+                render_item = pending[0]
+                if render_item.render_this_item == False:
+                    pending.pop(0)
+                    continue
+
+                memory_estimate = estimate_render_memory(render_item)
+                if self._get_running_count() > 0 and \
+                    self._get_memory_in_use() + memory_estimate > memory_budget:
+                    break
+
+                pending.pop(0)
+                worker = BatchRenderWorker(render_item, memory_estimate)
+                worker.start()
+                self.workers[self.workers.index(None)] = worker
+
+                Gdk.threads_enter()
+                batch_window.update_queue_view()
+                Gdk.threads_leave()
+
+            if len(pending) == 0 and self._get_running_count() == 0:
+                break
+
+            # Update view.
+            fraction_sum = float(items)
+            for worker in self.workers:
+                if worker != None:
+                    fraction_sum += worker.get_render_fraction()
+            fraction = 0.0
+            if items_total > 0:
+                fraction = min(fraction_sum / items_total, 1.0)
+
+            Gdk.threads_enter()
+            for i in range(0, len(self.workers)):
+                worker = self.workers[i]
+                if worker != None:
+                    batch_window.update_worker_progress(i, worker.render_item.get_display_name(),
+                                                        worker.get_render_fraction(),
+                                                        time.time() - worker.render_item.start_time)
+            batch_window.current_render.set_text("  " + str(self._get_running_count()) + " / " + str(items_total - items))
+            batch_window.update_render_progress(fraction, items, None, time.time() - queue_start_time)
+            Gdk.threads_leave()
+
+            time.sleep(0.33)
+
+        if self.aborted == True:
+            for worker in self.workers:
+                if worker != None:
+                    worker.abort()
+                    worker.render_item.render_aborted()
+
+        # Update view for render end
+        Gdk.threads_enter()
+        batch_window.reload_queue() # item may havee added to queue while rendering
+        batch_window.render_queue_stopped()
+        Gdk.threads_leave()
+
+    def _get_running_count(self):
+        return len(self.workers) - self.workers.count(None)
+
+    def _get_memory_in_use(self):
+        memory = 0
+        for worker in self.workers:
+            if worker != None:
+                memory += worker.memory_estimate
+        return memory
+
+    def abort(self):
+        self.aborted = True
+        self.running = False
+
+
+class BatchRenderWorker:
+    """
+    Renders one queue item in a separate process, progress is read from a pipe
+    that worker process writes render fractions into.
+    """
+    def __init__(self, render_item, memory_estimate):
+        self.render_item = render_item
+        self.memory_estimate = memory_estimate
+        self.process = None
+        self.progress_fd = None
+        self.progress_data = ""
+        self.render_fraction = 0.0
+
+    def start(self):
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        self.progress_fd = read_fd
+
+        identifier = self.render_item.generate_identifier()
+        FLOG = open(userfolders.get_cache_dir() + "log_batch_worker_" + identifier, 'w')
+        self.process = subprocess.Popen([sys.executable, respaths.LAUNCH_DIR + "flowbladebatchworker", identifier, str(write_fd)],
+                                        stdin=FLOG, stdout=FLOG, stderr=FLOG, pass_fds=(write_fd,))
+        os.close(write_fd)
+        FLOG.close()
+
+        self.render_item.render_started()
+
+    def get_render_fraction(self):
+        try:
+            data = os.read(self.progress_fd, 4096)
+            self.progress_data += data.decode("utf-8")
+        except (BlockingIOError, OSError):
+            pass
+
+        lines = self.progress_data.split("\n")
+        self.progress_data = lines[-1]
+        for line in reversed(lines[:-1]):
+            try:
+                self.render_fraction = float(line)
+                break
+            except ValueError:
+                pass
+
+        return self.render_fraction
+
+    def is_finished(self):
+        return self.process.poll() != None
+
+    def completed(self):
+        return self.process.returncode == WORKER_COMPLETED_EXIT
+
+    def abort(self):
+        # Worker stops render and exits on SIGTERM.
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.close_progress_pipe()
+
+    def close_progress_pipe(self):
+        os.close(self.progress_fd)
+
+
 class BatchRenderDBUSService(dbus.service.Object):
     def __init__(self):
         print("dbus service init")
@@ -365,14 +533,11 @@ def main(root_path, force_launch=False):
     # Set numeric locale to use "." as radix, MLT initilizes this to OS locale and this causes bugs 
     locale.setlocale(locale.LC_NUMERIC, 'C')
 
-    # Check for codecs and formats on the system
-    mltenv.check_available_features(repo)
+    # Check for codecs and formats on the system and load filter and compositor descriptions,
+    # these come from startup cache if it is up to date.
+    startupcache.load_mlt_environment(repo)
     renderconsumer.load_render_profiles()
 
-    # Load filter and compositor descriptions from xml files.
-    mltfilters.load_filters_xml(mltenv.services)
-    mlttransitions.load_compositors_xml(mltenv.transitions)
-
     # Create list of available mlt profiles
     mltprofiles.load_profile_list()
 
@@ -587,10 +752,6 @@ class BatchRenderItemData:
         self.render_time = -1
         self.save()
 
-        global queue_runner_thread, render_thread
-        render_thread = None
-        queue_runner_thread = None      
-
     def get_status_string(self):
         if self.status == IN_QUEUE:
             return _("Queued")
@@ -644,6 +805,47 @@ def get_render_range(render_item):
     
     return (start_frame, end_frame, wait_for_stop_render)
 
+def create_render_thread(render_item):
+    # Used both when rendering queue in batch render app process and in worker processes.
+    identifier = render_item.generate_identifier()
+    project_file_path = get_projects_dir() + identifier + ".flb"
+    persistance.show_messages = False
+
+    project = persistance.load_project(project_file_path, False)
+
+    project.c_seq.fix_v1_for_render()
+
+    maybe_create_render_folder(render_item.render_path)
+
+    producer = project.c_seq.tractor
+    profile = mltprofiles.get_profile(render_item.render_data.profile_name)
+    consumer = renderconsumer.get_mlt_render_consumer(render_item.render_path, 
+                                                      profile,
+                                                      render_item.args_vals_list)
+
+    # Get render range
+    start_frame, end_frame, wait_for_stop_render = get_render_range(render_item)
+
+    render_thread = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame) # None == file name not needed this time when using FileRenderPlayer because callsite keeps track of things
+    render_thread.wait_for_producer_end_stop = wait_for_stop_render
+    return render_thread
+
+def estimate_render_memory(render_item):
+    profile = mltprofiles.get_profile(render_item.render_data.profile_name)
+    frame_bytes = profile.width() * profile.height() * 4 # rgba
+    return WORKER_BASE_MEMORY + frame_bytes * WORKER_FRAME_BUFFERS
+
+def get_available_memory():
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES')
+
 
 # -------------------------------------------------------------------- gui
 class BatchRenderWindow:
@@ -709,10 +911,18 @@ class BatchRenderWindow:
                                    lambda w, e: self.abort_render(), 
                                    None)
 
+        spin_adj = Gtk.Adjustment(value=editorpersistance.prefs.batch_render_parallel_items, lower=1, upper=multiprocessing.cpu_count(), step_incr=1)
+        self.parallel_spin = Gtk.SpinButton(adjustment=spin_adj)
+        self.parallel_spin.set_numeric(True)
+        self.parallel_spin.set_tooltip_text(_("Number of items rendered at the same time in separate processes"))
+
         button_row =  Gtk.HBox(False, 0)
         button_row.pack_start(self.remove_selected, False, False, 0)
         button_row.pack_start(self.remove_finished, False, False, 0)
         button_row.pack_start(Gtk.Label(), True, True, 0)
+        button_row.pack_start(Gtk.Label(label=_("Parallel Renders:")), False, False, 0)
+        button_row.pack_start(self.parallel_spin, False, False, 0)
+        button_row.pack_start(guiutils.get_pad_label(12, 12), False, False, 0)
         button_row.pack_start(self.stop_render_button, False, False, 0)
         button_row.pack_start(self.render_button, False, False, 0)
 
@@ -723,6 +933,11 @@ class BatchRenderWindow:
         top_vbox.pack_start(guiutils.get_pad_label(12, 12), False, False, 0)
         top_vbox.pack_start(button_row, False, False, 0)
 
+        # Parallel renders show progress of each worker process in rows added here.
+        self.worker_rows = []
+        self.workers_vbox = Gtk.VBox(False, 2)
+        top_vbox.pack_start(self.workers_vbox, False, False, 0)
+
         top_align = guiutils.set_margins(top_vbox, 12, 12, 12, 12)
 
         self.queue_view = RenderQueueView()
@@ -818,9 +1033,16 @@ class BatchRenderWindow:
         self.render_started_label.set_text(start_str)
         self.remove_selected.set_sensitive(False)
         self.remove_finished.set_sensitive(False)
+        self.parallel_spin.set_sensitive(False)
+
+        parallel_items = self.parallel_spin.get_value_as_int()
 
         global queue_runner_thread
-        queue_runner_thread = QueueRunnerThread()
+        if parallel_items > 1:
+            self.init_worker_rows(parallel_items)
+            queue_runner_thread = ParallelQueueRunnerThread(parallel_items)
+        else:
+            queue_runner_thread = QueueRunnerThread()
         queue_runner_thread.start()
 
     def update_render_progress(self, fraction, items, current_name, current_render_time_passed):
@@ -845,6 +1067,43 @@ class BatchRenderWindow:
         
         self.items_rendered.set_text("  " + str(items))
 
+    def init_worker_rows(self, workers_count):
+        self.clear_worker_rows()
+        for i in range(0, workers_count):
+            name_label = Gtk.Label()
+            name_label.set_ellipsize(Pango.EllipsizeMode.END)
+            name_label.set_size_request(250, 20)
+            name_label.set_xalign(0.0)
+            progress_bar = Gtk.ProgressBar()
+            time_label = Gtk.Label()
+            time_label.set_size_request(100, 20)
+
+            row = Gtk.HBox(False, 4)
+            row.pack_start(name_label, False, False, 0)
+            row.pack_start(progress_bar, True, True, 0)
+            row.pack_start(time_label, False, False, 0)
+            self.workers_vbox.pack_start(row, False, False, 0)
+            self.worker_rows.append((name_label, progress_bar, time_label))
+
+        self.workers_vbox.show_all()
+
+    def clear_worker_rows(self):
+        for child in self.workers_vbox.get_children():
+            self.workers_vbox.remove(child)
+        self.worker_rows = []
+
+    def update_worker_progress(self, worker_index, name, fraction, render_time_passed):
+        name_label, progress_bar, time_label = self.worker_rows[worker_index]
+        name_label.set_text(name)
+        progress_bar.set_fraction(fraction)
+        time_label.set_text(utils.get_time_str_for_sec_float(render_time_passed))
+
+    def clear_worker_progress(self, worker_index):
+        name_label, progress_bar, time_label = self.worker_rows[worker_index]
+        name_label.set_text("")
+        progress_bar.set_fraction(0.0)
+        time_label.set_text("")
+
     def abort_render(self):
         global queue_runner_thread
         queue_runner_thread.abort()
@@ -858,6 +1117,8 @@ class BatchRenderWindow:
         self.current_render.set_text("")
         self.remove_selected.set_sensitive(True)
         self.remove_finished.set_sensitive(True)
+        self.parallel_spin.set_sensitive(True)
+        self.clear_worker_rows()
 
         global queue_runner_thread, render_thread
         render_thread = None
@@ -1152,6 +1413,41 @@ def _get_menu_item(text, callback, data, sensitive=True):
 
 
 
+# --------------------------------------------------- parallel render worker process
+def batch_worker_main(root_path, identifier, progress_fd):
+    # called from .../launch/flowbladebatchworker script, renders one queue item and writes
+    # render fractions into progress pipe, exit code tells batch render app if render completed.
+    mltheadlessutils.mlt_env_base_init(root_path)
+
+    aborted = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: aborted.append(True))
+
+    progress_file = os.fdopen(progress_fd, "w", buffering=1)
+
+    render_item = utils.unpickle(get_datafiles_dir() + identifier + ".renderitem")
+    render_thread = create_render_thread(render_item)
+    render_thread.start()
+
+    # Make sure that render thread is actually running before
+    # testing render_thread.running value later
+    while render_thread.has_started_running == False:
+        time.sleep(0.05)
+
+    while render_thread.running == True and len(aborted) == 0:
+        try:
+            progress_file.write(str(render_thread.get_render_fraction()) + "\n")
+        except OSError:
+            pass # Batch render app closed pipe, we'll get SIGTERM soon.
+        time.sleep(0.33)
+
+    render_thread.shutdown()
+
+    if len(aborted) == 0:
+        sys.exit(WORKER_COMPLETED_EXIT)
+    else:
+        sys.exit(WORKER_ABORTED_EXIT)
+
+
 # --------------------------------------------------- single item render
 def add_single_render_item(flowblade_project, render_path, args_vals_list, mark_in, mark_out, render_data):
     hidden_dir = userfolders.get_cache_dir()
@@ -1237,14 +1533,11 @@ def single_render_main(root_path):
     # Set numeric locale to use "." as radix, MLT initilizes this to OS locale and this causes bugs 
     locale.setlocale(locale.LC_NUMERIC, 'C')
 
-    # Check for codecs and formats on the system
-    mltenv.check_available_features(repo)
+    # Check for codecs and formats on the system and load filter and compositor descriptions,
+    # these come from startup cache if it is up to date.
+    startupcache.load_mlt_environment(repo)
     renderconsumer.load_render_profiles()
 
-    # Load filter and compositor descriptions from xml files.
-    mltfilters.load_filters_xml(mltenv.services)
-    mlttransitions.load_compositors_xml(mltenv.transitions)
-
     # Create list of available mlt profiles
     mltprofiles.load_profile_list()
 
@@ -1295,25 +1588,37 @@ class SingleRenderThread(threading.Thread):
         
         # We just autocreate folder if for some reason it has been deleted.
         maybe_create_render_folder(render_item.render_path)
-        
-        if self.is_frame_sequence_render(vcodec) == True and vformat == None:
-            # Frame sequence render
-            consumer = renderconsumer.get_img_seq_render_consumer_codec_ext(render_item.render_path,
-                                                                             profile,  
-                                                                             vcodec, 
-                                                                             self.get_frame_seq_ext(vcodec))
-        else: # All other renders
-            consumer = renderconsumer.get_mlt_render_consumer(render_item.render_path, 
-                                                              profile,
-                                                              render_item.args_vals_list)
 
         # Get render range
         start_frame, end_frame, wait_for_stop_render = get_render_range(render_item)
-        
-        # Create and launch render thread
-        render_thread = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame) # None == file name not needed this time when using FileRenderPlayer because callsite keeps track of things
-        render_thread.wait_for_producer_end_stop = wait_for_stop_render
-        render_thread.start()
+
+        frame_sequence_render = (self.is_frame_sequence_render(vcodec) == True and vformat == None)
+        if frame_sequence_render == False and splitrender.can_split_render(start_frame, end_frame) == True:
+            # Split render, chunk render processes render from sequence MLT XML.
+            splitrender.get_work_dir()
+            xml_player = renderconsumer.XMLCompoundRenderPlayer(splitrender.get_sequence_xml_path(), None, 
+                                                                lambda file_name, media_name: None, producer, project)
+            xml_player.run() # blocks until xml is written
+
+            render_thread = splitrender.SplitRenderThread(render_item.render_path, render_item.render_data.profile_name,
+                                                          render_item.args_vals_list, start_frame, end_frame)
+            render_thread.start()
+        else:
+            if frame_sequence_render == True:
+                # Frame sequence render
+                consumer = renderconsumer.get_img_seq_render_consumer_codec_ext(render_item.render_path,
+                                                                                 profile,  
+                                                                                 vcodec, 
+                                                                                 self.get_frame_seq_ext(vcodec))
+            else: # All other renders
+                consumer = renderconsumer.get_mlt_render_consumer(render_item.render_path, 
+                                                                  profile,
+                                                                  render_item.args_vals_list)
+
+            # Create and launch render thread
+            render_thread = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame) # None == file name not needed this time when using FileRenderPlayer because callsite keeps track of things
+            render_thread.wait_for_producer_end_stop = wait_for_stop_render
+            render_thread.start()
 
         # Set render start time and item state
         render_item.render_started()
@@ -29,7 +29,6 @@ import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import GLib
 
-import locale
 import mlt
 import os
 from os import listdir
@@ -46,19 +45,13 @@ import time
 import appconsts
 import atomicfile
 import ccrutils
-import editorpersistance
 import editorstate
 import gmicplayer
-import mltenv
-import mltfilters
+import mltheadlessutils
 import mltprofiles
-import mlttransitions
-import processutils
 import renderconsumer
 import respaths
-import userfolders
 import toolsencoding
-import translations
 import utils
 
 _render_thread = None
@@ -91,38 +84,7 @@ def abort_render(session_id):
 def main(root_path, session_id, project_path, range_in, range_out, profile_desc):
     print(root_path, session_id, project_path, range_in, range_out, profile_desc)
 
-    try:
-        editorstate.mlt_version = mlt.LIBMLT_VERSION
-    except:
-        editorstate.mlt_version = "0.0.99" # magic string for "not found"
-
-    # Set paths.
-    respaths.set_paths(root_path)
-
-    userfolders.init()
-    editorpersistance.load()
-
-    # Init translations module with translations data
-    translations.init_languages()
-    translations.load_filters_translations()
-    mlttransitions.init_module()
-
-    repo = mlt.Factory().init()
-    processutils.prepare_mlt_repo(repo)
-    
-    # Set numeric locale to use "." as radix, MLT initilizes this to OS locale and this causes bugs 
-    locale.setlocale(locale.LC_NUMERIC, 'C')
-
-    # Check for codecs and formats on the system
-    mltenv.check_available_features(repo)
-    renderconsumer.load_render_profiles()
-
-    # Load filter and compositor descriptions from xml files.
-    mltfilters.load_filters_xml(mltenv.services)
-    mlttransitions.load_compositors_xml(mltenv.transitions)
-
-    # Create list of available mlt profiles
-    mltprofiles.load_profile_list()
+    mltheadlessutils.mlt_env_base_init(root_path)
     
     ccrutils.init_session_folders(session_id)
     ccrutils.load_render_data()
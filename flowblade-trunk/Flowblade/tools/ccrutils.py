@@ -26,9 +26,11 @@ Used mostly for container clips rendering, hence ContainerClipsRenderingUTILS.
 import os
 import pickle
 import sys
+import time
 
 import appconsts
 import atomicfile
+import progresschannel
 import userfolders
 import utils
 
@@ -41,17 +43,23 @@ STATUS_MSG_FILE = "status"
 ABORT_MSG_FILE = "abort"
 RENDER_DATA_FILE = "render_data"
 
+ABORT_FILE_CHECK_INTERVAL = 1.0 # Abort file is only a fallback when abort messages are received from progress channel.
 
+
+_session_id = None
 _session_folder = None
 _clip_frames_folder_internal = None
 _rendered_frames_folder_internal = None
 
 _render_data = None
+_last_abort_file_check = 0.0
 
 
 # ----------------------------------------------------- interface with message files, used by main app
-# We are using message files to communicate with application.
+# We are using progress channel messages to communicate with application, message files
+# are used when render process cannot reach the channel.
 def clear_flag_files(session_id):
+    progresschannel.clear_session(session_id)
     folder = _get_session_folder(session_id)
     
     completed_msg = folder + "/" + COMPLETED_MSG_FILE
@@ -78,6 +86,11 @@ def set_render_data(session_id, video_render_data):
         pickle.dump(video_render_data, outfile)
     
 def session_render_complete(session_id):
+    if progresschannel.session_completed(session_id) == True:
+        return True
+    if progresschannel.is_session_live(session_id) == True:
+        return False # Completion would have been sent to channel too.
+
     folder = _get_session_folder(session_id)
     completed_msg_path = folder + "/" + COMPLETED_MSG_FILE
 
@@ -95,6 +108,10 @@ def get_session_status(session_id):
     return (step, frame, length, elapsed)
 
 def get_session_status_message(session_id):
+    msg = progresschannel.get_status_message(session_id)
+    if msg != None:
+        return msg
+
     try:
         status_msg_file = _get_session_folder(session_id) + "/" + STATUS_MSG_FILE
         with open(status_msg_file) as f:
@@ -104,6 +121,9 @@ def get_session_status_message(session_id):
         return None
         
 def abort_render(session_id):
+    progresschannel.send_abort(session_id)
+
+    # Abort file is written always, render process may not have opened its session socket yet.
     folder = _get_session_folder(session_id)
     abort_msg_file = folder + "/" +  ABORT_MSG_FILE
 
@@ -121,7 +141,8 @@ def _get_session_folder(session_id):
 
 # ------------------------------------------------------ headless session folders and files, used by render processes
 def init_session_folders(session_id):
-    global _session_folder, _clip_frames_folder_internal, _rendered_frames_folder_internal
+    global _session_id, _session_folder, _clip_frames_folder_internal, _rendered_frames_folder_internal
+    _session_id = session_id
     _session_folder = _get_session_folder(session_id)
     _clip_frames_folder_internal = _session_folder + CLIP_FRAMES_DIR
     _rendered_frames_folder_internal = _session_folder + RENDERED_FRAMES_DIR
@@ -134,10 +155,13 @@ def init_session_folders(session_id):
     if not os.path.exists(_rendered_frames_folder_internal):
         os.mkdir(_rendered_frames_folder_internal)
 
+    progresschannel.open_session(session_id)
+
 def delete_internal_folders(session_id):
     # This works only if clip frames and rendered frames folder are empty already.
     # This is used my motinheadless.py that uses container clips folders only to communicate render status
     # back and forth.
+    progresschannel.clear_session(session_id)
     _session_folder = _get_session_folder(session_id)
     _clip_frames_folder_internal = _session_folder + CLIP_FRAMES_DIR
     _rendered_frames_folder_internal = _session_folder + RENDERED_FRAMES_DIR
@@ -185,6 +209,9 @@ def preview_frames_folder():
         return _render_data.render_dir + appconsts.CC_PREVIEW_RENDER_DIR
         
 def write_status_message(msg):
+    if progresschannel.send_status(_session_id, msg) == True:
+        return
+
     try:
         status_msg_file = session_folder() + "/" + STATUS_MSG_FILE
         with atomicfile.AtomicFileWriter(status_msg_file, "w") as afw:
@@ -194,6 +221,9 @@ def write_status_message(msg):
         pass # this failing because we can't get file access will show as progress hickup to user, we don't care
 
 def write_completed_message():
+    progresschannel.send_completed(_session_id)
+
+    # Completed file is written always so that app sees completion even if message was lost.
     completed_msg_file = session_folder() + "/" + COMPLETED_MSG_FILE
     script_text = "##completed##" # let's put something in here
     with atomicfile.AtomicFileWriter(completed_msg_file, "w") as afw:
@@ -226,6 +256,16 @@ def delete_rendered_frames():
         os.remove(file_path)
 
 def abort_requested():
+    global _last_abort_file_check
+    if progresschannel.abort_received() == True:
+        return True
+
+    if progresschannel.is_session_open() == True:
+        now = time.monotonic()
+        if now - _last_abort_file_check < ABORT_FILE_CHECK_INTERVAL:
+            return False
+        _last_abort_file_check = now
+
     abort_file = session_folder() + "/" + ABORT_MSG_FILE
     if os.path.exists(abort_file):
         return True
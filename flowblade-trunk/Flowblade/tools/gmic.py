@@ -48,14 +48,13 @@ import gui
 import guicomponents
 import guiutils
 import glassbuttons
-import mltenv
 import mltprofiles
 import mlttransitions
-import mltfilters
 import positionbar
 import processutils
 import respaths
 import renderconsumer
+import startupcache
 import toolguicomponents
 import toolsencoding
 import translations
@@ -74,6 +73,7 @@ PREVIEW_FILE = "preview.png"
 NO_PREVIEW_FILE = "fallback_thumb.png"
 
 _gmic_found = False
+_gmic_tested = False
 _session_id = None
 
 _window = None
@@ -100,6 +100,8 @@ _hamburger_menu = Gtk.Menu()
 
 #-------------------------------------------------- launch and inits
 def test_availablity():
+    global _gmic_tested
+    _gmic_tested = True
     if os.path.exists("/usr/bin/gmic") == True or os.path.exists("/app/bin/gmic") == True: # File system and flatpak
         print("G'MIC found")
         global _gmic_found
@@ -108,10 +110,12 @@ def test_availablity():
         print("G'MIC NOT found")
                 
 def gmic_available():
+    if _gmic_tested == False:
+        test_availablity()
     return _gmic_found
     
 def launch_gmic(launch_data=None):
-    if _gmic_found == False:
+    if gmic_available() == False:
         primary_txt = _("G'Mic not found!")
         secondary_txt = _("G'Mic binary was not present at <b>/usr/bin/gmic</b>.\nInstall G'MIC to use this tool.")
         dialogutils.info_message(primary_txt, secondary_txt, gui.editor_window.window)
@@ -208,14 +212,11 @@ def main(root_path, force_launch=False):
     # Set numeric locale to use "." as radix, MLT initilizes this to OS locale and this causes bugs 
     locale.setlocale(locale.LC_NUMERIC, 'C')
 
-    # Check for codecs and formats on the system
-    mltenv.check_available_features(repo)
+    # Check for codecs and formats on the system and load filter and compositor descriptions,
+    # these come from startup cache if it is up to date.
+    startupcache.load_mlt_environment(repo)
     renderconsumer.load_render_profiles()
 
-    # Load filter and compositor descriptions from xml files.
-    mltfilters.load_filters_xml(mltenv.services)
-    mlttransitions.load_compositors_xml(mltenv.transitions)
-
     # Create list of available mlt profiles
     mltprofiles.load_profile_list()
 
@@ -1194,7 +1195,9 @@ class GmicEffectRendererer(threading.Thread):
                                                                         out_folder,
                                                                         frame_name,
                                                                         self.script_render_update_callback, 
-                                                                        self.script_render_output_callback)
+                                                                        self.script_render_output_callback,
+                                                                        processes=gmicplayer.get_default_render_processes(),
+                                                                        frames_per_batch=gmicplayer.get_frames_per_batch())
         self.script_renderer.write_frames()
         
         # Render video
@@ -29,10 +29,11 @@ import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import GLib
 
-import locale
 import mlt
 import os
 import pickle
+import queue
+import shutil
 import subprocess
 import sys
 import threading
@@ -41,19 +42,12 @@ import time
 import appconsts
 import atomicfile
 import ccrutils
-import editorstate
 import editorpersistance
 import gmicplayer
-import mltfilters
-import mltenv
+import mltheadlessutils
 import mltprofiles
-import mlttransitions
-import processutils
 import renderconsumer
-import respaths
 import toolsencoding
-import translations
-import userfolders
 import utils
 
 
@@ -65,6 +59,14 @@ STATUS_MSG_FILE = ccrutils.STATUS_MSG_FILE
 ABORT_MSG_FILE = ccrutils.ABORT_MSG_FILE
 RENDER_DATA_FILE = ccrutils.RENDER_DATA_FILE
 
+STREAMING_CHUNK_LENGTH = 50 # Frames extracted, scripted and encoded as one unit in streaming render.
+STREAMING_QUEUE_SIZE = 2 # Max chunks waiting between streaming render steps, with chunk length this sets max scratch disk use.
+STREAMING_QUEUE_TIMEOUT = 0.5
+CHUNK_FOLDER_PREFIX = "chunk_"
+SEGMENT_FILE_PREFIX = "segment_"
+SEGMENTS_LIST_FILE = "segments_list"
+EXTRACT_FRAME_NAME = "extract"
+
 _render_thread = None
 
 
@@ -93,48 +95,7 @@ def abort_render(session_id):
 # --------------------------------------------------- render process
 def main(root_path, session_id, script, clip_path, range_in, range_out, profile_desc, gmic_frame_offset):
     
-    os.nice(10) # make user configurable
-
-    try:
-        editorstate.mlt_version = mlt.LIBMLT_VERSION
-    except:
-        editorstate.mlt_version = "0.0.99" # magic string for "not found"
-
-    # Set paths.
-    respaths.set_paths(root_path)
-
-    userfolders.init()
-    editorpersistance.load()
-
-    # Init translations module with translations data
-    translations.init_languages()
-    translations.load_filters_translations()
-    mlttransitions.init_module()
-
-    repo = mlt.Factory().init()
-    processutils.prepare_mlt_repo(repo)
-    
-    # Set numeric locale to use "." as radix, MLT initilizes this to OS locale and this causes bugs 
-    locale.setlocale(locale.LC_NUMERIC, 'C')
-
-    # Check for codecs and formats on the system
-    mltenv.check_available_features(repo)
-    renderconsumer.load_render_profiles()
-
-    # Load filter and compositor descriptions from xml files.
-    mltfilters.load_filters_xml(mltenv.services)
-    mlttransitions.load_compositors_xml(mltenv.transitions)
-
-    # Create list of available mlt profiles
-    mltprofiles.load_profile_list()
-    
-    ccrutils.init_session_folders(session_id)
-    
-    ccrutils.load_render_data()
-    render_data = ccrutils.get_render_data()
-    
-    # This needs to have render data loaded to know if we are using external folders.
-    ccrutils.maybe_init_external_session_folders()
+    render_data = mltheadlessutils.mlt_env_init(root_path, session_id)
 
     global _render_thread
     _render_thread = GMicHeadlessRunnerThread(script, render_data, clip_path, range_in, range_out, profile_desc, gmic_frame_offset)
@@ -155,7 +116,8 @@ class GMicHeadlessRunnerThread(threading.Thread):
         self.profile_desc = profile_desc
         self.gmic_frame_offset = int(gmic_frame_offset) # Note this not used currently can't MLT to find frame seq if not starting from 0001
     
-        self.abort = False
+        self.abort = False # Only ever set to True, render threads check this and stop.
+        self.step_failed = False # Set by streaming render steps.
         
     def run(self):
         self.start_time = time.monotonic()
@@ -178,12 +140,22 @@ class GMicHeadlessRunnerThread(threading.Thread):
         # Delete old clip frames
         for frame_file in os.listdir(clip_frames_folder):
             file_path = os.path.join(clip_frames_folder, frame_file)
-            os.remove(file_path)
+            if os.path.isdir(file_path):
+                shutil.rmtree(file_path) # Streaming render chunk folder left by aborted render
+            else:
+                os.remove(file_path)
 
         # Delete old rendered frames
         for frame_file in os.listdir(rendered_frames_folder):
             file_path = os.path.join(rendered_frames_folder, frame_file)
-            os.remove(file_path)
+            if os.path.isdir(file_path):
+                shutil.rmtree(file_path) # Streaming render chunk folder left by aborted render
+            else:
+                os.remove(file_path)
+
+        if editorpersistance.prefs.gmic_streaming_render == True:
+            self.run_streaming(profile, clip_frames_folder, rendered_frames_folder, frame_name)
+            return
             
         self.frames_range_writer = gmicplayer.FramesRangeWriter(self.clip_path, self.frames_update, profile)
         self.frames_range_writer.write_frames(clip_frames_folder + "/", frame_name, self.range_in, self.range_out)
@@ -206,7 +178,9 @@ class GMicHeadlessRunnerThread(threading.Thread):
                                                                         self.script_render_output_callback,
                                                                         10,
                                                                         False,  # this is not useful until we get MLT to fin frames sequences not startin from 0001
-                                                                        0)
+                                                                        0,
+                                                                        gmicplayer.get_default_render_processes(),
+                                                                        gmicplayer.get_frames_per_batch())
         self.script_renderer.write_frames()
 
         ccrutils.delete_clip_frames()
@@ -258,8 +232,241 @@ class GMicHeadlessRunnerThread(threading.Thread):
         # Write out completed flag file.
         ccrutils.write_completed_message()
 
+    # ------------------------------------------------------ streaming render
+    def run_streaming(self, profile, clip_frames_folder, rendered_frames_folder, frame_name):
+        # Clip range is handled in chunks that move through frames extraction, script rendering and encoding steps
+        # concurrently. Bounded queues between steps keep at most a few chunks of frames on disk at any time.
+        script_file = open(self.script_path)
+        user_script = script_file.read()
+
+        # Steps update done frames counts and status is written from all of them by _write_streaming_status().
+        self.status_lock = threading.Lock()
+        self.extracted_frames_done = 0
+        self.script_frames_done = 0
+        self.script_chunk_frames_done = 0
+        self.encoded_frames_done = 0
+        self.segment_paths = []
+
+        script_queue = queue.Queue(STREAMING_QUEUE_SIZE)
+        encode_queue = queue.Queue(STREAMING_QUEUE_SIZE)
+        
+        script_thread = threading.Thread(target=self._streaming_script_step, 
+                                         args=(user_script, rendered_frames_folder, frame_name, script_queue, encode_queue))
+        script_thread.start()
+        if self.render_data.do_video_render == True:
+            encode_thread = threading.Thread(target=self._streaming_encode_step, args=(encode_queue,))
+            encode_thread.start()
+
+        # Frames extraction step is run in this thread.
+        producer = mlt.Producer(profile, str(self.clip_path))
+        chunk_index = 0
+        for chunk_in in range(self.range_in, self.range_out + 1, STREAMING_CHUNK_LENGTH):
+            if self.abort_requested() == True or self.step_failed == True:
+                break
+            
+            chunk_out = min(chunk_in + STREAMING_CHUNK_LENGTH - 1, self.range_out)
+            chunk_folder = clip_frames_folder + "/" + CHUNK_FOLDER_PREFIX + str(chunk_index)
+            os.mkdir(chunk_folder)
+            try:
+                self._write_chunk_frames(producer, profile, chunk_folder, frame_name, chunk_in, chunk_out)
+            except Exception as e:
+                print("G'MIC streaming render frames write failed:", e)
+                self.step_failed = True
+                break
+
+            self._put_chunk(script_queue, (chunk_index, chunk_folder, chunk_out - chunk_in + 1))
+            chunk_index += 1
+
+            self._write_streaming_status(extracted_frames=chunk_out - chunk_in + 1)
+
+        self._put_chunk(script_queue, None)
+        script_thread.join()
+        if self.render_data.do_video_render == True:
+            encode_thread.join()
+
+        if self._streaming_stopped() == True:
+            for folder in [clip_frames_folder, rendered_frames_folder]:
+                for chunk_folder in os.listdir(folder):
+                    if chunk_folder.startswith(CHUNK_FOLDER_PREFIX):
+                        shutil.rmtree(os.path.join(folder, chunk_folder), ignore_errors=True)
+            for segment_path in self.segment_paths:
+                os.remove(segment_path)
+            return
+
+        # Join encoded segments into video clip
+        if self.render_data.do_video_render == True:
+            self._write_streaming_status()
+
+            if self.render_data.save_internally == True:
+                file_path = ccrutils.session_folder() +  "/" + appconsts.CONTAINER_CLIP_VIDEO_CLIP_NAME + self.render_data.file_extension
+            else:
+                file_path = self.render_data.render_dir +  "/" + self.render_data.file_name + self.render_data.file_extension
+
+            list_file_path = ccrutils.session_folder() + "/" + SEGMENTS_LIST_FILE
+            if renderconsumer.concat_video_files(self.segment_paths, file_path, list_file_path) == False:
+                print("G'MIC streaming render segments could not be joined without re-encoding, re-encoding.")
+                self._encode_producer(renderconsumer.get_segments_playlist_producer(self._get_encode_profile(), self.segment_paths), file_path)
+            
+            for segment_path in self.segment_paths:
+                os.remove(segment_path)
+
+        # Write out completed flag file.
+        ccrutils.write_completed_message()
+
+    def _write_chunk_frames(self, producer, profile, chunk_folder, frame_name, chunk_in, chunk_out):
+        render_path = chunk_folder + "/" + EXTRACT_FRAME_NAME + "_%04d.png"
+        consumer = mlt.Consumer(profile, "avformat", str(render_path))
+        consumer.set("real_time", -1)
+        consumer.set("rescale", "bicubic")
+        consumer.set("vcodec", "png")
+
+        frames_count = chunk_out - chunk_in + 1
+        frame_producer = producer.cut(chunk_in, chunk_out)
+        render_player = renderconsumer.FileRenderPlayer(None, frame_producer, consumer, 0, frames_count - 1)
+        render_player.run() # blocks until frames are written
+
+        # Frames are renamed to have clip range frame numbers so that script step output 
+        # has same names as in non-streaming render. Producers can render a bit longer then required.
+        extracted_frames = sorted(os.listdir(chunk_folder))
+        for i in range(0, len(extracted_frames)):
+            extracted_path = chunk_folder + "/" + extracted_frames[i]
+            if i < frames_count:
+                frame_number = chunk_in - self.range_in + i
+                os.rename(extracted_path, chunk_folder + "/" + frame_name + "_" + str(frame_number).zfill(4) + ".png")
+            else:
+                os.remove(extracted_path)
+
+    def _streaming_script_step(self, user_script, rendered_frames_folder, frame_name, script_queue, encode_queue):
+        try:
+            while True:
+                chunk = self._get_chunk(script_queue)
+                if chunk == None:
+                    break
+
+                chunk_index, chunk_folder, frames_count = chunk
+                if self.render_data.do_video_render == True:
+                    out_folder = rendered_frames_folder + "/" + CHUNK_FOLDER_PREFIX + str(chunk_index)
+                    os.mkdir(out_folder)
+                else:
+                    out_folder = rendered_frames_folder
+
+                self.script_renderer = gmicplayer.FolderFramesScriptRenderer(   user_script, 
+                                                                                chunk_folder,
+                                                                                out_folder + "/",
+                                                                                frame_name,
+                                                                                self.streaming_script_update_callback, 
+                                                                                self.script_render_output_callback,
+                                                                                10,
+                                                                                False,
+                                                                                0,
+                                                                                gmicplayer.get_default_render_processes(),
+                                                                                gmicplayer.get_frames_per_batch())
+                self.script_renderer.write_frames()
+                shutil.rmtree(chunk_folder)
+                self._write_streaming_status(script_chunk_done=True)
+
+                if self.render_data.do_video_render == True:
+                    self._put_chunk(encode_queue, (chunk_index, out_folder, frames_count))
+        except Exception as e:
+            print("G'MIC streaming render script step failed:", e)
+            self.step_failed = True
+
+        if self.render_data.do_video_render == True:
+            self._put_chunk(encode_queue, None)
+
+    def _streaming_encode_step(self, encode_queue):
+        try:
+            while True:
+                chunk = self._get_chunk(encode_queue)
+                if chunk == None:
+                    break
+                
+                chunk_index, chunk_frames_folder, frames_count = chunk
+                segment_path = ccrutils.session_folder() + "/" + SEGMENT_FILE_PREFIX + str(chunk_index) + self.render_data.file_extension
+                
+                frame_file = chunk_frames_folder + "/" + sorted(os.listdir(chunk_frames_folder))[0]
+                resource_name_str = utils.get_img_seq_resource_name(frame_file, True)
+                producer = mlt.Producer(self._get_encode_profile(), str(chunk_frames_folder + "/" + resource_name_str))
+
+                self._encode_producer(producer, segment_path)
+                shutil.rmtree(chunk_frames_folder)
+                self.segment_paths.append(segment_path)
+
+                self._write_streaming_status(encoded_frames=frames_count)
+        except Exception as e:
+            print("G'MIC streaming render encode step failed:", e)
+            self.step_failed = True
+
+    def _encode_producer(self, producer, file_path):
+        args_vals_list = toolsencoding.get_args_vals_list_for_render_data(self.render_data)
+        consumer = renderconsumer.get_mlt_render_consumer(file_path, self._get_encode_profile(), args_vals_list)
+        render_player = renderconsumer.FileRenderPlayer("", producer, consumer, 0, producer.get_length() - 1)
+        render_player.run() # blocks until file is written
+
+    def _get_encode_profile(self):
+        return mltprofiles.get_profile_for_index(self.render_data.profile_index) 
+
+    def _put_chunk(self, chunk_queue, chunk):
+        # Putting stops if render is aborted and next step is not taking chunks anymore.
+        while True:
+            try:
+                chunk_queue.put(chunk, timeout=STREAMING_QUEUE_TIMEOUT)
+                return
+            except queue.Full:
+                if self._streaming_stopped() == True:
+                    return
+
+    def _get_chunk(self, chunk_queue):
+        # Returns None when previous step is done or render is aborted.
+        while True:
+            if self._streaming_stopped() == True:
+                return None
+            try:
+                return chunk_queue.get(timeout=STREAMING_QUEUE_TIMEOUT)
+            except queue.Empty:
+                pass
+
+    def _streaming_stopped(self):
+        # Steps feeding a failed step would otherwise wait for it forever.
+        return self.abort == True or self.step_failed == True
+
+    def _write_streaming_status(self, extracted_frames=0, script_chunk_done=False, encoded_frames=0):
+        # Steps run concurrently, so status is written for the last step in pipeline that has 
+        # got frames done. Displayed step only moves forward and its progress is progress of the whole render.
+        with self.status_lock:
+            self.extracted_frames_done += extracted_frames
+            if script_chunk_done == True:
+                self.script_frames_done += self.script_chunk_frames_done
+                self.script_chunk_frames_done = 0
+            self.encoded_frames_done += encoded_frames
+            
+            if self.encoded_frames_done > 0 or (self.render_data.do_video_render == True and self.script_frames_done == self.length):
+                step = "3"
+                frames_done = self.encoded_frames_done
+            elif self.script_frames_done + self.script_chunk_frames_done > 0:
+                step = "2"
+                frames_done = self.script_frames_done + self.script_chunk_frames_done
+            else:
+                step = "1"
+                frames_done = self.extracted_frames_done
+
+            elapsed = time.monotonic() - self.start_time
+            msg = step + " " + str(frames_done) + " " + str(self.length) + " " + str(elapsed)
+            self.write_status_message(msg)
+
+    def streaming_script_update_callback(self, frame_count):
+        if self.abort_requested() == True:
+             self.script_renderer.abort = True
+             return
+
+        with self.status_lock:
+            self.script_chunk_frames_done = frame_count
+        self._write_streaming_status()
+
     def abort_requested(self):
-        self.abort = ccrutils.abort_requested()
+        # Called from several threads, so flag is only set here and never cleared.
+        if ccrutils.abort_requested() == True:
+            self.abort = True
         return self.abort
 
     def frames_update(self, frame):
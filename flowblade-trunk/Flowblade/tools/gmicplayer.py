@@ -24,6 +24,7 @@ Clip player used to select frames for preview and range selection.
 
 
 import mlt
+import multiprocessing
 import os
 from os import listdir
 from os.path import isfile, join
@@ -32,12 +33,15 @@ import sys
 import subprocess
 import time
 
+import editorpersistance
 import mltprofiles
 import userfolders
 import utils
 
 TICKER_DELAY = 0.25
 RENDER_TICKER_DELAY = 0.05
+PROCESS_POLL_INTERVAL = 0.02 # Time between checks for completed gmic processes in FolderFramesScriptRenderer
+MAX_DEFAULT_RENDER_PROCESSES = 4 # Same as G'MIC job weight in jobs.py so that concurrent G'MIC jobs do not oversubscribe CPU
 
 _current_profile = None
 
@@ -294,7 +298,8 @@ class FolderFramesInfo:
 class FolderFramesScriptRenderer:
 
     def __init__(   self, user_script, folder, out_folder, frame_name, update_callback, 
-                    render_output_callback, nice=0, re_render_existing=True, out_frame_offset=0):
+                    render_output_callback, nice=0, re_render_existing=True, out_frame_offset=0,
+                    processes=1, frames_per_batch=1):
         self.user_script = user_script
         self.folder = folder
         self.out_folder = out_folder
@@ -304,57 +309,112 @@ class FolderFramesScriptRenderer:
         self.nice = nice # Not used currently, but if we find a way to set this it is good to have it here available, so keeping this for now.
         self.re_render_existing = re_render_existing
         self.out_frame_offset = out_frame_offset
+        self.processes = max(1, processes) # Number of gmic processes kept running at the same time.
+        self.frames_per_batch = max(1, frames_per_batch) # > 1 only works with scripts that process each image separately. 
 
         self.abort = False
 
     def write_frames(self):
-        clip_frames = os.listdir(self.folder)
+        clip_frames = sorted(os.listdir(self.folder))
 
-        frame_count = 1
+        # Create list of (clip frame path, rendered file path) tuples for frames that need rendering.
+        frame_count = 0
+        render_items = []
         for clip_frame in clip_frames:
-
-            if self.abort == True:
-                return
-            
-            self.do_update_callback(frame_count)
-
             file_numbers_list = re.findall(r'\d+', clip_frame)
             filled_number_str = str(int(file_numbers_list[0]) + self.out_frame_offset).zfill(4)
 
             clip_frame_path = str(os.path.join(self.folder, clip_frame))
             rendered_file_path = str(self.out_folder + self.frame_name + "_" + filled_number_str + ".png")
-            
-            # Create command list and launch process.
-            command_list = ["/usr/bin/gmic", clip_frame_path]
-            user_script_commands = self.user_script.split(" ")
-            command_list.extend(user_script_commands)
-            command_list.append("-output")
-            command_list.append(rendered_file_path)
 
             if self.re_render_existing == False:
                 if os.path.exists(rendered_file_path) == True:
                     frame_count = frame_count + 1
                     continue
+            
+            render_items.append((clip_frame_path, rendered_file_path))
 
-            if frame_count == 1: # first frame displays shell output and does error checking
-                FLOG = open(userfolders.get_cache_dir() + "log_gmic_preview", 'w')
-                p = subprocess.Popen(command_list, stdin=FLOG, stdout=FLOG, stderr=FLOG)
-                p.wait()
-                FLOG.close()
- 
-                # read log
-                f = open(userfolders.get_cache_dir() + "log_gmic_preview", 'r')
-                out = f.read()
-                f.close()
-
-                self.do_render_output_callback(p, out)
-            else:
-                FLOG = open(userfolders.get_cache_dir() + "log_gmic_preview", 'w')
-                p = subprocess.Popen(command_list, stdin=FLOG, stdout=FLOG, stderr=FLOG)
-                p.wait()
-                FLOG.close()
+        if len(render_items) == 0 or self.abort == True:
+            return
+
+        # First frame displays shell output and does error checking.
+        self.do_update_callback(frame_count + 1)
 
-            frame_count = frame_count + 1
+        FLOG = open(userfolders.get_cache_dir() + "log_gmic_preview", 'w')
+        p = subprocess.Popen(self._get_command_list(render_items[0:1]), stdin=FLOG, stdout=FLOG, stderr=FLOG)
+        p.wait()
+        FLOG.close()
+
+        # read log
+        f = open(userfolders.get_cache_dir() + "log_gmic_preview", 'r')
+        out = f.read()
+        f.close()
+
+        self.do_render_output_callback(p, out)
+        frame_count = frame_count + 1
+    
+        # Rest of the frames are rendered with self.processes gmic processes running concurrently,
+        # each process renders a batch of self.frames_per_batch frames so that gmic startup is paid once per batch.
+        # gmic processes are limited to one OpenMP thread each when several are run so that processes
+        # do not compete for the same cores.
+        batches = []
+        for i in range(1, len(render_items), self.frames_per_batch):
+            batches.append(render_items[i:i + self.frames_per_batch])
+        process_env = self._get_process_env()
+
+        FLOG = open(userfolders.get_cache_dir() + "log_gmic_preview", 'a')
+        running = [] # (process, batch) tuples
+        while len(batches) > 0 or len(running) > 0:
+            if self.abort == True:
+                for p, batch in running:
+                    p.kill()
+                    p.wait()
+                break
+
+            while len(running) < self.processes and len(batches) > 0:
+                batch = batches.pop(0)
+                p = subprocess.Popen(self._get_command_list(batch), stdin=FLOG, stdout=FLOG, stderr=FLOG, env=process_env)
+                running.append((p, batch))
+
+            still_running = []
+            for p, batch in running:
+                if p.poll() == None:
+                    still_running.append((p, batch))
+                elif p.returncode != 0 and len(batch) > 1:
+                    # Script probably changes number of images, render batch frames one by one.
+                    batches[0:0] = [[render_item] for render_item in batch]
+                else:
+                    frame_count = frame_count + len(batch)
+                    self.do_update_callback(frame_count)
+            running = still_running
+
+            time.sleep(PROCESS_POLL_INTERVAL)
+
+        FLOG.close()
+
+    def _get_command_list(self, render_items):
+        command_list = ["/usr/bin/gmic"]
+        for clip_frame_path, rendered_file_path in render_items:
+            command_list.append(clip_frame_path)
+        user_script_commands = self.user_script.split(" ")
+        command_list.extend(user_script_commands)
+
+        if len(render_items) == 1:
+            command_list.append("-output")
+            command_list.append(render_items[0][1])
+        else:
+            for i in range(0, len(render_items)):
+                command_list.append("-output[" + str(i) + "]")
+                command_list.append(render_items[i][1])
+
+        return command_list
+
+    def _get_process_env(self):
+        if self.processes == 1:
+            return None # Single gmic process can use all threads.
+        process_env = os.environ.copy()
+        process_env["OMP_NUM_THREADS"] = "1"
+        return process_env
 
     def do_update_callback(self, frame_count):
         self.update_callback(frame_count)
@@ -366,6 +426,14 @@ class FolderFramesScriptRenderer:
         self.abort = True
 
 
+def get_default_render_processes():
+    # We leave one core free for the rest of the app.
+    return max(1, min(MAX_DEFAULT_RENDER_PROCESSES, multiprocessing.cpu_count() - 1))
+
+def get_frames_per_batch():
+    return editorpersistance.prefs.gmic_frames_per_batch
+
+
 # ---- Debug helper
 def prints_to_log_file(log_file):
     so = se = open(log_file, 'w', buffering=1)
@@ -30,20 +30,40 @@ import os
 import ccrutils
 import editorstate
 import editorpersistance
-import mltfilters
-import mltenv
 import mltprofiles
 import mlttransitions
 import processutils
 import renderconsumer
 import respaths
+import startupcache
 import translations
 import userfolders
 
 
+_base_init_done = False # Render workers do base init before job is received and job launch script calls init again.
+
+
 def mlt_env_init(root_path, session_id):
     os.nice(10) # make user configurable
 
+    mlt_env_base_init(root_path)
+    
+    ccrutils.init_session_folders(session_id)
+    
+    ccrutils.load_render_data()
+    render_data = ccrutils.get_render_data()
+    
+    # This needs to have render data loaded to know if we are using external folders.
+    ccrutils.maybe_init_external_session_folders()
+    
+    return render_data
+
+def mlt_env_base_init(root_path):
+    # Initializes parts of Flowblade/MLT environment that do not depend on render session.
+    global _base_init_done
+    if _base_init_done == True:
+        return
+
     try:
         editorstate.mlt_version = mlt.LIBMLT_VERSION
     except:
@@ -66,25 +86,12 @@ def mlt_env_init(root_path, session_id):
     # Set numeric locale to use "." as radix, MLT initilizes this to OS locale and this causes bugs 
     locale.setlocale(locale.LC_NUMERIC, 'C')
 
-    # Check for codecs and formats on the system
-    mltenv.check_available_features(repo)
+    # Check for codecs and formats on the system and load filter and compositor descriptions,
+    # these come from startup cache if it is up to date.
+    startupcache.load_mlt_environment(repo)
     renderconsumer.load_render_profiles()
 
-    # Load filter and compositor descriptions from xml files.
-    mltfilters.load_filters_xml(mltenv.services)
-    mlttransitions.load_compositors_xml(mltenv.transitions)
-
     # Create list of available mlt profiles
     mltprofiles.load_profile_list()
-    
-    ccrutils.init_session_folders(session_id)
-    
-    ccrutils.load_render_data()
-    render_data = ccrutils.get_render_data()
-    
-    # This needs to have render data loaded to know if we are using external folders.
-    ccrutils.maybe_init_external_session_folders()
-    
-    return render_data
-
 
+    _base_init_done = True
@@ -0,0 +1,255 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <http://code.google.com/p/flowblade>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+"""
+Module provides push based progress channel between application and headless render processes.
+
+Application listens on one local datagram socket and headless processes send progress and
+completion messages to it tagged with their session id. Each headless process listens on its
+own per session socket for abort messages.
+
+Sockets are in Linux abstract socket namespace so there are no socket files to clean up
+when forked job processes exit without running exit handlers. If any socket cannot be used,
+ccrutils falls back to message files.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+
+CHANNEL_ENV_VAR = "FLOWBLADE_JOBS_PROGRESS_CHANNEL"
+APP_SOCKET_PREFIX = "flowblade_jobs_progress_"
+SESSION_SOCKET_PREFIX = "flowblade_job_session_"
+
+STATUS_MSG = "status"
+COMPLETED_MSG = "completed"
+ABORT_MSG = "abort"
+
+MAX_MSG_SIZE = 4096
+LISTEN_TIMEOUT = 2.0
+SESSION_LIVE_TIMEOUT = 5.0 # Sessions that have not sent messages for this long get polled from files again.
+
+
+class SessionState:
+
+    def __init__(self):
+        self.status_msg = None
+        self.completed = False
+        self.last_msg_time = 0.0
+
+
+# Application side
+_app_socket = None
+_listener_thread = None
+_sessions = {} # session_id -> SessionState
+_updated_sessions = set()
+_sessions_lock = threading.Lock()
+_messages_event = threading.Event()
+
+# Headless process side
+_channel_address = None
+_send_socket = None
+_session_socket = None
+_abort_received = False
+
+
+# ----------------------------------------------------- application side
+def start():
+    # Headless processes find channel from environment, so this needs to be called before
+    # render processes or render workers are launched to get push messages from them.
+    global _app_socket, _listener_thread
+    if _app_socket != None:
+        return
+
+    channel_name = APP_SOCKET_PREFIX + str(os.getuid()) + "_" + str(os.getpid())
+    try:
+        _app_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        _app_socket.bind("\0" + channel_name)
+        _app_socket.settimeout(LISTEN_TIMEOUT)
+    except OSError as e:
+        print("Jobs progress channel not available, using message files:", e)
+        _app_socket = None
+        return
+
+    os.environ[CHANNEL_ENV_VAR] = channel_name
+
+    _listener_thread = ChannelListenerThread()
+    _listener_thread.start()
+
+def is_listening():
+    return _app_socket != None
+
+def wait_for_messages(timeout):
+    # Blocks until messages arrive or timeout passes, returns set of session ids that got new messages.
+    global _updated_sessions
+    _messages_event.wait(timeout)
+    with _sessions_lock:
+        _messages_event.clear()
+        updated = _updated_sessions
+        _updated_sessions = set()
+    return updated
+
+def get_status_message(session_id):
+    with _sessions_lock:
+        try:
+            return _sessions[session_id].status_msg
+        except KeyError:
+            return None
+
+def session_completed(session_id):
+    with _sessions_lock:
+        try:
+            return _sessions[session_id].completed
+        except KeyError:
+            return False
+
+def is_session_live(session_id):
+    with _sessions_lock:
+        try:
+            state = _sessions[session_id]
+        except KeyError:
+            return False
+    return (time.monotonic() - state.last_msg_time) < SESSION_LIVE_TIMEOUT
+
+def clear_session(session_id):
+    with _sessions_lock:
+        _sessions.pop(session_id, None)
+        _updated_sessions.discard(session_id)
+
+def send_abort(session_id):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as abort_socket:
+            abort_socket.sendto(_encode(session_id, ABORT_MSG, None), "\0" + SESSION_SOCKET_PREFIX + str(os.getuid()) + "_" + session_id)
+        return True
+    except OSError:
+        return False # Render process has not opened its session socket or has already exited.
+
+def _message_received(data):
+    try:
+        msg = json.loads(data.decode("utf-8"))
+        session_id = msg["session_id"]
+        msg_type = msg["type"]
+    except (ValueError, KeyError, TypeError):
+        return
+
+    with _sessions_lock:
+        try:
+            state = _sessions[session_id]
+        except KeyError:
+            state = SessionState()
+            _sessions[session_id] = state
+
+        if msg_type == STATUS_MSG:
+            state.status_msg = msg["msg"]
+        elif msg_type == COMPLETED_MSG:
+            state.completed = True
+        state.last_msg_time = time.monotonic()
+
+        _updated_sessions.add(session_id)
+        _messages_event.set()
+
+
+class ChannelListenerThread(threading.Thread):
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+    def run(self):
+        while True:
+            try:
+                data = _app_socket.recv(MAX_MSG_SIZE)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                print("Jobs progress channel receive failed:", e)
+                time.sleep(LISTEN_TIMEOUT)
+                continue
+
+            _message_received(data)
+
+
+# ------------------------------------------------------ headless process side
+def open_session(session_id):
+    # Opens sockets for sending messages to app and receiving abort message from app,
+    # returns False if channel is not available and message files need to be used.
+    global _channel_address, _send_socket, _session_socket, _abort_received
+    _abort_received = False
+
+    channel_name = os.environ.get(CHANNEL_ENV_VAR, None)
+    if channel_name == None:
+        return False
+
+    try:
+        _send_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        _send_socket.setblocking(False)
+        _session_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        _session_socket.setblocking(False)
+        _session_socket.bind("\0" + SESSION_SOCKET_PREFIX + str(os.getuid()) + "_" + session_id)
+    except OSError as e:
+        print("Jobs progress channel not available, using message files:", e)
+        _send_socket = None
+        _session_socket = None
+        return False
+
+    _channel_address = "\0" + channel_name
+    return True
+
+def is_session_open():
+    return _session_socket != None
+
+def send_status(session_id, msg):
+    return _send(session_id, STATUS_MSG, msg)
+
+def send_completed(session_id):
+    return _send(session_id, COMPLETED_MSG, None)
+
+def abort_received():
+    global _abort_received
+    if _session_socket == None or _abort_received == True:
+        return _abort_received
+
+    while True:
+        try:
+            data = _session_socket.recv(MAX_MSG_SIZE)
+        except (BlockingIOError, OSError):
+            break
+        try:
+            if json.loads(data.decode("utf-8"))["type"] == ABORT_MSG:
+                _abort_received = True
+        except (ValueError, KeyError, TypeError):
+            pass
+
+    return _abort_received
+
+def _send(session_id, msg_type, msg):
+    if _send_socket == None:
+        return False
+    try:
+        _send_socket.sendto(_encode(session_id, msg_type, msg), _channel_address)
+        return True
+    except OSError:
+        return False # App gone or socket buffer full, caller writes message file instead.
+
+def _encode(session_id, msg_type, msg):
+    return json.dumps({"session_id":session_id, "type":msg_type, "msg":msg}).encode("utf-8")
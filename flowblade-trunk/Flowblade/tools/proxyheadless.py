@@ -18,15 +18,20 @@
     along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import concurrent.futures
 import glob
 import mlt
+import multiprocessing
 import os
+import pickle
 from PIL import Image
 import threading
 import time
 
 import appconsts
+import atomicfile
 import ccrutils
+import editorpersistance
 import mltheadlessutils
 import mltprofiles
 import processutils
@@ -34,6 +39,11 @@ import renderconsumer
 import toolsencoding
 import userfolders
 
+IMG_SEQ_BATCH_SIZE = 20 # Frames given to a pool worker at a time.
+IMG_SEQ_MANIFEST_FILE = "proxy_frames_manifest" # Original frame size, mtime and proxy size for each rendered proxy frame.
+FAST_PNG_COMPRESS_LEVEL = 1
+DEFAULT_PNG_COMPRESS_LEVEL = 6
+
 _render_thread = None
 
 
@@ -135,33 +145,85 @@ class ProxyClipRenderThread(threading.Thread):
                 
         else:
             # Image Sequences
-
-            copyfolder, copyfilename = os.path.split(self.proxy_file_path)
-            if not os.path.isdir(copyfolder):
-                os.makedirs(copyfolder)
-            
-            listing = glob.glob(self.lookup_path)
-            size = self.proxy_w, self.proxy_h
-            done = 0
-            for orig_path in listing:
-                orig_folder, orig_file_name = os.path.split(orig_path)
-
-                try:
-                    im = Image.open(orig_path)
-                    im.thumbnail(size, Image.ANTIALIAS)
-                    im.save(copyfolder + "/" + orig_file_name, "PNG")
-                except IOError:
-                    print("proxy img seq frame failed for '%s'" % orig_path)
-
-                done = done + 1
-            
-                if done % 5 == 0:
-                    fraction = float(done) / float(len(listing))
-                    self.render_update(fraction)
+            self.render_img_seq_proxy()
+            if self.abort == True:
+                return
 
         # Write out completed flag file.
         ccrutils.write_completed_message()
 
+    def render_img_seq_proxy(self):
+        # Frames are shared out in batches to a pool of worker processes. Frames that already have
+        # a proxy frame made from same original file with same proxy size are not rendered again.
+        copyfolder, copyfilename = os.path.split(self.proxy_file_path)
+        if not os.path.isdir(copyfolder):
+            os.makedirs(copyfolder)
+
+        listing = glob.glob(self.lookup_path)
+        if len(listing) == 0:
+            return
+        size = (self.proxy_w, self.proxy_h)
+
+        old_manifest = _load_img_seq_manifest(copyfolder)
+        manifest = {}
+        frame_keys = {}
+        render_paths = []
+        for orig_path in listing:
+            orig_folder, orig_file_name = os.path.split(orig_path)
+            try:
+                orig_stat = os.stat(orig_path)
+            except OSError:
+                continue
+            frame_key = (orig_stat.st_size, orig_stat.st_mtime_ns, size)
+            if old_manifest.get(orig_file_name) == frame_key and os.path.isfile(copyfolder + "/" + orig_file_name):
+                manifest[orig_file_name] = frame_key
+            else:
+                frame_keys[orig_path] = frame_key
+                render_paths.append(orig_path)
+
+
+        if editorpersistance.prefs.img_seq_proxy_fast_png == True:
+            compress_level = FAST_PNG_COMPRESS_LEVEL
+        else:
+            compress_level = DEFAULT_PNG_COMPRESS_LEVEL
+
+        done = len(listing) - len(render_paths)
+        self.render_update(float(done) / float(len(listing)))
+
+        # Workers only use PIL, so forking is safe here, MLT is not rendering anything in this process.
+        workers = max(1, multiprocessing.cpu_count() - 1)
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+        batches = {}
+        for i in range(0, len(render_paths), IMG_SEQ_BATCH_SIZE):
+            batch = render_paths[i:i + IMG_SEQ_BATCH_SIZE]
+            future = executor.submit(_render_img_seq_proxy_frames, batch, copyfolder, size, compress_level)
+            batches[future] = batch
+
+        for future in concurrent.futures.as_completed(batches):
+            batch = batches[future]
+            try:
+                failed_paths = future.result()
+            except Exception as e:
+                print("proxy img seq frames batch failed:", e)
+                failed_paths = batch
+
+            for orig_path in batch:
+                if orig_path not in failed_paths:
+                    orig_folder, orig_file_name = os.path.split(orig_path)
+                    manifest[orig_file_name] = frame_keys[orig_path]
+
+            done = done + len(batch)
+            self.render_update(float(done) / float(len(listing)))
+
+            self.check_abort_requested()
+            if self.abort == True:
+                break
+
+        executor.shutdown(wait=True, cancel_futures=True)
+
+        # Written also on abort so that frames done are not rendered again.
+        _save_img_seq_manifest(copyfolder, manifest)
+
     def check_abort_requested(self):
         self.abort = ccrutils.abort_requested()
 
@@ -171,4 +233,37 @@ class ProxyClipRenderThread(threading.Thread):
         ccrutils.write_status_message(msg)
 
 
+# --------------------------------------------------- image sequence proxy frames
+def _render_img_seq_proxy_frames(orig_paths, copyfolder, size, compress_level):
+    # This is run in pool worker processes, returns paths of frames that could not be rendered.
+    failed_paths = []
+    for orig_path in orig_paths:
+        orig_folder, orig_file_name = os.path.split(orig_path)
+
+        try:
+            im = Image.open(orig_path)
+            im.thumbnail(size, Image.ANTIALIAS)
+            im.save(copyfolder + "/" + orig_file_name, "PNG", compress_level=compress_level)
+        except IOError:
+            print("proxy img seq frame failed for '%s'" % orig_path)
+            failed_paths.append(orig_path)
+
+    return failed_paths
+
+def _load_img_seq_manifest(copyfolder):
+    try:
+        with open(copyfolder + "/" + IMG_SEQ_MANIFEST_FILE, "rb") as manifest_file:
+            return pickle.load(manifest_file)
+    except Exception:
+        return {} # No manifest yet or it is unreadable, all frames get rendered.
+
+def _save_img_seq_manifest(copyfolder, manifest):
+    try:
+        with atomicfile.AtomicFileWriter(copyfolder + "/" + IMG_SEQ_MANIFEST_FILE, "wb") as afw:
+            manifest_file = afw.get_file()
+            pickle.dump(manifest, manifest_file)
+    except Exception as e:
+        print("proxy img seq manifest write failed:", e)
+
+
 
@@ -0,0 +1,108 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <http://code.google.com/p/flowblade>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module keeps a few pre-initialized render worker processes waiting for headless render jobs.
+
+Workers are started as new processes that initialize Flowblade/MLT environment and then wait
+for a job launch script command line on stdin. Each worker runs one job and exits, and a new
+worker is started to replace it, so jobs do not wait for environment init and do not share state.
+
+Headless render modules do not need to know if they were started in a worker or as new processes.
+"""
+
+import importlib
+import json
+import runpy
+import subprocess
+import sys
+
+import editorpersistance
+import mltheadlessutils
+import respaths
+
+IDLE_WORKERS_COUNT = 2 # Number of initialized workers kept waiting for jobs.
+
+# These are imported before job is received so that job does not wait for them.
+HEADLESS_MODULES = ["proxyheadless", "motionheadless", "gmicheadless", "mltxmlheadless", "blenderheadless"]
+
+_idle_workers = [] # subprocess.Popen objects
+
+
+# ----------------------------------------------------- module interface used by main app
+def launch_job(command_list):
+    # command_list is [python executable, launch script path, args...] as used to launch job as new process.
+    if editorpersistance.prefs.render_worker_pool == True:
+        worker = _get_idle_worker()
+        _start_idle_workers() # Workers are started here when first needed and will be available for later jobs.
+        if worker != None and _send_job(worker, command_list[1:]) == True:
+            return
+
+    subprocess.Popen(command_list)
+
+def shutdown():
+    global _idle_workers
+    for worker in _idle_workers:
+        worker.terminate()
+    _idle_workers = []
+
+def _get_idle_worker():
+    global _idle_workers
+    _idle_workers = [worker for worker in _idle_workers if worker.poll() == None]
+    if len(_idle_workers) == 0:
+        return None
+    return _idle_workers.pop(0)
+
+def _start_idle_workers():
+    while len(_idle_workers) < IDLE_WORKERS_COUNT:
+        worker = subprocess.Popen([sys.executable, respaths.LAUNCH_DIR + "flowbladerenderworkers"],
+                                  stdin=subprocess.PIPE)
+        _idle_workers.append(worker)
+
+def _send_job(worker, job_argv):
+    # Worker that is still initializing reads job when it is ready.
+    try:
+        worker.stdin.write((json.dumps(job_argv) + "\n").encode("utf-8"))
+        worker.stdin.close()
+        return True
+    except OSError:
+        worker.terminate()
+        return False
+
+
+# --------------------------------------------------- worker process
+def main(root_path):
+    mltheadlessutils.mlt_env_base_init(root_path)
+    for module_name in HEADLESS_MODULES:
+        importlib.import_module(module_name)
+
+    # Empty line means that app closed pipe without sending a job.
+    line = sys.stdin.readline()
+    if line == "":
+        return
+
+    _run_job(json.loads(line))
+
+def _run_job(job_argv):
+    # Launch script is run as it would be in a new process, process exits
+    # when render threads started by job have exited.
+    editorpersistance.load() # Prefs may have been changed in app after worker was started.
+    sys.argv = job_argv
+    runpy.run_path(job_argv[0], run_name="__main__")
@@ -0,0 +1,312 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <http://code.google.com/p/flowblade>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+"""
+Module renders a sequence range split into chunks that are rendered concurrently in
+worker processes from the same MLT XML, chunks are then joined without re-encoding.
+
+Chunks are rendered without audio, audio is rendered once for the whole range and
+muxed into joined video file.
+"""
+
+import locale
+import math
+import mlt
+import multiprocessing
+import os
+import queue
+import shutil
+import threading
+import time
+
+import editorpersistance
+import mltprofiles
+import processutils
+import renderconsumer
+import respaths
+import userfolders
+
+SPLIT_RENDER_DIR = "split_render/"
+SEQUENCE_XML_FILE = "sequence.xml"
+CHUNK_FILE_PREFIX = "chunk_"
+AUDIO_FILE = "audio"
+VIDEO_FILE = "video"
+CHUNKS_LIST_FILE = "chunks_list"
+
+MIN_CHUNK_LENGTH = 250 # frames, shorter chunks would spend too much time in process and producer start-up.
+CHUNKS_PER_PROCESS = 2 # More chunks then processes so that processes finishing early pick up more work.
+DEFAULT_GOP_SIZE = 12 # MLT avformat consumer default for "g".
+AUDIO_WORK_FACTOR = 0.1 # Audio only render of a frame is much faster then video render, used for progress.
+
+# Messages sent from chunk render worker processes to SplitRenderThread.
+WORKER_TASK_PROGRESS = 0
+WORKER_TASK_COMPLETED = 1
+WORKER_TASK_FAILED = 2
+WORKER_EXITED = 3
+
+WORKER_JOIN_TIMEOUT = 5.0
+
+
+# ----------------------------------------------------- interface
+def can_split_render(start_frame, end_frame):
+    if editorpersistance.prefs.split_render_processes < 2:
+        return False
+    if shutil.which("ffmpeg") == None:
+        return False # Chunks are joined and audio muxed with ffmpeg.
+
+    return (end_frame - start_frame + 1) >= MIN_CHUNK_LENGTH * 2
+
+def get_work_dir():
+    # Sequence XML is written here by callsite before SplitRenderThread is started.
+    work_dir = userfolders.get_cache_dir() + SPLIT_RENDER_DIR
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir, ignore_errors=True)
+    os.mkdir(work_dir)
+    return work_dir
+
+def get_sequence_xml_path():
+    return userfolders.get_cache_dir() + SPLIT_RENDER_DIR + SEQUENCE_XML_FILE
+
+def get_chunk_ranges(start_frame, end_frame, processes, gop_size):
+    # Chunk lengths are multiples of GOP size so that keyframe interval in joined file stays the same as in single render.
+    length = end_frame - start_frame + 1
+    chunk_length = max(MIN_CHUNK_LENGTH, int(math.ceil(float(length) / (processes * CHUNKS_PER_PROCESS))))
+    chunk_length = int(math.ceil(float(chunk_length) / gop_size)) * gop_size
+
+    chunk_ranges = []
+    for chunk_in in range(start_frame, end_frame + 1, chunk_length):
+        chunk_ranges.append((chunk_in, min(chunk_in + chunk_length - 1, end_frame)))
+    return chunk_ranges
+
+
+# ----------------------------------------------------- split render
+class SplitRenderThread(threading.Thread):
+    """
+    Has the same interface as renderconsumer.FileRenderPlayer as used by render progress
+    update loops so that callsites can use either one.
+
+    If chunks cannot be rendered or joined whole range is rendered in one worker process.
+    """
+    def __init__(self, render_path, profile_name, args_vals_list, start_frame, end_frame):
+        threading.Thread.__init__(self)
+
+        self.render_path = render_path
+        self.profile_name = profile_name
+        self.args_vals_list = args_vals_list
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.processes = editorpersistance.prefs.split_render_processes
+        self.work_dir = userfolders.get_cache_dir() + SPLIT_RENDER_DIR
+        self.extension = os.path.splitext(render_path)[1]
+
+        self.running = False
+        self.has_started_running = False
+        self.aborted = False
+
+        self.task_weights = {} # file path -> frames to render as work units
+        self.task_fractions = {} # file path -> render fraction
+        self.fractions_lock = threading.Lock()
+
+        self.mp_context = multiprocessing.get_context("spawn") # Forking a process running GTK and MLT threads is not safe.
+        self.abort_event = self.mp_context.Event()
+
+    def run(self):
+        self.running = True
+        self.has_started_running = True
+
+        # Create render tasks.
+        video_args = [(arg, val) for (arg, val) in self.args_vals_list if arg not in ["an", "vn"]]
+        video_args.append(("an", "1"))
+        chunk_tasks = []
+        chunk_ranges = get_chunk_ranges(self.start_frame, self.end_frame, self.processes, self._get_gop_size())
+        for i in range(0, len(chunk_ranges)):
+            chunk_in, chunk_out = chunk_ranges[i]
+            chunk_path = self.work_dir + CHUNK_FILE_PREFIX + str(i).zfill(4) + self.extension
+            chunk_tasks.append((chunk_path, chunk_in, chunk_out, video_args, 1.0))
+
+        tasks = list(chunk_tasks)
+        audio_path = None
+        if self._has_audio() == True:
+            audio_path = self.work_dir + AUDIO_FILE + self.extension
+            audio_args = [(arg, val) for (arg, val) in self.args_vals_list if arg not in ["an", "vn"]]
+            audio_args.append(("vn", "1"))
+            tasks.append((audio_path, self.start_frame, self.end_frame, audio_args, AUDIO_WORK_FACTOR))
+
+        # Render chunks and join them.
+        success = self._render_tasks(tasks)
+        if success == True and self.aborted == False:
+            chunk_paths = [task[0] for task in chunk_tasks]
+            list_file_path = self.work_dir + CHUNKS_LIST_FILE
+            if audio_path == None:
+                success = renderconsumer.concat_video_files(chunk_paths, self.render_path, list_file_path)
+            else:
+                video_path = self.work_dir + VIDEO_FILE + self.extension
+                success = renderconsumer.concat_video_files(chunk_paths, video_path, list_file_path)
+                if success == True:
+                    success = renderconsumer.mux_audio_file(video_path, audio_path, self.render_path)
+
+        if success == False and self.aborted == False:
+            print("Split render failed, rendering range in one process.")
+            self._render_tasks([(self.render_path, self.start_frame, self.end_frame, self.args_vals_list, 1.0)])
+
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+        self.running = False
+
+    def _render_tasks(self, tasks):
+        # Returns True if all tasks were rendered.
+        with self.fractions_lock:
+            self.task_weights = {}
+            self.task_fractions = {}
+            for file_path, range_in, range_out, args_vals_list, work_factor in tasks:
+                self.task_weights[file_path] = (range_out - range_in + 1) * work_factor
+                self.task_fractions[file_path] = 0.0
+
+        tasks_queue = self.mp_context.Queue()
+        for file_path, range_in, range_out, args_vals_list, work_factor in tasks:
+            tasks_queue.put((file_path, range_in, range_out, args_vals_list))
+
+        status_queue = self.mp_context.Queue()
+
+        workers = []
+        for i in range(0, min(self.processes, len(tasks))):
+            worker = self.mp_context.Process(target=_chunk_render_worker,
+                                             args=(respaths.ROOT_PATH, i, get_sequence_xml_path(), self.profile_name,
+                                                   tasks_queue, status_queue, self.abort_event))
+            worker.start()
+            workers.append(worker)
+
+        completed_tasks = 0
+        failed = False
+        exited_workers = set() # worker indexes
+        while len(exited_workers) < len(workers):
+            try:
+                msg_type, file_path, value = status_queue.get(timeout=0.1)
+            except queue.Empty:
+                # Workers that crash do not send exit messages. Messages of a dead worker are
+                # all in queue before it exits, so getting nothing means they have been handled.
+                for i in range(0, len(workers)):
+                    if not workers[i].is_alive():
+                        exited_workers.add(i)
+                continue
+
+            if msg_type == WORKER_TASK_PROGRESS:
+                with self.fractions_lock:
+                    self.task_fractions[file_path] = value
+            elif msg_type == WORKER_TASK_COMPLETED:
+                with self.fractions_lock:
+                    self.task_fractions[file_path] = 1.0
+                completed_tasks += 1
+            elif msg_type == WORKER_TASK_FAILED:
+                print("Split render task failed:", file_path, value)
+                failed = True
+                self.abort_event.set() # Rest of chunks are useless.
+            elif msg_type == WORKER_EXITED:
+                exited_workers.add(value)
+
+        for worker in workers:
+            worker.join(WORKER_JOIN_TIMEOUT)
+            if worker.is_alive():
+                worker.terminate()
+
+        if failed == True and self.aborted == False:
+            self.abort_event.clear() # Fallback render is done after failed chunks render.
+
+        return (failed == False and completed_tasks == len(tasks))
+
+    def _get_gop_size(self):
+        for arg, val in self.args_vals_list:
+            if arg == "g":
+                try:
+                    return max(1, int(val))
+                except ValueError:
+                    break
+        return DEFAULT_GOP_SIZE
+
+    def _has_audio(self):
+        args = [arg for (arg, val) in self.args_vals_list]
+        return ("an" not in args and "acodec" in args)
+
+    def get_render_fraction(self):
+        with self.fractions_lock:
+            total_work = sum(self.task_weights.values())
+            if total_work == 0:
+                return 0.0
+            done_work = 0.0
+            for file_path, fraction in self.task_fractions.items():
+                done_work += self.task_weights[file_path] * fraction
+        return min(done_work / total_work, 1.0)
+
+    def shutdown(self):
+        self.aborted = True
+        self.abort_event.set()
+
+
+def _chunk_render_worker(root_path, worker_index, sequence_xml_path, profile_name, tasks_queue, status_queue, abort_event):
+    # This is run in a separate process, only the MLT environment parts needed to render
+    # MLT XML are initialized here.
+    respaths.set_paths(root_path)
+    userfolders.init()
+    editorpersistance.load()
+
+    repo = mlt.Factory().init()
+    processutils.prepare_mlt_repo(repo)
+    locale.setlocale(locale.LC_NUMERIC, 'C')
+
+    mltprofiles.load_profile_list()
+
+    profile = mltprofiles.get_profile(profile_name)
+    sequence_producer = mlt.Producer(profile, str(sequence_xml_path))
+
+    while abort_event.is_set() == False:
+        try:
+            file_path, range_in, range_out, args_vals_list = tasks_queue.get_nowait()
+        except queue.Empty:
+            break
+
+        try:
+            # Cut makes producer end at chunk last frame so that consumer writes exactly the chunk frames.
+            consumer = renderconsumer.get_mlt_render_consumer(file_path, profile, args_vals_list)
+            chunk_producer = sequence_producer.cut(range_in, range_out)
+            render_player = renderconsumer.FileRenderPlayer(None, chunk_producer, consumer, 0, range_out - range_in)
+            render_player.start()
+
+            while render_player.has_started_running == False:
+                time.sleep(0.05)
+
+            while render_player.running:
+                if abort_event.is_set():
+                    render_player.shutdown()
+                    break
+                status_queue.put((WORKER_TASK_PROGRESS, file_path, render_player.get_render_fraction()))
+                time.sleep(0.2)
+
+            render_player.join()
+        except Exception as e:
+            status_queue.put((WORKER_TASK_FAILED, file_path, str(e)))
+            break
+
+        if abort_event.is_set():
+            break
+
+        status_queue.put((WORKER_TASK_COMPLETED, file_path, 1.0))
+
+    status_queue.put((WORKER_EXITED, None, worker_index))
@@ -29,12 +29,17 @@ import render
 import utils
 
 _tools = []
+_tools_initialized = False
 _render_items = []
 test_timeout_id = None
            
 # --------------------------------------------------- interface
 def init():
-    
+    global _tools_initialized
+    if _tools_initialized == True:
+        return
+    _tools_initialized = True
+
     if gmic.gmic_available():
         _tools.append(GMICIntegrator())
         
@@ -42,6 +47,7 @@ def init():
     _tools.append(ReverseIntegrator())
     
 def get_export_integrators():
+    init() # Done here if used before deferred start-up init.
     export_integrators = []
     for tool_integrator in _tools:
         if tool_integrator.is_export_target == True:
@@ -36,6 +36,7 @@ from editorstate import get_track
 from editorstate import current_sequence
 from editorstate import PROJECT
 from editorstate import PLAYER
+import projectchanges
 import snapping
 import tlinewidgets
 import updater
@@ -138,6 +139,7 @@ def set_track_small_height(track_index):
 def mute_track(track, new_mute_state):
     # NOTE: THIS IS A SAVED EDIT OF SEQUENCE, BUT IT IS NOT AN UNDOABLE EDIT.
     current_sequence().set_track_mute_state(track.id, new_mute_state)
+    projectchanges.sequence_changed(current_sequence())
     gui.tline_column.widget.queue_draw()
     
 def all_tracks_menu_launch_pressed(widget, event):
@@ -297,6 +299,7 @@ def track_center_pressed(data):
                     return 
             # Update track mute state
             current_sequence().set_track_mute_state(track.id, new_mute_state)
+            projectchanges.sequence_changed(current_sequence())
             
             audiomonitoring.update_mute_states()
             gui.tline_column.widget.queue_draw()
@@ -21,15 +21,33 @@
 """
 Module manages undo and redo stacks and executes edit actions from them
 on user requests.
+
+Undo stack size is limited by estimated memory use of edit actions, and
+consecutive quickly done edits of same kind on same target are coalesced
+into one undo step.
 """
+import sys
 import time
+
+import editorpersistance
 import editorstate
+import projectchanges
 
 set_post_undo_redo_edit_mode = None # This is set at startup to avoid circular imports.
 repaint_tline = None
 
-# Max stack size.
-MAX_UNDOS = 35
+# This many undos are kept even if memory budget is exceeded.
+MIN_UNDOS = 10
+
+# Edits done within this time of previous edit are coalesced if they are of same kind and have same target. 
+COALESCE_INTERVAL = 1.0 # seconds
+COALESCE_TARGET_ATTRS = ["track", "clip", "index", "filter", "compositor", "selected_range_in", "selected_range_out"]
+
+# Rough memory use estimates for MLT objects held by edit actions, MLT side memory is not visible to Python.
+MLT_OBJECT_BYTES = 64 * 1024
+# Tracks and tractors are alive in sequence anyway and are not counted.
+NOT_COUNTED_MLT_TYPES = ["Playlist", "Tractor", "Multitrack", "Field", "Profile"]
+ESTIMATE_MAX_DEPTH = 4
 
 # EditActions are placed in this stack after their do_edit()
 # method has been called.
@@ -46,6 +64,32 @@ save_item = None
 undo_item = None 
 redo_item = None
 
+class CoalescedEditAction:
+    """
+    Undo stack item for consecutive edits that are undone and redone together.
+    """
+    def __init__(self, first_edit):
+        self.edits = [first_edit]
+        self.estimated_bytes = first_edit.estimated_bytes
+        self.register_time = first_edit.register_time
+
+    def add_edit(self, undo_edit):
+        self.edits.append(undo_edit)
+        self.estimated_bytes += undo_edit.estimated_bytes
+        self.register_time = undo_edit.register_time
+
+    def last_edit(self):
+        return self.edits[-1]
+
+    def undo(self):
+        for undo_edit in reversed(self.edits):
+            undo_edit.undo()
+
+    def redo(self):
+        for redo_edit in self.edits:
+            redo_edit.redo()
+
+
 def clear_undos():
     global undo_stack, index
     undo_stack = []
@@ -66,19 +110,33 @@ def register_edit(undo_edit):
     Adds a performed EditAction into undo stack
     """
     global index
-    
+
+    projectchanges.sequence_changed(editorstate.current_sequence())
+
+    undo_edit.register_time = time.monotonic()
+    undo_edit.estimated_bytes = estimate_edit_memory(undo_edit)
+
     # New edit action clears all redos(== undos after index)
+    redos_cleared = False
     if index != len(undo_stack) and (len(undo_stack) != 0):
         del undo_stack[index:]
- 
-    # Keep stack in size, if too big remove undo at 0
-    if len(undo_stack) > MAX_UNDOS:
+        redos_cleared = True
+
+    if redos_cleared == False and len(undo_stack) > 0 and _can_coalesce(undo_stack[-1], undo_edit):
+        # Add to previous undo stack item
+        if not isinstance(undo_stack[-1], CoalescedEditAction):
+            undo_stack[-1] = CoalescedEditAction(undo_stack[-1])
+        undo_stack[-1].add_edit(undo_edit)
+    else:
+        # Add to stack and grow index
+        undo_stack.append(undo_edit);
+        index = index + 1
+
+    # Keep stack memory use in budget, remove undos from bottom until it is.
+    budget = get_memory_budget()
+    while len(undo_stack) > MIN_UNDOS and get_memory_use() > budget:
         del undo_stack[0]
         index = index - 1
-        
-    # Add to stack and grow index
-    undo_stack.append(undo_edit);
-    index = index + 1
     
     save_item.set_sensitive(True) # Disabled at load and save, first edit enables
     undo_item.set_sensitive(True)
@@ -110,6 +168,7 @@ def do_undo():
     index = index - 1
     undo_edit = undo_stack[index]
     undo_edit.undo()
+    projectchanges.sequence_changed(editorstate.current_sequence())
     
     if index == 0:
         undo_item.set_sensitive(False)
@@ -135,6 +194,7 @@ def do_redo():
     # Do redo and move stack pointer up
     redo_edit = undo_stack[index]
     redo_edit.redo()
+    projectchanges.sequence_changed(editorstate.current_sequence())
     index = index + 1
 
     if index == len(undo_stack):
@@ -142,6 +202,91 @@ def do_redo():
 
     undo_item.set_sensitive(True)
 
+# ----------------------------------------------------- coalescing
+def _can_coalesce(prev_item, undo_edit):
+    if isinstance(prev_item, CoalescedEditAction):
+        prev_edit = prev_item.last_edit()
+    else:
+        prev_edit = prev_item
+
+    if undo_edit.register_time - prev_edit.register_time > COALESCE_INTERVAL:
+        return False
+    if prev_edit.undo_func != undo_edit.undo_func or prev_edit.redo_func != undo_edit.redo_func:
+        return False
+
+    for attr in COALESCE_TARGET_ATTRS:
+        prev_value = getattr(prev_edit, attr, None)
+        value = getattr(undo_edit, attr, None)
+        if isinstance(value, int): # indexes are compared by value, objects by identity
+            if prev_value != value:
+                return False
+        elif prev_value is not value:
+            return False
+
+    return True
+
+
+# ----------------------------------------------------- memory use
+def estimate_edit_memory(undo_edit):
+    """
+    Returns rough estimate of memory in bytes held alive by edit action.
+    """
+    return _estimate_memory(undo_edit.__dict__, set(), 0)
+
+def _estimate_memory(obj, seen, depth):
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    obj_type = type(obj)
+    if obj_type.__module__ == "mlt":
+        if obj_type.__name__ in NOT_COUNTED_MLT_TYPES:
+            return 0
+        # Python attributes of MLT objects, like clip filters lists, are not followed to avoid walking whole sequence.
+        return MLT_OBJECT_BYTES + sys.getsizeof(getattr(obj, "__dict__", {}))
+
+    if callable(obj):
+        return 0 # functions, methods and classes
+
+    size = sys.getsizeof(obj)
+    if depth >= ESTIMATE_MAX_DEPTH:
+        return size
+
+    if isinstance(obj, dict):
+        for value in obj.values():
+            size += _estimate_memory(value, seen, depth + 1)
+    elif isinstance(obj, (list, tuple, set)):
+        for item in obj:
+            size += _estimate_memory(item, seen, depth + 1)
+    elif hasattr(obj, "__dict__"):
+        size += _estimate_memory(obj.__dict__, seen, depth + 1)
+
+    return size
+
+def get_memory_budget():
+    return editorpersistance.prefs.undo_memory_budget * 1024 * 1024
+
+def get_memory_use():
+    memory_use = 0
+    for item in undo_stack:
+        memory_use += item.estimated_bytes
+    return memory_use
+
+def get_stats():
+    """
+    Returns (undos count, redos count, coalesced edits count, estimated memory use bytes, memory budget bytes)
+    """
+    coalesced = 0
+    for item in undo_stack:
+        if isinstance(item, CoalescedEditAction):
+            coalesced += len(item.edits) - 1
+    return (index, len(undo_stack) - index, coalesced, get_memory_use(), get_memory_budget())
+
+def get_stats_str():
+    undos, redos, coalesced, memory_use, budget = get_stats()
+    return (_("Undos: ") + str(undos) + ", " + _("Redos: ") + str(redos) + ", " + _("Coalesced edits: ") + str(coalesced) + "\n" + 
+            _("Undo memory: ") + "%.1f" % (memory_use / 1024.0 / 1024.0) + " / " + "%.0f" % (budget / 1024.0 / 1024.0) + " MB")
+
 def _set_post_edit_mode():
     if editorstate.edit_mode != editorstate.INSERT_MOVE:
         set_post_undo_redo_edit_mode()